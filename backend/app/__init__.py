@@ -45,6 +45,13 @@ def create_app(config_name='default'):
     from app.routes.parking import register_socketio_events
     register_socketio_events(socketio)
     
+    # Start Redis pub/sub listener (cross-worker cache invalidation)
+    from app.utils import pubsub, session_registry
+    pubsub.start_listener()
+    
+    # Start session generation follower (single-device login check without per-request Redis reads)
+    session_registry.start_reader()
+    
     with app.app_context():
         # Import models here to ensure they are registered with SQLAlchemy
         from app.models import user, parking, order, car, config as sys_config, school
@@ -8,10 +8,12 @@ db = SQLAlchemy()
 socketio = SocketIO(cors_allowed_origins="*", async_mode="threading")
 jwt = JWTManager()
 redis_client = None
+redis_bytes_client = None  # 不做解码的客户端，用于位图等二进制数据
 
 def init_redis(app):
     """Initialize Redis client"""
-    global redis_client
+    global redis_client, redis_bytes_client
     redis_url = app.config['REDIS_URL']
     redis_client = redis.from_url(redis_url, decode_responses=True)
+    redis_bytes_client = redis.from_url(redis_url)
     return redis_client
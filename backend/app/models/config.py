@@ -15,7 +15,8 @@ class SysConfig(db.Model):
         return config.config_value if config else default
 
     @staticmethod
-    def set_value(key, value, desc=None):
+    def set_value(key, value, desc=None, notify=True):
+        """写入配置；notify 为 False 时由调用方在批量写入后统一通知配置快照更新"""
         config = SysConfig.query.filter_by(config_key=key).first()
         if config:
             config.config_value = str(value)
@@ -25,3 +26,6 @@ class SysConfig(db.Model):
             config = SysConfig(config_key=key, config_value=str(value), config_desc=desc)
             db.session.add(config)
         db.session.commit()
+        if notify:
+            from app.utils import config_snapshot
+            config_snapshot.bump()
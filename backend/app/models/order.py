@@ -56,3 +56,18 @@ class ParkingOrder(db.Model):
     
     def __repr__(self):
         return f'<ParkingOrder {self.order_no}>'
+
+
+class RevenueDaily(db.Model):
+    """每日营收汇总表 - 按 (支付日期, 区域, 支付方式) 汇总已完成订单，订单状态变更时在同一事务内增量更新"""
+    __tablename__ = 'revenue_daily'
+    
+    day = db.Column(db.Date, primary_key=True, comment='支付日期 (UTC)')
+    zone_id = db.Column(db.Integer, primary_key=True, comment='区域ID')
+    pay_way = db.Column(db.Integer, primary_key=True, comment='0-余额, 1-微信, 2-支付宝, -1-未知')
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0.00, comment='营收合计')
+    order_count = db.Column(db.Integer, nullable=False, default=0, comment='订单数')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<RevenueDaily {self.day} {self.zone_id} {self.pay_way}>'
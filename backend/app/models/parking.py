@@ -10,30 +10,35 @@ class ParkingZone(db.Model):
     map_file_path = db.Column(db.String(255), comment='地图资源路径')
     fee_rate = db.Column(db.Numeric(10, 2), default=5.00, comment='每小时费率')
     free_time = db.Column(db.Integer, default=15, comment='免费时长(分钟)')
+    tariff = db.Column(db.JSON, comment='分时/阶梯计费方案，为空时按 fee_rate 平价计费')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     spots = db.relationship('ParkingSpot', backref='zone', lazy='dynamic', cascade='all, delete-orphan')
     
-    def to_dict(self):
-        """转换为字典 - 包含精确的可预约统计"""
-        # 真正可用的车位 = 状态为0(空闲) 且 没有被关联到 status=0(预约中) 的订单
-        from app.models.order import ParkingOrder
-        reserved_spot_ids = [order.spot_id for order in ParkingOrder.query.filter_by(status=0).all()]
-        truly_available = self.spots.filter(
-            ParkingSpot.status == 0,
-            ~ParkingSpot.spot_id.in_(reserved_spot_ids)
-        ).count() if reserved_spot_ids else self.spots.filter_by(status=0).count()
+    def to_dict(self, include_stats=True, stats=None):
+        """
+        转换为字典 - 车位统计来自区域计数器
 
-        return {
+        Args:
+            include_stats (bool): 是否包含车位统计字段
+            stats (dict, optional): 预先读取的区域计数，未提供时从数据库汇总本区域
+        """
+        data = {
             'zone_id': self.zone_id,
             'zone_name': self.zone_name,
             'map_file_path': self.map_file_path,
             'fee_rate': float(self.fee_rate),
             'free_time': self.free_time,
-            'total_spots': self.spots.count(),
-            'available_spots': truly_available
+            'tariff': self.tariff
         }
+        if not include_stats:
+            return data
+
+        from app.utils import zone_counter
+        if stats is None:
+            stats = zone_counter.load_from_db([self.zone_id])[self.zone_id]
+        return zone_counter.apply_to(data, stats)
     
     def __repr__(self):
         return f'<ParkingZone {self.zone_name}>'
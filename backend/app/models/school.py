@@ -21,3 +21,17 @@ class SchoolMember(db.Model):
             'member_type': self.member_type,
             'department': self.department
         }
+
+
+class SchoolMemberMirror(db.Model):
+    """
+    学校师生信息本地镜像 (位于本系统数据库)
+    由定时任务从 school_members 增量同步，注册校验优先查询本表
+    """
+    __tablename__ = 'school_member_mirror'
+    
+    user_no = db.Column(db.String(20), primary_key=True, comment='学号/工号')
+    real_name = db.Column(db.String(50), nullable=False, comment='真实姓名')
+    member_type = db.Column(db.Integer, nullable=False, comment='类型: 1-学生, 2-教职工')
+    department = db.Column(db.String(100), comment='所属院系/部门')
+    synced_at = db.Column(db.DateTime, nullable=False, comment='最近一次写入镜像的时间')
@@ -13,6 +13,7 @@ class SysUser(db.Model):
     balance = db.Column(db.Numeric(10, 2), default=0.00, comment='余额')
     credit_score = db.Column(db.Integer, default=100, comment='信用分')
     is_active = db.Column(db.Boolean, default=True, comment='账号状态')
+    must_reset_password = db.Column(db.Boolean, nullable=False, default=False, comment='首次登录须修改密码')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -30,6 +31,7 @@ class SysUser(db.Model):
             'balance': float(self.balance),
             'credit_score': self.credit_score,
             'is_active': self.is_active,
+            'must_reset_password': self.must_reset_password,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
@@ -4,6 +4,8 @@ from app.services.admin_service import AdminService
 from app.services.user_service import UserService
 from app.services.order_service import OrderService
 from app.services.parking_service import ParkingService
+from app.services.tariff_service import TariffService
+from app.utils import metrics
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -15,6 +17,13 @@ def get_stats(current_user):
     result, status_code = AdminService.get_stats()
     return jsonify(result), status_code
 
+@admin_bp.route('/metrics', methods=['GET'])
+@token_required
+@admin_required
+def get_metrics(current_user):
+    """获取当前 worker 的运行指标 (缓存命中、回源合并等)"""
+    return jsonify({"success": True, "data": metrics.snapshot()}), 200
+
 @admin_bp.route('/config', methods=['GET'])
 @token_required
 def get_system_config(current_user):
@@ -31,6 +40,15 @@ def update_system_config(current_user):
     result, status_code = AdminService.update_system_config(data)
     return jsonify(result), status_code
 
+@admin_bp.route('/tariff/simulate', methods=['POST'])
+@token_required
+@admin_required
+def simulate_tariff(current_user):
+    """按拟调整的计费方案重新计算历史订单，返回按区域/角色/日期汇总的收入变化"""
+    data = request.get_json(silent=True) or {}
+    result, status_code = TariffService.simulate(data)
+    return jsonify(result), status_code
+
 @admin_bp.route('/users', methods=['GET'])
 @token_required
 @admin_required
@@ -41,6 +59,23 @@ def get_users(current_user):
     result, status_code = UserService.get_users_list(page, per_page)
     return jsonify(result), status_code
 
+@admin_bp.route('/users/provision', methods=['POST'])
+@token_required
+@admin_required
+def provision_users(current_user):
+    """按学校名册批量开通账号 (后台执行，返回任务ID)"""
+    data = request.get_json(silent=True) or {}
+    result, status_code = UserService.start_provision(data)
+    return jsonify(result), status_code
+
+@admin_bp.route('/users/provision/<job_id>', methods=['GET'])
+@token_required
+@admin_required
+def get_provision_progress(current_user, job_id):
+    """查询批量开通任务进度"""
+    result, status_code = UserService.get_provision_progress(job_id)
+    return jsonify(result), status_code
+
 @admin_bp.route('/user/update', methods=['POST'])
 @token_required
 @admin_required
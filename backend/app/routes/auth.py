@@ -9,7 +9,8 @@ def login():
     data = request.get_json()
     result, status_code = AuthService.login(
         data.get('user_no'),
-        data.get('password')
+        data.get('password'),
+        data.get('new_password')
     )
     return jsonify(result), status_code
 
@@ -1,6 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response, current_app
 from app.utils.auth_utils import token_required
 from app.services.parking_service import ParkingService, parking_service
+from app.services.lpr_engine import LprBusyError, LprTimeoutError
+from app.utils.image_preprocess import read_upload, ImageTooLargeError
 
 parking_bp = Blueprint('parking', __name__)
 
@@ -14,10 +16,26 @@ def get_zones(current_user):
 @parking_bp.route('/spots', methods=['GET'])
 @token_required
 def get_spots(current_user):
-    """获取车位实时状态"""
+    """获取车位实时状态 (单区域支持 ETag 条件请求及 ?since=<version> 增量模式)"""
     zone_id = request.args.get('zone_id', type=int)
-    result, status_code = ParkingService.get_spots(zone_id)
-    return jsonify(result), status_code
+    since = request.args.get('since', type=int)
+    use_etag = bool(zone_id) and since is None
+
+    if use_etag:
+        # 版本未变化时直接 304，无需读取索引及序列化车位列表
+        version = ParkingService.get_spots_version(zone_id)
+        use_etag = version is not None
+        if use_etag and request.if_none_match.contains(f'spots-{zone_id}-{version}'):
+            response = make_response('', 304)
+            response.set_etag(f'spots-{zone_id}-{version}')
+            return response
+
+    result, status_code = ParkingService.get_spots(zone_id, since=since)
+    response = make_response(jsonify(result), status_code)
+    if use_etag and status_code == 200:
+        response.set_etag(f'spots-{zone_id}-{result["version"]}')
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @parking_bp.route('/enter', methods=['POST'])
 def vehicle_enter():
@@ -50,23 +68,65 @@ def recognize_plate():
         if image_file.filename == '':
             return jsonify({"success": False, "message": "请选择图片"}), 400
         
-        # 读取图像数据
-        image_data = image_file.read()
+        # 从上传流读取图像数据 (超出大小上限时立即停止读取)
+        image_data = read_upload(image_file, current_app.config.get('LPR_UPLOAD_MAX_BYTES', 8 * 1024 * 1024))
         
         # 识别车牌
-        plate_number = parking_service.recognize_plate_from_image(image_data)
+        plate_number = parking_service.recognize_plate_from_image(image_data, request.form.get('camera_id'))
         
         if plate_number:
             return jsonify({"success": True, "plate_number": plate_number}), 200
         else:
             return jsonify({"success": False, "message": "未能识别车牌"}), 404
-            
+
+    except ImageTooLargeError as e:
+        return jsonify({"success": False, "message": str(e)}), 413
+    except LprBusyError as e:
+        return jsonify({"success": False, "message": str(e)}), 503
+    except LprTimeoutError as e:
+        return jsonify({"success": False, "message": str(e)}), 504
+    except Exception as e:
+        return jsonify({"success": False, "message": f"识别失败: {str(e)}"}), 500
+
+@parking_bp.route('/lpr/status', methods=['GET'])
+def lpr_status():
+    """车牌识别就绪检查 (未就绪时返回 503)"""
+    status = parking_service.lpr_status()
+    return jsonify({"success": status["ready"], "data": status}), 200 if status["ready"] else 503
+
+@parking_bp.route('/recognize-plate/batch', methods=['POST'])
+def recognize_plate_batch():
+    """批量车牌识别接口 (同一车辆的多张图像，返回逐张结果及共识车牌)"""
+    try:
+        image_files = [f for f in request.files.getlist('images') if f.filename != '']
+        if not image_files:
+            return jsonify({"success": False, "message": "请上传图片"}), 400
+
+        max_images = current_app.config.get('LPR_BATCH_MAX_IMAGES', 8)
+        if len(image_files) > max_images:
+            return jsonify({"success": False, "message": f"单次最多上传 {max_images} 张图片"}), 400
+
+        max_bytes = current_app.config.get('LPR_UPLOAD_MAX_BYTES', 8 * 1024 * 1024)
+        result = parking_service.recognize_plate_batch([read_upload(f, max_bytes) for f in image_files])
+        for item, image_file in zip(result["results"], image_files):
+            item["filename"] = image_file.filename
+
+        if result["consensus"]:
+            return jsonify({"success": True, "plate_number": result["consensus"]["plate_number"], **result}), 200
+        return jsonify({"success": False, "message": "未能识别车牌", **result}), 404
+
+    except ImageTooLargeError as e:
+        return jsonify({"success": False, "message": str(e)}), 413
+    except LprBusyError as e:
+        return jsonify({"success": False, "message": str(e)}), 503
+    except LprTimeoutError as e:
+        return jsonify({"success": False, "message": str(e)}), 504
     except Exception as e:
         return jsonify({"success": False, "message": f"识别失败: {str(e)}"}), 500
 
 def register_socketio_events(socketio_instance):
     """注册WebSocket事件"""
-    from flask_socketio import join_room, leave_room
+    from flask_socketio import join_room, leave_room, rooms, emit
     from app.utils.auth_utils import decode_token
     from flask import request
 
@@ -93,3 +153,32 @@ def register_socketio_events(socketio_instance):
     @socketio_instance.on('disconnect')
     def handle_disconnect():
         print('Client disconnected')
+
+    @socketio_instance.on('subscribe_zone')
+    def handle_subscribe_zone(data):
+        """
+        订阅区域车位变更: {zone_id, version}
+        加入 zone_{id} 房间，并按客户端已持有的版本号补发错过的变更 (超出变更日志范围时下发全量)
+        """
+        if not any(room.startswith('user_') for room in rooms()):
+            return {'success': False, 'message': '缺少认证token'}
+
+        try:
+            zone_id = int((data or {}).get('zone_id'))
+        except (TypeError, ValueError):
+            return {'success': False, 'message': '区域ID不能为空'}
+        since = (data or {}).get('version')
+        since = int(since) if isinstance(since, int) or (isinstance(since, str) and since.isdigit()) else None
+
+        # 先入房间再计算增量，保证两者之间发生的变更不会遗漏 (客户端按版本号去重)
+        join_room(f"zone_{zone_id}")
+        emit('spot_sync', ParkingService.sync_zone(zone_id, since))
+        return {'success': True}
+
+    @socketio_instance.on('unsubscribe_zone')
+    def handle_unsubscribe_zone(data):
+        """退订区域车位变更"""
+        zone_id = (data or {}).get('zone_id')
+        if zone_id is not None:
+            leave_room(f"zone_{zone_id}")
+        return {'success': True}
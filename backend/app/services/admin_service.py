@@ -2,7 +2,7 @@
 管理端服务模块，提供数据统计和系统配置管理等功能。
 """
 
-from sqlalchemy import func, and_
+from sqlalchemy import func
 from datetime import datetime, timedelta
 from decimal import Decimal
 import json
@@ -10,6 +10,7 @@ from app.extensions import db
 from app.models.order import ParkingOrder
 from app.models.parking import ParkingSpot
 from app.models.config import SysConfig
+from app.utils import config_snapshot, revenue_rollup
 
 
 class AdminService:
@@ -26,15 +27,10 @@ class AdminService:
         today = datetime.utcnow().date()
         yesterday = today - timedelta(days=1)
 
-        today_revenue = db.session.query(func.sum(ParkingOrder.total_fee)).filter(
-            and_(ParkingOrder.status == 3, func.date(ParkingOrder.pay_time) == today)
-        ).scalar() or Decimal("0.00")
-
-        yesterday_revenue = db.session.query(func.sum(ParkingOrder.total_fee)).filter(
-            and_(
-                ParkingOrder.status == 3, func.date(ParkingOrder.pay_time) == yesterday
-            )
-        ).scalar() or Decimal("0.00")
+        # 最近 7 天营收读取每日汇总表 (订单状态变更时增量维护)
+        daily_revenue = revenue_rollup.daily_totals(today - timedelta(days=6), today)
+        today_revenue = daily_revenue.get(today, Decimal("0.00"))
+        yesterday_revenue = daily_revenue.get(yesterday, Decimal("0.00"))
 
         growth = 0
         if yesterday_revenue > 0:
@@ -60,11 +56,8 @@ class AdminService:
         revenue_trend = []
         for i in range(6, -1, -1):
             date = today - timedelta(days=i)
-            daily_revenue = db.session.query(func.sum(ParkingOrder.total_fee)).filter(
-                and_(ParkingOrder.status == 3, func.date(ParkingOrder.pay_time) == date)
-            ).scalar() or Decimal("0.00")
             revenue_trend.append(
-                {"date": date.isoformat(), "revenue": float(daily_revenue)}
+                {"date": date.isoformat(), "revenue": float(daily_revenue.get(date, 0))}
             )
 
         total_spots = ParkingSpot.query.count()
@@ -128,7 +121,7 @@ class AdminService:
                     if isinstance(default_val, (dict, list))
                     else str(default_val)
                 )
-                SysConfig.set_value(key, val_to_store)
+                SysConfig.set_value(key, val_to_store, notify=False)
                 return default_val
 
         data = {
@@ -181,35 +174,38 @@ class AdminService:
             if "credit_thresholds" in data:
                 c = data["credit_thresholds"]
                 if "min" in c:
-                    SysConfig.set_value("MIN_CREDIT_SCORE", c["min"])
+                    SysConfig.set_value("MIN_CREDIT_SCORE", c["min"], notify=False)
                 if "good" in c:
-                    SysConfig.set_value("GOOD_CREDIT_SCORE", c["good"])
+                    SysConfig.set_value("GOOD_CREDIT_SCORE", c["good"], notify=False)
                 if "perfect" in c:
-                    SysConfig.set_value("PERFECT_CREDIT_SCORE", c["perfect"])
+                    SysConfig.set_value("PERFECT_CREDIT_SCORE", c["perfect"], notify=False)
 
             if "roles" in data:
-                SysConfig.set_value("ROLE_DISCOUNT", json.dumps(data["roles"]))
+                SysConfig.set_value("ROLE_DISCOUNT", json.dumps(data["roles"]), notify=False)
 
             if "violation_fee" in data:
-                SysConfig.set_value("VIOLATION_FEE", data["violation_fee"])
+                SysConfig.set_value("VIOLATION_FEE", data["violation_fee"], notify=False)
 
             if "reservation_timeout" in data:
                 SysConfig.set_value(
-                    "RESERVATION_TIMEOUT_MINUTES", data["reservation_timeout"]
+                    "RESERVATION_TIMEOUT_MINUTES", data["reservation_timeout"], notify=False
                 )
 
             if "fee_multiplier" in data:
-                SysConfig.set_value("FEE_MULTIPLIER", data["fee_multiplier"])
+                SysConfig.set_value("FEE_MULTIPLIER", data["fee_multiplier"], notify=False)
 
             if "payment_timeout" in data:
-                SysConfig.set_value("PAYMENT_TIMEOUT_HOURS", data["payment_timeout"])
+                SysConfig.set_value("PAYMENT_TIMEOUT_HOURS", data["payment_timeout"], notify=False)
 
             if "penalty_timeout" in data:
-                SysConfig.set_value("CREDIT_PENALTY_TIMEOUT", data["penalty_timeout"])
+                SysConfig.set_value("CREDIT_PENALTY_TIMEOUT", data["penalty_timeout"], notify=False)
 
             if "penalty_delay" in data:
-                SysConfig.set_value("CREDIT_PENALTY_DELAY", data["penalty_delay"])
+                SysConfig.set_value("CREDIT_PENALTY_DELAY", data["penalty_delay"], notify=False)
 
             return {"success": True, "message": "配置更新成功，已实时生效"}, 200
         except Exception as e:
             return {"success": False, "message": f"更新失败: {str(e)}"}, 500
+        finally:
+            # 全部写入后只递增一次配置版本 (部分写入失败时同样需要)，各 worker 重新加载配置快照
+            config_snapshot.bump()
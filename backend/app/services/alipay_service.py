@@ -8,6 +8,7 @@ from datetime import datetime
 from app.models.order import ParkingOrder
 from app.extensions import db
 from app.utils.service_utils import handle_service_exception
+from app.utils import reservation_claims, revenue_rollup
 
 
 class AlipayService:
@@ -154,7 +155,11 @@ class AlipayService:
                     order.pay_time = datetime.utcnow()
                     order.pay_way = 2
                     order.trade_no = result.get("trade_no")
+                    revenue_rollup.record(order)
                     db.session.commit()
+                    reservation_claims.release_active(
+                        order.plate_number, order.user_id
+                    )
 
                     current_app.logger.info(f"订单 {out_trade_no} 支付宝支付核销完成")
 
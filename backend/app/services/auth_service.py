@@ -7,19 +7,23 @@ from app.extensions import db
 from app.models.user import SysUser
 from app.utils.auth_utils import hash_password, verify_password, generate_token
 from app.utils.validators import validate_user_no
+from app.utils import principal_cache, session_registry, password_hasher, metrics, roster_mirror
+from app.utils.password_hasher import PasswordHashBusyError
 
 
 class AuthService:
     """认证服务类"""
 
     @staticmethod
-    def login(user_no, password):
+    def login(user_no, password, new_password=None):
         """
         处理用户登录业务逻辑。
+        批量开通的账号 (must_reset_password) 须在首次登录时同时提交新密码，否则返回 403 且不签发 token。
 
         Args:
             user_no (str): 学号/工号
             password (str): 登录密码
+            new_password (str, optional): 首次登录须修改密码时提交的新密码
 
         Returns:
             tuple: 包含响应字典 (dict) 和 HTTP 状态码 (int) 的元组，格式为 ({'success': bool, 'message': str, 'data': dict}, int)
@@ -34,14 +38,46 @@ class AuthService:
         if not user.is_active:
             return {"success": False, "message": "账号已被禁用"}, 403
 
-        if not verify_password(user.password, password):
-            return {"success": False, "message": "密码错误"}, 401
-
-        token = generate_token(user.user_id, user.role)
+        try:
+            if not verify_password(user.password, password):
+                return {"success": False, "message": "密码错误"}, 401
+        except PasswordHashBusyError as e:
+            return {"success": False, "message": str(e)}, 503
+
+        if user.must_reset_password:
+            if not new_password:
+                return {
+                    "success": False,
+                    "message": "首次登录请修改初始密码",
+                    "data": {"must_reset_password": True},
+                }, 403
+            if len(new_password) < 6:
+                return {"success": False, "message": "密码长度至少6位"}, 400
+            if new_password == password:
+                return {"success": False, "message": "新密码不能与初始密码相同"}, 400
+            try:
+                user.password = hash_password(new_password)
+                user.must_reset_password = False
+                db.session.commit()
+            except PasswordHashBusyError as e:
+                db.session.rollback()
+                return {"success": False, "message": str(e)}, 503
+        elif password_hasher.needs_rehash(user.password):
+            # 已存哈希的算法或强度与当前配置不同时，借登录时的明文密码透明升级
+            try:
+                user.password = hash_password(password)
+                db.session.commit()
+                metrics.incr("password_hash.rehash")
+            except PasswordHashBusyError:
+                db.session.rollback()
+
+        # 递增会话代次，此前签发的 token 在各 worker 本地校验时即被拒绝
+        token = generate_token(user.user_id, user.role, session_registry.new_session(user.user_id))
 
         import app.extensions
 
         if app.extensions.redis_client:
+            # 兼容升级前签发的 (不含会话代次的) token
             app.extensions.redis_client.set(
                 f"user_session:{user.user_id}",
                 token,
@@ -54,6 +90,9 @@ class AuthService:
                 room=f"user_{user.user_id}",
             )
 
+        # 旧 token 已被新会话取代，各 worker 缓存的身份立即失效
+        principal_cache.invalidate_user(user.user_id)
+
         return {
             "success": True,
             "message": "登录成功",
@@ -74,8 +113,6 @@ class AuthService:
         Returns:
             tuple: 包含响应字典 (dict) 和 HTTP 状态码 (int) 的元组
         """
-        from app.models.school import SchoolMember
-
         if not user_no or not username or not password:
             return {"success": False, "message": "请填写完整注册信息"}, 400
 
@@ -88,9 +125,12 @@ class AuthService:
         if SysUser.query.filter_by(user_no=user_no).first():
             return {"success": False, "message": "该账号已在系统中注册"}, 409
 
-        school_record = SchoolMember.query.filter_by(
-            user_no=user_no, real_name=username
-        ).first()
+        # 优先查询本地名册镜像，镜像中没有该学号/工号时回源学校数据库
+        school_record = roster_mirror.find_member(
+            user_no,
+            username,
+            current_app.config.get("ROSTER_MIRROR_MAX_LAG_MINUTES", 60) * 60,
+        )
 
         if not school_record:
             # 安全提示: 不明确告知是学号不存在还是姓名不匹配，增加破解难度
@@ -101,10 +141,15 @@ class AuthService:
 
         role = school_record.member_type
 
+        try:
+            password_hash = hash_password(password)
+        except PasswordHashBusyError as e:
+            return {"success": False, "message": str(e)}, 503
+
         new_user = SysUser(
             user_no=user_no,
             username=username,
-            password=hash_password(password),
+            password=password_hash,
             role=role,
             credit_score=100,
             balance=0.00,
@@ -114,7 +159,9 @@ class AuthService:
             db.session.add(new_user)
             db.session.commit()
 
-            token = generate_token(new_user.user_id, new_user.role)
+            token = generate_token(
+                new_user.user_id, new_user.role, session_registry.new_session(new_user.user_id)
+            )
 
             import app.extensions
 
@@ -160,8 +207,11 @@ class AuthService:
 
         try:
             user.password = hash_password(new_password)
+            user.must_reset_password = False
             db.session.commit()
             return {"success": True, "message": "密码重置成功"}, 200
+        except PasswordHashBusyError as e:
+            return {"success": False, "message": str(e)}, 503
         except Exception as e:
             db.session.rollback()
             return {"success": False, "message": f"密码重置失败: {str(e)}"}, 500
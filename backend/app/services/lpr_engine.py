@@ -0,0 +1,432 @@
+"""
+车牌识别引擎模块，在独立的进程池中执行图像解码与车牌识别推理，避免 CPU 密集的推理阻塞 Web 进程的事件循环。
+
+识别后端由 LPR_BACKEND 选择：
+    hyperlpr   HyperLPR3 自带的检测 + 识别 (默认)
+    yolo       YOLO 检测车牌区域，再由 HyperLPR3 识别各区域 (需安装 ultralytics)
+    onnx       ONNX Runtime 检测 + 识别，可选 int8 量化 (需安装 onnxruntime，见 lpr_onnx)
+
+每个工作进程启动时只加载一次模型并在样例图像上预热推理；提交队列有界，队列满时立即拒绝 (背压)，
+单次识别超时后放弃等待。引擎状态 cold -> warming -> ready (预热失败为 failed) 供就绪检查使用。运行指标：
+    lpr.queue_depth (gauge)        当前排队及执行中的识别任务数
+    lpr.ready (gauge)              引擎是否已完成预热
+    lpr.startup (timing)           单个进程的模型导入与加载耗时
+    lpr.first_inference (timing)   单个进程的首次 (预热) 推理耗时
+    lpr.warmup (timing)            整个进程池完成预热的耗时
+    lpr.inference (timing)         工作进程内解码 + 推理耗时
+    lpr.request (timing)           含排队等待的端到端耗时
+    lpr.batch_request (timing)     批量识别的端到端耗时
+    lpr.rejected / lpr.timeouts / lpr.worker_restarts (counter)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from app.utils import metrics, image_preprocess
+
+
+class LprBusyError(Exception):
+    """识别队列已满"""
+
+
+class LprTimeoutError(Exception):
+    """识别超时"""
+
+
+def recognizer_options(app_config):
+    """从应用配置提取识别后端参数 (可跨进程传递)"""
+    return {
+        "yolo_weights": app_config.get("LPR_YOLO_WEIGHTS"),
+        "onnx_recognizer": app_config.get("LPR_ONNX_RECOGNIZER"),
+        "onnx_detector": app_config.get("LPR_ONNX_DETECTOR") or None,
+        "onnx_quantize": app_config.get("LPR_ONNX_QUANTIZE", False),
+        "onnx_threads": app_config.get("LPR_ONNX_THREADS", 1),
+        "onnx_charset": app_config.get("LPR_ONNX_CHARSET") or None,
+    }
+
+
+def build_recognizer(backend="hyperlpr", options=None, region_hook=None):
+    """
+    按后端加载模型并返回识别函数，只导入所选后端需要的库。
+
+    Args:
+        backend (str): hyperlpr / yolo / onnx
+        options (dict, optional): recognizer_options() 返回的后端参数
+        region_hook (callable, optional): ONNX 后端的车牌区域后处理
+
+    Returns:
+        callable: image -> [(车牌, 置信度), ...]
+    """
+    options = options or {}
+    if backend == "onnx":
+        from app.services.lpr_onnx import OnnxPlateRecognizer
+
+        return OnnxPlateRecognizer(
+            options["onnx_recognizer"],
+            detector_path=options.get("onnx_detector"),
+            quantize=options.get("onnx_quantize", False),
+            threads=options.get("onnx_threads", 1),
+            region_hook=region_hook,
+            charset=options.get("onnx_charset"),
+        )
+
+    from hyperlpr3 import LicensePlateCatcher
+
+    catcher = LicensePlateCatcher()
+    if backend == "hyperlpr":
+        return lambda img: parse_lpr_result(catcher(img))
+
+    if backend == "yolo":
+        from ultralytics import YOLO
+
+        detector = YOLO(options.get("yolo_weights"))
+
+        def recognize(img):
+            candidates = []
+            for result in detector(img, verbose=False):
+                for x1, y1, x2, y2 in result.boxes.xyxy.tolist():
+                    plate_img = img[int(y1):int(y2), int(x1):int(x2)]
+                    if plate_img.size:
+                        candidates.extend(parse_lpr_result(catcher(plate_img)))
+            return candidates
+
+        return recognize
+
+    raise ValueError(f"未知的车牌识别后端: {backend}")
+
+
+def load_warmup_image(path=None):
+    """
+    读取预热用样例图像；未配置或读取失败时生成一张带蓝底白字车牌区域的合成图像。
+
+    预热只为触发模型的惰性初始化与首次推理开销，不要求图像能识别出车牌。
+    """
+    import cv2
+    import numpy
+
+    if path and os.path.isfile(path):
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is not None:
+            return img
+
+    img = numpy.full((480, 640, 3), 128, numpy.uint8)
+    cv2.rectangle(img, (220, 300), (420, 360), (160, 60, 20), -1)
+    cv2.putText(img, "A12345", (238, 344), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)
+    return img
+
+
+# ---- 工作进程侧 ----
+
+_worker_recognizer = None
+_worker_timings = {}
+
+
+def _init_worker(backend, options, warmup, warmup_image):
+    """工作进程初始化：加载一次识别模型，按配置在样例图像上预热"""
+    global _worker_recognizer, _worker_timings
+
+    start = time.perf_counter()
+    _worker_recognizer = build_recognizer(backend, options)
+    _worker_timings = {"pid": os.getpid(), "startup": time.perf_counter() - start}
+
+    if warmup:
+        img = load_warmup_image(warmup_image)
+        start = time.perf_counter()
+        _worker_recognizer(img)
+        _worker_timings["first_inference"] = time.perf_counter() - start
+
+
+def _report_worker():
+    """返回当前工作进程的加载与预热耗时"""
+    return _worker_timings
+
+
+def parse_lpr_result(result_lpr):
+    """
+    将 HyperLPR 输出统一为 [(车牌, 置信度), ...]，过滤无效结果。
+
+    HyperLPR3 每项为 [车牌, 置信度, 类型, 坐标]，兼容旧版本的 dict / 字符串输出。
+    """
+    candidates = []
+    for item in result_lpr or []:
+        if isinstance(item, (list, tuple)):
+            plate_text = item[0] if len(item) > 0 else None
+            confidence = float(item[1]) if len(item) > 1 else 0.0
+        elif isinstance(item, dict):
+            plate_text = item.get("license", None)
+            confidence = float(item.get("confidence", item.get("score", 0.0)) or 0.0)
+        else:
+            plate_text = str(item)
+            confidence = 0.0
+        if plate_text and plate_text != "UNKNOWN":
+            candidates.append((plate_text, confidence))
+    return candidates
+
+
+def _recognize_in_worker(image_data, reduce=1, roi=None):
+    """
+    工作进程内执行解码与推理。
+
+    Args:
+        reduce (int): 缩小解码倍数
+        roi (tuple, optional): 比例 ROI
+
+    Returns:
+        tuple: ([(车牌, 置信度), ...], 耗时秒数)
+    """
+    start = time.perf_counter()
+    img = image_preprocess.decode(image_data, reduce, roi)
+    if img is None:
+        return [], time.perf_counter() - start
+    candidates = _worker_recognizer(img)
+    return candidates, time.perf_counter() - start
+
+
+def _recognize_batch_in_worker(images):
+    """工作进程内依次识别一组图像，一次进程间往返返回全部结果"""
+    return [_recognize_in_worker(image_data) for image_data in images]
+
+
+# ---- Web 进程侧 ----
+
+class LprEngine:
+    """车牌识别进程池"""
+
+    def __init__(self, workers=2, queue_size=8, timeout=10.0, backend="hyperlpr",
+                 options=None, warmup=True, warmup_image=None):
+        """
+        Args:
+            workers (int): 工作进程数
+            queue_size (int): 允许同时排队及执行的最大任务数
+            timeout (float): 单次识别的默认超时时间 (秒)
+            backend (str): 识别后端 hyperlpr / yolo / onnx
+            options (dict, optional): recognizer_options() 返回的后端参数
+            warmup (bool): 工作进程启动时是否预热推理
+            warmup_image (str, optional): 预热样例图像路径，缺省时使用合成图像
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.backend = backend
+        self.warmup = warmup
+        self._initargs = (backend, options or {}, warmup, warmup_image)
+        self.state = "cold"
+        self.timings = {}
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._in_flight = 0
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn 启动的子进程不继承 Web 进程的事件循环及 monkey patch 状态
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=self._initargs,
+                )
+            return self._pool
+
+    def _restart_pool(self, broken_pool):
+        """工作进程异常退出后重建进程池"""
+        with self._pool_lock:
+            restarted = broken_pool is not None and self._pool is broken_pool
+            if restarted:
+                self._pool = None
+                self._set_state("cold")
+                metrics.incr("lpr.worker_restarts")
+        if broken_pool:
+            broken_pool.shutdown(wait=False, cancel_futures=True)
+        if restarted and self.warmup:
+            self.start_warm_up()
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.gauge("lpr.ready", 1 if state == "ready" else 0)
+
+    def warm_up(self):
+        """
+        启动全部工作进程，等待模型加载与预热推理完成后将引擎置为就绪。
+
+        Returns:
+            bool: 是否预热成功
+        """
+        self._set_state("warming")
+        start = time.perf_counter()
+        try:
+            pool = self._get_pool()
+            # 进程池按需创建进程：同时提交与进程数相同的任务，使每个进程都完成初始化
+            futures = [pool.submit(_report_worker) for _ in range(self.workers)]
+            for future in futures:
+                timing = future.result()
+                if timing["pid"] not in self.timings:
+                    self.timings[timing["pid"]] = timing
+                    metrics.observe("lpr.startup", timing["startup"])
+                    if "first_inference" in timing:
+                        metrics.observe("lpr.first_inference", timing["first_inference"])
+        except Exception as e:
+            self._set_state("failed")
+            print(f"车牌识别引擎预热失败: {str(e)}")
+            return False
+        metrics.observe("lpr.warmup", time.perf_counter() - start)
+        self._set_state("ready")
+        return True
+
+    def start_warm_up(self):
+        """在后台线程中预热，不阻塞调用方启动"""
+        self._set_state("warming")
+        threading.Thread(target=self.warm_up, name="lpr-warmup", daemon=True).start()
+
+    def _track(self, delta):
+        with self._pool_lock:
+            self._in_flight += delta
+            metrics.gauge("lpr.queue_depth", self._in_flight)
+
+    def _submit(self, fn, *args):
+        """占用一个队列名额并提交任务，名额在任务真正结束时归还"""
+        if not self._slots.acquire(blocking=False):
+            metrics.incr("lpr.rejected")
+            raise LprBusyError("车牌识别繁忙，请稍后重试")
+
+        self._track(1)
+        pool = None
+        try:
+            pool = self._get_pool()
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            self._release_slot()
+            self._restart_pool(pool)
+            raise
+        except Exception:
+            self._release_slot()
+            raise
+        # 超时放弃等待的任务仍占用名额，直到工作进程真正执行完毕
+        future.add_done_callback(lambda _: self._release_slot())
+        return pool, future
+
+    def _wait(self, pool, future, deadline):
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            future.cancel()
+            metrics.incr("lpr.timeouts")
+            raise LprTimeoutError("车牌识别超时")
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            raise
+
+    def recognize(self, image_data, timeout=None, reduce=1, roi=None):
+        """
+        提交一次识别并等待结果。
+
+        在 eventlet 下 future.result 使用已被 patch 的条件变量等待，只挂起当前协程。
+
+        Args:
+            image_data (bytes | numpy.ndarray): 原始图片字节或已解码的图像
+            timeout (float, optional): 超时时间，默认使用引擎配置
+            reduce (int): 缩小解码倍数 (见 image_preprocess)
+            roi (tuple, optional): 比例 ROI
+
+        Returns:
+            list: [(车牌, 置信度), ...]，按置信度降序
+
+        Raises:
+            LprBusyError: 队列已满
+            LprTimeoutError: 超时未完成
+        """
+        start = time.perf_counter()
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        pool, future = self._submit(_recognize_in_worker, image_data, reduce, roi)
+        try:
+            candidates, elapsed = self._wait(pool, future, deadline)
+        finally:
+            metrics.observe("lpr.request", time.perf_counter() - start)
+
+        metrics.observe("lpr.inference", elapsed)
+        if self.state == "cold":
+            self._set_state("ready")
+        return sorted(candidates, key=lambda c: c[1], reverse=True)
+
+    def recognize_batch(self, images, timeout=None):
+        """
+        批量识别：图像按工作进程数分片并行解码与推理，每个分片只占用一个队列名额和一次进程间往返。
+
+        Args:
+            images (list): 图片字节或已解码图像的列表
+            timeout (float, optional): 整批的超时时间，默认使用引擎配置
+
+        Returns:
+            list: 与输入顺序一致的候选列表，每项为 [(车牌, 置信度), ...]
+
+        Raises:
+            LprBusyError: 队列名额不足以容纳整批分片
+            LprTimeoutError: 超时未完成
+        """
+        if not images:
+            return []
+
+        start = time.perf_counter()
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        chunk_count = min(self.workers, len(images))
+        chunks = [images[i::chunk_count] for i in range(chunk_count)]
+
+        submitted = []
+        try:
+            for chunk in chunks:
+                submitted.append(self._submit(_recognize_batch_in_worker, chunk))
+        except Exception:
+            for _, future in submitted:
+                future.cancel()
+            raise
+
+        results = [None] * len(images)
+        try:
+            for i, (pool, future) in enumerate(submitted):
+                for j, (candidates, elapsed) in enumerate(self._wait(pool, future, deadline)):
+                    metrics.observe("lpr.inference", elapsed)
+                    results[i + j * chunk_count] = sorted(
+                        candidates, key=lambda c: c[1], reverse=True
+                    )
+        except Exception:
+            for _, future in submitted:
+                future.cancel()
+            raise
+        finally:
+            metrics.observe("lpr.batch_request", time.perf_counter() - start)
+        return results
+
+    def _release_slot(self):
+        self._track(-1)
+        self._slots.release()
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(app_config):
+    """按应用配置获取进程级单例引擎"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = LprEngine(
+                workers=app_config.get("LPR_WORKERS", 2),
+                queue_size=app_config.get("LPR_QUEUE_SIZE", 8),
+                timeout=app_config.get("LPR_TIMEOUT_SECONDS", 10),
+                backend=app_config.get("LPR_BACKEND", "hyperlpr"),
+                options=recognizer_options(app_config),
+                warmup=app_config.get("LPR_WARMUP", True),
+                warmup_image=app_config.get("LPR_WARMUP_IMAGE"),
+            )
+        return _engine
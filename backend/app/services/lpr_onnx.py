@@ -0,0 +1,250 @@
+"""
+ONNX Runtime 两阶段车牌识别后端 (LPR_BACKEND=onnx)，面向仅有 CPU 的道闸服务器。
+
+    检测   YOLOv8 格式的单类车牌检测模型，输出 [1, 5, N] (cx, cy, w, h, score)；未配置时整幅图像视为车牌区域
+    裁剪   process_plate_region 将检测框区域缩放、补边并归一化为识别模型输入
+    识别   CRNN 类识别模型，输出 [1, T, C] 的逐时间步字符概率，按 CTC 贪心解码
+
+识别模型可在首次加载时做 int8 动态量化 (LPR_ONNX_QUANTIZE)，量化结果缓存在原模型旁的 *.int8.onnx 文件中。
+
+识别字符表 (不含下标 0 的空白符) 依次取自：LPR_ONNX_CHARSET 配置 (字符串或每行一个字符的文件)、
+识别模型元数据中的 charset 字段、内置 PLATE_CHARS。加载时校验字符表长度与模型输出的类别数一致，
+不一致时抛出 ValueError，避免标签顺序不同的模型静默输出乱码。
+"""
+
+import os
+
+# 默认 CTC 字符表，下标 0 为空白符
+PLATE_CHARS = (
+    ["<blank>"]
+    + list("京沪津渝冀晋蒙辽吉黑苏浙皖闽赣鲁豫鄂湘粤桂琼川贵云藏陕甘青宁新")
+    + list("0123456789")
+    + list("ABCDEFGHJKLMNPQRSTUVWXYZ")
+    + list("学警港澳挂使领民航危险品")
+)
+
+# 识别模型输入 (高, 宽)
+RECOGNIZER_INPUT_SIZE = (48, 160)
+DETECTOR_INPUT_SIZE = 640
+
+# 识别模型元数据中保存字符表的字段
+CHARSET_METADATA_KEY = "charset"
+
+
+def parse_charset(value):
+    """
+    解析字符表配置：已存在的文件按行读取 (每行一个字符)，否则按字符串逐字拆分。
+
+    Returns:
+        list: 含下标 0 空白符的 CTC 字符表
+    """
+    if os.path.isfile(value):
+        with open(value, encoding="utf-8") as f:
+            chars = [line.rstrip("\r\n") for line in f if line.rstrip("\r\n")]
+    else:
+        chars = list(value.strip())
+    if len(set(chars)) != len(chars):
+        raise ValueError("车牌字符表中存在重复字符")
+    return ["<blank>"] + chars
+
+
+def resolve_charset(session, charset=None):
+    """
+    确定识别模型的字符表，并校验其长度与模型输出的类别数一致。
+
+    Args:
+        session: 识别模型的 InferenceSession
+        charset (str, optional): LPR_ONNX_CHARSET 配置
+
+    Returns:
+        list: 含空白符的 CTC 字符表
+
+    Raises:
+        ValueError: 字符表长度与模型输出类别数不一致
+    """
+    import numpy
+
+    if charset:
+        chars = parse_charset(charset)
+    else:
+        metadata = session.get_modelmeta().custom_metadata_map or {}
+        chars = parse_charset(metadata[CHARSET_METADATA_KEY]) if metadata.get(CHARSET_METADATA_KEY) else PLATE_CHARS
+
+    classes = session.get_outputs()[0].shape[-1]
+    if not isinstance(classes, int):
+        # 输出维度为动态时以空白输入推理一次得到类别数
+        height, width = RECOGNIZER_INPUT_SIZE
+        blank = numpy.zeros((1, 3, height, width), numpy.float32)
+        classes = session.run(None, {session.get_inputs()[0].name: blank})[0].shape[-1]
+    if classes != len(chars):
+        raise ValueError(
+            f"识别模型输出 {classes} 个类别，与字符表长度 {len(chars)} (含空白符) 不一致，"
+            f"请通过 LPR_ONNX_CHARSET 或模型元数据 {CHARSET_METADATA_KEY} 提供与模型一致的字符表"
+        )
+    return chars
+
+
+def quantized_model_path(model_path):
+    """
+    返回 int8 动态量化后的模型路径，不存在时生成。
+
+    多个工作进程可能同时生成，先写临时文件再原子替换。
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    root, ext = os.path.splitext(model_path)
+    output_path = f"{root}.int8{ext}"
+    if not os.path.isfile(output_path):
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, output_path)
+    return output_path
+
+
+def process_plate_region(plate_img, input_size=RECOGNIZER_INPUT_SIZE):
+    """
+    车牌区域裁剪后处理：保持宽高比缩放至识别模型高度，右侧补边至固定宽度，归一化为 NCHW float32。
+
+    Args:
+        plate_img (numpy.ndarray): BGR 车牌区域图像
+        input_size (tuple): 识别模型输入 (高, 宽)
+
+    Returns:
+        numpy.ndarray: 形状 [1, 3, 高, 宽]，取值 [-1, 1]
+    """
+    import cv2
+    import numpy
+
+    height, width = input_size
+    scaled_width = min(width, max(1, int(round(plate_img.shape[1] * height / plate_img.shape[0]))))
+    resized = cv2.resize(plate_img, (scaled_width, height), interpolation=cv2.INTER_LINEAR)
+    canvas = numpy.zeros((height, width, 3), numpy.float32)
+    canvas[:, :scaled_width] = resized.astype(numpy.float32) / 127.5 - 1.0
+    return canvas.transpose(2, 0, 1)[numpy.newaxis]
+
+
+def ctc_greedy_decode(probs, charset=PLATE_CHARS):
+    """
+    CTC 贪心解码：逐时间步取最大概率字符，合并连续重复并去掉空白符。
+
+    Args:
+        probs (numpy.ndarray): [T, C] 概率或 logits
+        charset (list): 含下标 0 空白符的字符表
+
+    Returns:
+        tuple: (车牌文本, 保留字符的平均概率)
+    """
+    import numpy
+
+    if not numpy.allclose(probs.sum(axis=1), 1.0, atol=1e-3):
+        exp = numpy.exp(probs - probs.max(axis=1, keepdims=True))
+        probs = exp / exp.sum(axis=1, keepdims=True)
+
+    indices = probs.argmax(axis=1)
+    text, scores = [], []
+    previous = 0
+    for step, index in enumerate(indices):
+        if index != previous and index != 0 and index < len(charset):
+            text.append(charset[index])
+            scores.append(float(probs[step, index]))
+        previous = index
+    if not text:
+        return "", 0.0
+    return "".join(text), sum(scores) / len(scores)
+
+
+class OnnxPlateRecognizer:
+    """ONNX Runtime 车牌检测 + 识别"""
+
+    def __init__(self, recognizer_path, detector_path=None, quantize=False, threads=1,
+                 score_threshold=0.4, region_hook=None, charset=None):
+        """
+        Args:
+            recognizer_path (str): 识别模型路径
+            detector_path (str, optional): 检测模型路径，缺省时整幅图像作为车牌区域 (摄像头已对准车牌)
+            quantize (bool): 是否对识别模型做 int8 动态量化
+            threads (int): 每个推理会话的线程数 (多工作进程时设为 CPU 核数 / 进程数)
+            score_threshold (float): 检测框置信度阈值
+            region_hook (callable, optional): 替换默认的 process_plate_region
+            charset (str, optional): 识别字符表 (不含空白符) 或字符表文件路径，缺省时取模型元数据或内置字符表
+
+        Raises:
+            ValueError: 字符表与识别模型输出类别数不一致
+        """
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        providers = ["CPUExecutionProvider"]
+
+        if quantize:
+            recognizer_path = quantized_model_path(recognizer_path)
+        self.recognizer = onnxruntime.InferenceSession(recognizer_path, options, providers=providers)
+        self.charset = resolve_charset(self.recognizer, charset)
+        self.detector = (
+            onnxruntime.InferenceSession(detector_path, options, providers=providers)
+            if detector_path else None
+        )
+        self.score_threshold = score_threshold
+        self.region_hook = region_hook or process_plate_region
+
+    def detect(self, img):
+        """
+        检测车牌区域。
+
+        Returns:
+            list: [(x1, y1, x2, y2, score), ...]，原图坐标
+        """
+        import cv2
+        import numpy
+
+        if self.detector is None:
+            return [(0, 0, img.shape[1], img.shape[0], 1.0)]
+
+        # letterbox：等比缩放后补边至正方形输入
+        scale = DETECTOR_INPUT_SIZE / max(img.shape[:2])
+        resized = cv2.resize(img, (int(img.shape[1] * scale), int(img.shape[0] * scale)))
+        canvas = numpy.full((DETECTOR_INPUT_SIZE, DETECTOR_INPUT_SIZE, 3), 114, numpy.uint8)
+        canvas[:resized.shape[0], :resized.shape[1]] = resized
+        blob = canvas[:, :, ::-1].transpose(2, 0, 1)[numpy.newaxis].astype(numpy.float32) / 255.0
+
+        output = self.detector.run(None, {self.detector.get_inputs()[0].name: blob})[0][0]
+        cx, cy, w, h, scores = output[:5]
+        keep = scores >= self.score_threshold
+        boxes = numpy.stack([cx - w / 2, cy - h / 2, w, h], axis=1)[keep] / scale
+        scores = scores[keep]
+        if not len(scores):
+            return []
+
+        indices = cv2.dnn.NMSBoxes(boxes.tolist(), scores.tolist(), self.score_threshold, 0.5)
+        regions = []
+        for i in numpy.array(indices).flatten():
+            x, y, bw, bh = boxes[i]
+            x1, y1 = max(0, int(x)), max(0, int(y))
+            x2, y2 = min(img.shape[1], int(x + bw)), min(img.shape[0], int(y + bh))
+            if x2 > x1 and y2 > y1:
+                regions.append((x1, y1, x2, y2, float(scores[i])))
+        return regions
+
+    def recognize_region(self, plate_img):
+        """识别单个车牌区域，返回 (车牌, 置信度)"""
+        tensor = self.region_hook(plate_img)
+        output = self.recognizer.run(None, {self.recognizer.get_inputs()[0].name: tensor})[0]
+        probs = output[0] if output.shape[0] == 1 else output[:, 0]
+        return ctc_greedy_decode(probs, self.charset)
+
+    def __call__(self, img):
+        """
+        识别图像中的全部车牌。
+
+        Returns:
+            list: [(车牌, 置信度), ...]，置信度为检测置信度与字符平均概率之积
+        """
+        candidates = []
+        for x1, y1, x2, y2, score in self.detect(img):
+            plate_text, confidence = self.recognize_region(img[y1:y2, x1:x2])
+            if plate_text:
+                candidates.append((plate_text, score * confidence))
+        return candidates
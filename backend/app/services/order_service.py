@@ -11,6 +11,12 @@ from app.models.parking import ParkingSpot, ParkingZone
 from app.models.user import SysUser
 from app.models.car import Car
 from app.utils.service_utils import handle_service_exception
+from app.utils import reservation_claims, config_snapshot, revenue_rollup
+
+# 用户同时进行中 (status 0/1/2/6) 的订单上限
+MAX_ACTIVE_ORDERS = 3
+# 车位占位在预约超时时间之外额外保留的兜底时长
+CLAIM_TTL_MARGIN_SECONDS = 600
 
 
 class OrderService:
@@ -20,7 +26,8 @@ class OrderService:
     @handle_service_exception(message_prefix="预约失败")
     def create_order(user, spot_id, plate_number):
         """
-        处理创建预约订单业务逻辑。包含信用分校验、活跃订单上限检查、车辆唯一性及绑定验证、车位冲突检查，并使用悲观锁锁定车位。
+        处理创建预约订单业务逻辑。先经 Redis 原子占位快速通道，再以单条语句在数据库中完成信用分、活跃订单上限、
+        车辆唯一性及绑定、车位冲突的权威校验 (悲观锁锁定车位)。数据库事务未成功时撤销 Redis 占位。
 
         Args:
             user (SysUser): 当前用户对象
@@ -33,66 +40,149 @@ class OrderService:
         if not spot_id or not plate_number:
             return {"success": False, "message": "车位ID和车牌号不能为空"}, 400
 
-        from app.models.config import SysConfig
+        # Redis 原子占位快速通道：竞争失败者无需进入数据库即被拒绝
+        claim_ttl = (
+            current_app.config.get("RESERVATION_TIMEOUT_MINUTES", 30) * 60
+            + CLAIM_TTL_MARGIN_SECONDS
+        )
+        claim = reservation_claims.claim(
+            spot_id, plate_number, user.user_id, MAX_ACTIVE_ORDERS, claim_ttl
+        )
+        if claim == reservation_claims.CLAIM_SPOT_TAKEN:
+            return {"success": False, "message": "手慢了，该车位已被他人锁定"}, 409
+        if claim == reservation_claims.CLAIM_PLATE_ACTIVE:
+            return {
+                "success": False,
+                "message": f"该车辆({plate_number})当前处于活跃状态，不能重复预约",
+            }, 403
+        if claim == reservation_claims.CLAIM_USER_LIMIT:
+            return {
+                "success": False,
+                "message": f"您已有 {MAX_ACTIVE_ORDERS} 个进行中的订单，已达到系统同时预约上限",
+            }, 403
+
+        try:
+            result = OrderService._create_order_in_db(user, spot_id, plate_number)
+        except Exception:
+            if claim == reservation_claims.CLAIM_OK:
+                reservation_claims.rollback(spot_id, plate_number, user.user_id)
+            raise
+        finally:
+            if claim == reservation_claims.CLAIM_OK:
+                reservation_claims.settle(spot_id, plate_number)
+        if claim == reservation_claims.CLAIM_OK and result[1] != 201:
+            reservation_claims.rollback(spot_id, plate_number, user.user_id)
+        return result
+
+    @staticmethod
+    def _load_reservation_facts(user, spot_id, plate_number):
+        """
+        以单条语句读取预约所需的全部校验数据，并对车位行加悲观锁。
+
+        各项数据作为标量子查询挂在 "(SELECT 1) LEFT JOIN parking_spot" 上，车位不存在时仍返回一行；
+        FOR UPDATE 只锁定外层查询读到的车位行。
 
-        min_score = int(
-            SysConfig.get_value(
-                "MIN_CREDIT_SCORE", current_app.config.get("MIN_CREDIT_SCORE", 70)
+        Returns:
+            Row: active_orders, car_order_status, car_owned, spot_reserved,
+                spot_id, spot_status, zone_id
+        """
+        from sqlalchemy import select, exists, func, literal
+
+        active_statuses = [0, 1, 2, 6]
+        anchor = select(literal(1).label("one")).subquery()
+        stmt = (
+            select(
+                select(func.count())
+                .select_from(ParkingOrder)
+                .where(
+                    ParkingOrder.user_id == user.user_id,
+                    ParkingOrder.status.in_(active_statuses),
+                )
+                .scalar_subquery()
+                .label("active_orders"),
+                select(ParkingOrder.status)
+                .where(
+                    ParkingOrder.plate_number == plate_number,
+                    ParkingOrder.status.in_(active_statuses),
+                )
+                .limit(1)
+                .scalar_subquery()
+                .label("car_order_status"),
+                exists()
+                .where(Car.plate_number == plate_number, Car.user_id == user.user_id)
+                .label("car_owned"),
+                exists()
+                .where(ParkingOrder.spot_id == spot_id, ParkingOrder.status == 0)
+                .label("spot_reserved"),
+                ParkingSpot.spot_id,
+                ParkingSpot.status.label("spot_status"),
+                ParkingSpot.zone_id,
+            )
+            .select_from(
+                anchor.outerjoin(ParkingSpot, ParkingSpot.spot_id == spot_id)
             )
+            .with_for_update()
         )
+        return db.session.execute(stmt).one()
+
+    @staticmethod
+    def _check_reservation_facts(user, facts, plate_number):
+        """
+        按原有校验顺序判定预约数据。
+
+        Returns:
+            tuple | None: 校验失败时返回 (响应字典, HTTP 状态码)，通过时返回 None
+        """
+        min_score = config_snapshot.get().min_credit_score
         if user.credit_score < min_score:
             return {
                 "success": False,
                 "message": f"您的信用分({user.credit_score})低于及格线({min_score})，禁止预约",
             }, 403
 
-        active_orders_count = ParkingOrder.query.filter(
-            ParkingOrder.user_id == user.user_id, ParkingOrder.status.in_([0, 1, 2, 6])
-        ).count()
-        if active_orders_count >= 3:
+        if facts.active_orders >= MAX_ACTIVE_ORDERS:
             return {
                 "success": False,
-                "message": "您已有 3 个进行中的订单，已达到系统同时预约上限",
+                "message": f"您已有 {MAX_ACTIVE_ORDERS} 个进行中的订单，已达到系统同时预约上限",
             }, 403
 
-        active_car_order = ParkingOrder.query.filter(
-            ParkingOrder.plate_number == plate_number,
-            ParkingOrder.status.in_([0, 1, 2, 6]),
-        ).first()
-        if active_car_order:
+        if facts.car_order_status is not None:
             status_desc = {0: "预约中", 1: "停车中", 2: "待支付", 6: "待处理违约"}
             return {
                 "success": False,
-                "message": f'该车辆({plate_number})当前处于{status_desc.get(active_car_order.status, "活跃")}状态，不能重复预约',
+                "message": f'该车辆({plate_number})当前处于{status_desc.get(facts.car_order_status, "活跃")}状态，不能重复预约',
             }, 403
 
-        car = Car.query.filter_by(
-            plate_number=plate_number, user_id=user.user_id
-        ).first()
-        if not car:
+        if not facts.car_owned:
             return {"success": False, "message": "该车辆未绑定到您的账户"}, 403
 
-        is_spot_reserved = ParkingOrder.query.filter_by(
-            spot_id=spot_id, status=0
-        ).first()
-        if is_spot_reserved:
+        if facts.spot_reserved:
             return {"success": False, "message": "手慢了，该车位已被他人锁定"}, 409
 
-        spot = (
-            db.session.query(ParkingSpot)
-            .with_for_update()
-            .filter_by(spot_id=spot_id)
-            .first()
-        )
-        if not spot:
+        if facts.spot_id is None:
             return {"success": False, "message": "车位不存在"}, 404
-        if spot.status != 0:
+        if facts.spot_status != 0:
             status_msg = {1: "车位已被车辆占用", 2: "车位正在维护中"}
             return {
                 "success": False,
-                "message": status_msg.get(spot.status, "车位不可用"),
+                "message": status_msg.get(facts.spot_status, "车位不可用"),
             }, 409
 
+        return None
+
+    @staticmethod
+    def _create_order_in_db(user, spot_id, plate_number):
+        """
+        在数据库中完成预约的权威校验与写入：一次往返读取全部校验数据 (同时锁定车位)，信用分及格线取自配置快照，随后插入订单。
+
+        Returns:
+            tuple: 包含响应字典 (dict) 和 HTTP 状态码 (int) 的元组
+        """
+        facts = OrderService._load_reservation_facts(user, spot_id, plate_number)
+        error = OrderService._check_reservation_facts(user, facts, plate_number)
+        if error:
+            return error
+
         new_order = ParkingOrder(
             order_no=ParkingOrder.generate_order_no(),
             user_id=user.user_id,
@@ -107,7 +197,7 @@ class OrderService:
         from app.services.parking_service import ParkingService
 
         ParkingService._broadcast_spot_update(
-            spot.spot_id, spot.zone_id, 3, plate_number
+            facts.spot_id, facts.zone_id, 3, plate_number, prev_status=0
         )
 
         return {
@@ -151,7 +241,9 @@ class OrderService:
         order.status = 3
         order.pay_time = datetime.utcnow()
         order.pay_way = pay_way
+        revenue_rollup.record(order)
         db.session.commit()
+        reservation_claims.release_active(order.plate_number, order.user_id)
 
         return {"success": True, "message": "支付成功", "data": order.to_dict()}, 200
 
@@ -186,11 +278,15 @@ class OrderService:
         order.status = 4
         spot = ParkingSpot.query.get(order.spot_id)
         db.session.commit()
+        reservation_claims.release_spot(order.spot_id, order.plate_number)
+        reservation_claims.release_active(order.plate_number, order.user_id)
 
         if spot:
             from app.services.parking_service import ParkingService
 
-            ParkingService._broadcast_spot_update(spot.spot_id, spot.zone_id, 0, None)
+            ParkingService._broadcast_spot_update(
+                spot.spot_id, spot.zone_id, 0, None, prev_status=3
+            )
 
         return {"success": True, "message": "取消成功", "data": order.to_dict()}, 200
 
@@ -326,26 +422,28 @@ class OrderService:
 
         order.status = 6
 
+        spot = None
         if violation_type == "reservation":
             order.out_time = datetime.utcnow()
             order.total_fee = Decimal(
                 str(current_app.config.get("VIOLATION_FEE", 5.00))
             )
             penalty = current_app.config.get("CREDIT_PENALTY_DELAY", 10)
-
             spot = ParkingSpot.query.get(order.spot_id)
-            if spot:
-                from app.services.parking_service import ParkingService
-
-                ParkingService._broadcast_spot_update(
-                    spot.spot_id, spot.zone_id, 0, None
-                )
         else:
             penalty = current_app.config.get("CREDIT_PENALTY_TIMEOUT", 5)
 
         user.credit_score = max(0, user.credit_score - penalty)
 
+        spot_id, zone_id = (spot.spot_id, spot.zone_id) if spot else (None, None)
         db.session.commit()
+        if violation_type == "reservation":
+            reservation_claims.release_spot(order.spot_id, order.plate_number)
+            # 提交成功后再更新 Redis 计数/索引并推送，提交失败时不会提前显示车位空闲
+            if spot_id is not None:
+                from app.services.parking_service import ParkingService
+
+                ParkingService._broadcast_spot_update(spot_id, zone_id, 0, None, prev_status=3)
 
         msg = f"订单 {order.order_no} ({violation_type}) 违约处理成功，扣除信用分 {penalty}"
         return {"success": True, "message": msg, "data": order.to_dict()}, 200
@@ -389,6 +487,9 @@ class OrderService:
             if not result.get("success"):
                 return result, code
 
+        if order.status == 3:
+            # 申请退款 (status 7) 时已扣除
+            revenue_rollup.record(order, sign=-1)
         order.status = 5
         db.session.commit()
         return {
@@ -429,6 +530,7 @@ class OrderService:
             return {"success": False, "message": "离场已超过24小时，无法申请退款"}, 400
 
         order.status = 7  # 7-退款申请中
+        revenue_rollup.record(order, sign=-1)
         db.session.commit()
         return {
             "success": True,
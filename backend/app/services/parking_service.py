@@ -9,96 +9,273 @@ from app.models.parking import ParkingZone, ParkingSpot
 from app.models.order import ParkingOrder
 from app.models.user import SysUser
 from app.utils.fee_calculator import calculate_parking_fee
+from app.utils.tariff import normalize as normalize_tariff
 from app.utils.service_utils import handle_service_exception
+from app.utils import zone_counter, spot_index, cache_utils, reservation_claims, recognition_cache, metrics, image_preprocess, config_snapshot, revenue_rollup, blocking
+from app.services.lpr_engine import (
+    get_engine,
+    build_recognizer,
+    recognizer_options,
+    load_warmup_image,
+    LprBusyError,
+    LprTimeoutError,
+)
+from app.services import lpr_onnx
 from flask import current_app
 import os
-
-cv2 = None
-np = None
-LicensePlateCatcher = None
-YOLO = None
-
-def _import_cv2():
-    """延迟导入cv2"""
-    global cv2, np
-    if cv2 is None:
-        import cv2 as cv
-        import numpy as numpy
-        cv2 = cv
-        np = numpy
-    return cv2, np
-
-def _import_lpr():
-    """延迟导入车牌识别库"""
-    global LicensePlateCatcher, YOLO
-    if LicensePlateCatcher is None:
-        from hyperlpr3 import LicensePlateCatcher as LPC
-        from ultralytics import YOLO as YOLONet
-        LicensePlateCatcher = LPC
-        YOLO = YOLONet
-    return LicensePlateCatcher, YOLO
+import time
 
 class ParkingService:
     """停车服务类"""
 
     def __init__(self):
         """初始化停车服务"""
-        self.model = None
         self.lpr = None
+        self.lpr_state = "cold"
+        self.lpr_timings = {}
 
     def _ensure_models_loaded(self):
-        """确保模型已加载"""
+        """确保模型已加载 (LPR_WORKERS=0 时在当前进程内加载)"""
         if self.lpr is None:
-            LPC, _ = _import_lpr()
-            self.lpr = LPC()
+            start = time.perf_counter()
+            self.lpr = blocking.run(
+                build_recognizer,
+                current_app.config.get("LPR_BACKEND", "hyperlpr"),
+                recognizer_options(current_app.config),
+                region_hook=self.process_plate_region,
+            )
+            self.lpr_timings["startup"] = time.perf_counter() - start
+            metrics.observe("lpr.startup", self.lpr_timings["startup"])
+
+    def warm_up_lpr(self):
+        """
+        加载车牌识别模型并在样例图像上预热推理，使首个识别请求不再承担导入与初始化开销。
+
+        Returns:
+            bool: 是否预热成功
+        """
+        if current_app.config.get("LPR_WORKERS", 2) > 0:
+            return get_engine(current_app.config).warm_up()
+
+        self.lpr_state = "warming"
+        try:
+            self._ensure_models_loaded()
+            img = load_warmup_image(current_app.config.get("LPR_WARMUP_IMAGE"))
+            start = time.perf_counter()
+            blocking.run(self.lpr, img)
+            self.lpr_timings["first_inference"] = time.perf_counter() - start
+            metrics.observe("lpr.first_inference", self.lpr_timings["first_inference"])
+        except Exception as e:
+            self.lpr_state = "failed"
+            print(f"车牌识别模型预热失败: {str(e)}")
+            return False
+        self.lpr_state = "ready"
+        metrics.gauge("lpr.ready", 1)
+        return True
+
+    def lpr_status(self):
+        """
+        车牌识别就绪状态，供道闸及健康检查使用。
+
+        Returns:
+            dict: {"state": cold/warming/ready/failed, "backend", "workers", "timings"}
+        """
+        config = current_app.config
+        workers = config.get("LPR_WORKERS", 2)
+        if workers > 0:
+            engine = get_engine(config)
+            state, timings = engine.state, list(engine.timings.values())
+        else:
+            state, timings = self.lpr_state, [self.lpr_timings] if self.lpr_timings else []
+        return {
+            "state": state,
+            "ready": state == "ready",
+            "backend": config.get("LPR_BACKEND", "hyperlpr"),
+            "workers": workers,
+            "timings": timings,
+        }
 
     def process_plate_region(self, plate_img):
-        """处理车牌区域图像"""
-        return plate_img
+        """
+        处理车牌区域图像：ONNX 后端在检测裁剪后、识别前调用，缩放补边并归一化为识别模型输入。
+
+        仅对当前进程内识别 (LPR_WORKERS=0) 生效，工作进程使用 lpr_onnx.process_plate_region。
+        """
+        return lpr_onnx.process_plate_region(plate_img)
+
+    def _decode_and_recognize(self, image_data, reduce, roi):
+        """解码并推理 (不访问应用上下文)，无法解码时返回 None"""
+        img = image_preprocess.decode(image_data, reduce, roi)
+        if img is None:
+            return None
+        return self.lpr(img)
+
+    def recognize_plate_candidates(self, image_data, reduce=1, roi=None):
+        """
+        识别图像中的车牌候选。LPR_WORKERS > 0 时交由独立进程池执行 (不阻塞事件循环)，为 0 时在当前进程内执行。
+
+        Args:
+            image_data: 图像数据（字节流或numpy数组）
+            reduce (int): 缩小解码倍数 1 / 2 / 4 / 8
+            roi (tuple, optional): 按宽高比例的感兴趣区域 (x1, y1, x2, y2)
+
+        Returns:
+            list: [(车牌, 置信度), ...]，按置信度降序
 
-    def recognize_plate_from_image(self, image_data):
+        Raises:
+            LprBusyError: 识别队列已满
+            LprTimeoutError: 识别超时
         """
-        从图像数据中识别车牌
+        if current_app.config.get("LPR_WORKERS", 2) > 0:
+            return get_engine(current_app.config).recognize(image_data, reduce=reduce, roi=roi)
+
+        self._ensure_models_loaded()
+        # 解码与推理在原生线程中执行，eventlet 下不阻塞事件循环
+        candidates = blocking.run(self._decode_and_recognize, image_data, reduce, roi)
+        if candidates is None:
+            return []
+        if self.lpr_state == "cold":
+            self.lpr_state = "ready"
+        return sorted(candidates, key=lambda c: c[1], reverse=True)
+
+    def recognize_plate_from_image(self, image_data, camera_id=None):
+        """
+        从图像数据中识别车牌，相同或几乎相同的画面在短时间内直接返回缓存结果
+
+        大图先按识别所需分辨率缩小解码并裁剪摄像头 ROI，缩小解码未识别出车牌时再以原始分辨率重试。
 
         Args:
             image_data: 图像数据（字节流或numpy数组）
+            camera_id (str, optional): 道闸摄像头标识，用于查找 ROI 配置
 
         Returns:
             识别结果（车牌号）或None
+
+        Raises:
+            LprBusyError: 识别队列已满
+            LprTimeoutError: 识别超时
         """
         try:
-            cv, numpy = _import_cv2()
-            self._ensure_models_loaded()
+            roi = image_preprocess.camera_roi(current_app.config, camera_id)
+            cache = recognition_cache.get_cache(current_app.config)
+            if cache is not None:
+                # SHA-1 与缩小解码计算感知哈希同样是阻塞调用，交给原生线程执行，事件循环中只做字典查找
+                fingerprint = blocking.run(cache.fingerprint, image_data, camera_id, roi)
+                hit, plate_number = cache.lookup(fingerprint)
+                if hit:
+                    return plate_number
+
+            start = time.perf_counter()
+            reduce = 1
+            if not hasattr(image_data, "shape"):
+                reduce = image_preprocess.reduction_for(
+                    image_data, current_app.config.get("LPR_DECODE_MAX_SIDE", 1280)
+                )
+            candidates = self.recognize_plate_candidates(image_data, reduce, roi)
+            if not candidates and reduce > 1:
+                metrics.incr("lpr.full_resolution_retries")
+                candidates = self.recognize_plate_candidates(image_data, 1, roi)
+            plate_number = candidates[0][0] if candidates else None
+            if cache is not None:
+                cache.store(fingerprint, plate_number, time.perf_counter() - start)
+            return plate_number
+        except (LprBusyError, LprTimeoutError):
+            raise
+        except Exception as e:
+            print(f"车牌识别错误: {str(e)}")
+            return None
 
-            if isinstance(image_data, bytes):
-                nparr = numpy.frombuffer(image_data, numpy.uint8)
-                img = cv.imdecode(nparr, cv.IMREAD_COLOR)
-            else:
-                img = image_data
+    def _recognize_batch_inline(self, images):
+        """解码后依次推理 (在原生线程中执行，不访问应用上下文)"""
+        if blocking.eventlet_patched():
+            # 已在 tpool 原生线程中，被 patch 的线程池会创建协程，此处顺序解码
+            decoded = [image_preprocess.decode(image) for image in images]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
 
-            if img is None:
-                return None
+            with ThreadPoolExecutor(max_workers=min(len(images), os.cpu_count() or 1) or 1) as executor:
+                decoded = list(executor.map(image_preprocess.decode, images))
+        return [
+            sorted(self.lpr(img), key=lambda c: c[1], reverse=True)
+            if img is not None else []
+            for img in decoded
+        ]
 
-            result_lpr = self.lpr(img)
-            if result_lpr:
-                if isinstance(result_lpr[0], list):
-                    plate_text = result_lpr[0][0] if len(result_lpr[0]) > 0 else None
-                elif isinstance(result_lpr[0], dict):
-                    plate_text = result_lpr[0].get('license', None)
-                else:
-                    plate_text = str(result_lpr[0])
-                if plate_text and plate_text != "UNKNOWN":
-                    return plate_text
+    def recognize_plate_batch(self, images):
+        """
+        批量识别同一车辆的多张图像 (多角度/多摄像头)，逐张返回结果并投票得出共识车牌。
 
-            return None
+        LPR_WORKERS > 0 时整批分片交由进程池并行解码与推理；为 0 时在线程池中并行解码 (cv2 解码释放 GIL)，
+        再在当前进程内依次推理。
 
-        except Exception as e:
-            print(f"车牌识别错误: {str(e)}")
+        Args:
+            images (list): 图像数据列表（字节流或numpy数组）
+
+        Returns:
+            dict: {"results": [{"index", "plate_number", "confidence", "candidates"}, ...],
+                   "consensus": {"plate_number", "votes", "confidence"} 或 None}
+
+        Raises:
+            LprBusyError: 识别队列已满
+            LprTimeoutError: 识别超时
+        """
+        if current_app.config.get("LPR_WORKERS", 2) > 0:
+            batch = get_engine(current_app.config).recognize_batch(images)
+        else:
+            self._ensure_models_loaded()
+            batch = blocking.run(self._recognize_batch_inline, images)
+
+        results = []
+        for index, candidates in enumerate(batch):
+            top = candidates[0] if candidates else (None, 0.0)
+            results.append(
+                {
+                    "index": index,
+                    "plate_number": top[0],
+                    "confidence": round(top[1], 4),
+                    "candidates": [
+                        {"plate_number": plate, "confidence": round(conf, 4)}
+                        for plate, conf in candidates
+                    ],
+                }
+            )
+        return {"results": results, "consensus": self._vote_plate(batch)}
+
+    @staticmethod
+    def _vote_plate(batch):
+        """
+        按每张图像的最优候选投票：票数多者胜出，票数相同时比较累计置信度。
+
+        Returns:
+            dict | None: {"plate_number", "votes", "confidence" (胜出车牌的平均置信度)}
+        """
+        tally = {}
+        for candidates in batch:
+            if not candidates:
+                continue
+            plate, confidence = candidates[0]
+            votes, total = tally.get(plate, (0, 0.0))
+            tally[plate] = (votes + 1, total + confidence)
+        if not tally:
             return None
+        plate, (votes, total) = max(tally.items(), key=lambda item: item[1])
+        return {"plate_number": plate, "votes": votes, "confidence": round(total / votes, 4)}
 
     @staticmethod
-    def _broadcast_spot_update(spot_id, zone_id, status, current_plate=None):
-        """通过 WebSocket 向前端广播车位状态变更并清理相关缓存。"""
+    def _broadcast_spot_update(spot_id, zone_id, status, current_plate=None, prev_status=None):
+        """
+        同步区域计数器与车位状态索引，并通过 WebSocket 向订阅该区域的客户端广播车位状态变更。
+
+        Args:
+            prev_status (int, optional): 变更前的对外展示状态；未知时按数据库校准该区域计数并重建索引
+        """
+        if prev_status is None:
+            zone_counter.reconcile([zone_id])
+            version = ParkingService._clear_spots_cache(zone_id)
+        else:
+            zone_counter.apply_transition(zone_id, prev_status, status)
+            version = spot_index.write(zone_id, spot_id, status, current_plate)
+
         socketio.emit(
             "spot_status_update",
             {
@@ -106,98 +283,110 @@ class ParkingService:
                 "zone_id": zone_id,
                 "status": status,
                 "current_plate": current_plate,
+                "version": version,
             },
+            room=f"zone_{zone_id}",
         )
-        ParkingService._clear_spots_cache(zone_id)
 
     @staticmethod
-    def _clear_spots_cache(zone_id=None):
-        """清理 Redis 中的车位及区域缓存列表。"""
-        from app.extensions import redis_client
+    def _effective_status(spot):
+        """
+        计算车位对外展示状态：空闲且存在预约中订单时为 3 (已预约)。
 
-        if not redis_client:
-            return
-        try:
-            if zone_id:
-                redis_client.delete(f"parking:spots:{zone_id}")
-            else:
-                keys = redis_client.keys("parking:spots:*")
-                if keys:
-                    redis_client.delete(*keys)
-            redis_client.delete("parking:zones:all")
-        except:
-            pass
+        Returns:
+            tuple: (展示状态, 展示车牌)
+        """
+        if spot.status == 0:
+            reserved = ParkingOrder.query.filter_by(
+                spot_id=spot.spot_id, status=0
+            ).first()
+            if reserved:
+                return 3, reserved.plate_number
+        return spot.status, spot.current_plate
+
+    @staticmethod
+    def _clear_spots_cache(zone_id=None):
+        """使 Redis 中的车位状态索引失效，下一次读取时从数据库重建；返回失效后的区域版本号。"""
+        return spot_index.invalidate(zone_id)
 
     @staticmethod
     def get_zones():
-        """获取所有停车区域信息，优先使用 Redis 缓存读取。"""
-        from app.extensions import redis_client
-        import json
-
-        cache_key = "parking:zones:all"
-        if redis_client:
-            try:
-                cached_data = redis_client.get(cache_key)
-                if cached_data:
-                    return {"success": True, "data": json.loads(cached_data)}, 200
-            except:
-                pass
-
-        zones = ParkingZone.query.all()
-        data = [zone.to_dict() for zone in zones]
-
-        if redis_client:
-            try:
-                redis_client.setex(cache_key, 3600, json.dumps(data))
-            except:
-                pass
+        """获取所有停车区域信息：区域静态信息走 Redis 缓存，车位统计读取区域计数器。"""
+        def load_zones():
+            return [zone.to_dict(include_stats=False) for zone in ParkingZone.query.all()]
+
+        data = cache_utils.cached(
+            "zones", "parking:zones:all", load_zones, ttl=3600, stale_ttl=600
+        )
+
+        counters = zone_counter.get_counters([zone["zone_id"] for zone in data])
+        for zone in data:
+            zone_counter.apply_to(
+                zone, counters.get(zone["zone_id"], zone_counter.empty_counters())
+            )
 
         return {"success": True, "data": data}, 200
 
     @staticmethod
-    def get_spots(zone_id=None):
-        """获取车位实时状态，含高并发条件下的短时缓存保护。"""
-        from app.extensions import redis_client
-        import json
-
-        cache_key = f'parking:spots:{zone_id if zone_id else "all"}'
-        if redis_client:
-            try:
-                cached_data = redis_client.get(cache_key)
-                if cached_data:
-                    return {"success": True, "data": json.loads(cached_data)}, 200
-            except:
-                pass
+    def get_spots(zone_id=None, since=None):
+        """
+        获取车位实时状态，读取 Redis 车位状态索引，仅在索引缺失时回源数据库。单区域查询附带区域版本号。
 
-        if zone_id:
-            spots = ParkingSpot.query.filter_by(zone_id=zone_id).all()
-        else:
-            spots = ParkingSpot.query.all()
-
-        spot_ids = [s.spot_id for s in spots]
-        reserved_orders = ParkingOrder.query.filter(
-            ParkingOrder.spot_id.in_(spot_ids), ParkingOrder.status == 0
-        ).all()
-        reserved_spot_map = {
-            order.spot_id: order.plate_number for order in reserved_orders
-        }
+        Args:
+            zone_id (int, optional): 区域 ID，为空时返回全部区域
+            since (int, optional): 单区域增量模式，仅返回该版本之后变更的车位 (changes)；
+                超出变更日志范围时退化为全量 (data)
 
+        Returns:
+            tuple: 包含响应字典 (dict) 和 HTTP 状态码 (int) 的元组
+        """
+        if zone_id:
+            sync = ParkingService.sync_zone(zone_id, since)
+            if "changes" in sync:
+                return {
+                    "success": True,
+                    "version": sync["version"],
+                    "changes": sync["changes"],
+                }, 200
+            return {"success": True, "data": sync["spots"], "version": sync["version"]}, 200
+
+        zone_ids = [
+            zid
+            for (zid,) in db.session.query(ParkingZone.zone_id)
+            .order_by(ParkingZone.zone_id)
+            .all()
+        ]
         spots_data = []
-        for spot in spots:
-            spot_dict = spot.to_dict()
-            if spot.status == 0 and spot.spot_id in reserved_spot_map:
-                spot_dict["status"] = 3
-                spot_dict["current_plate"] = reserved_spot_map[spot.spot_id]
-            spots_data.append(spot_dict)
-
-        if redis_client:
-            try:
-                redis_client.setex(cache_key, 3, json.dumps(spots_data))
-            except:
-                pass
+        for zid in zone_ids:
+            spots_data.extend(spot_index.read(zid)[0])
 
         return {"success": True, "data": spots_data}, 200
 
+    @staticmethod
+    def get_spots_version(zone_id):
+        """读取区域车位状态版本号 (单次 Redis GET)，用于条件请求校验；Redis 不可用时返回 None。"""
+        return spot_index.current_version(zone_id)
+
+    @staticmethod
+    def sync_zone(zone_id, since=None):
+        """
+        为订阅区域的客户端计算增量同步数据。
+
+        Args:
+            zone_id (int): 区域 ID
+            since (int, optional): 客户端已持有的版本号
+
+        Returns:
+            dict: 含 version 与 changes 的增量数据；since 缺失或超出变更日志范围时改为含 spots 的全量数据
+        """
+        if since is not None:
+            version, changes = spot_index.changes_since(zone_id, since)
+            if changes is not None:
+                return {"zone_id": zone_id, "version": version, "changes": changes}
+
+        spots_data, version = spot_index.read(zone_id)
+        return {"zone_id": zone_id, "version": version, "spots": spots_data}
+
     @staticmethod
     @handle_service_exception(message_prefix="入场失败")
     def vehicle_enter(plate_number):
@@ -219,8 +408,9 @@ class ParkingService:
         spot.current_plate = plate_number
 
         db.session.commit()
+        reservation_claims.release_spot(spot.spot_id, plate_number)
         ParkingService._broadcast_spot_update(
-            spot.spot_id, spot.zone_id, spot.status, plate_number
+            spot.spot_id, spot.zone_id, spot.status, plate_number, prev_status=3
         )
 
         return {"success": True, "message": "入场成功", "data": order.to_dict()}, 200
@@ -250,6 +440,7 @@ class ParkingService:
             zone.free_time,
             user.role,
             current_app.config["ROLE_DISCOUNT"],
+            zone_id=zone.zone_id,
         )
         order.total_fee = total_fee
 
@@ -266,6 +457,7 @@ class ParkingService:
                     order.status = 3
                     order.pay_time = datetime.utcnow()
                     order.pay_way = 0
+                    revenue_rollup.record(order, zone_id=spot.zone_id)
                 else:
                     order.status = 2
             else:
@@ -276,8 +468,10 @@ class ParkingService:
         spot.status = 0
         spot.current_plate = None
         db.session.commit()
+        if order.status == 3:
+            reservation_claims.release_active(order.plate_number, order.user_id)
         ParkingService._broadcast_spot_update(
-            spot.spot_id, spot.zone_id, spot.status, None
+            spot.spot_id, spot.zone_id, spot.status, None, prev_status=1
         )
 
         return {"success": True, "message": "出场成功", "data": order.to_dict()}, 200
@@ -292,9 +486,12 @@ class ParkingService:
                 return {"success": False, "message": "车位不存在"}, 404
 
             if "status" in data:
+                prev_status, _ = ParkingService._effective_status(spot)
                 spot.status = data["status"]
+                db.session.commit()
+                status, plate = ParkingService._effective_status(spot)
                 ParkingService._broadcast_spot_update(
-                    spot.spot_id, spot.zone_id, spot.status, spot.current_plate
+                    spot.spot_id, spot.zone_id, status, plate, prev_status=prev_status
                 )
 
             db.session.commit()
@@ -305,6 +502,11 @@ class ParkingService:
             if not zone:
                 return {"success": False, "message": "区域不存在"}, 404
 
+            if "tariff" in data:
+                try:
+                    zone.tariff = normalize_tariff(data["tariff"])
+                except ValueError as e:
+                    return {"success": False, "message": f"计费方案不合法: {str(e)}"}, 400
             if "fee_rate" in data:
                 zone.fee_rate = Decimal(str(data["fee_rate"]))
             if "free_time" in data:
@@ -312,6 +514,10 @@ class ParkingService:
 
             db.session.commit()
 
+            if "tariff" in data or "fee_rate" in data:
+                # 计费方案随配置快照编译缓存 (未被时段覆盖的小时按 fee_rate 计费)，变更后通知各 worker 重新编译
+                config_snapshot.bump()
+
             from app.extensions import redis_client
 
             if redis_client:
@@ -0,0 +1,357 @@
+"""
+计费方案模拟服务模块，按拟调整的费率、免费时长、分时/阶梯计费方案、倍率与角色折扣重新计算历史已完成订单的费用。
+
+历史订单按 order_id 键集分页流式读取，每批以 NumPy 向量化计费后只累加汇总值，内存占用与历史总量无关。
+配置了只读副本 (REPLICA_DATABASE_URL) 时在副本上查询，否则在独立连接上开启只读一致性快照事务，
+全程不持有行锁，也不占用 Web 请求的数据库会话。
+"""
+
+import json
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from flask import current_app
+from sqlalchemy import text
+from app.extensions import db
+from app.utils import config_snapshot, metrics
+from app.utils.fee_calculator import calculate_parking_fees_elapsed
+from app.utils.tariff import compile_tariff, normalize as normalize_tariff
+
+_ORDERS_SQL = """
+    SELECT o.order_id, s.zone_id, u.role, DATE(o.pay_time) AS pay_day, HOUR(o.in_time) AS in_hour,
+           TIMESTAMPDIFF(MICROSECOND, o.in_time, o.out_time) AS elapsed_us, o.total_fee
+    FROM parking_order o
+    JOIN parking_spot s ON s.spot_id = o.spot_id
+    JOIN sys_user u ON u.user_id = o.user_id
+    WHERE o.status = 3 AND o.order_id > :last_id {filters}
+    ORDER BY o.order_id
+    LIMIT :limit
+"""
+
+
+class TariffValidationError(ValueError):
+    """模拟参数不合法"""
+
+
+@contextmanager
+def _snapshot_connection():
+    """
+    获取模拟专用的只读连接，并在其上开启一致性快照事务。
+
+    各批次查询看到同一时间点的数据，分页期间新完成的订单不会被重复或遗漏统计。
+
+    Yields:
+        tuple: (Connection, 数据来源 "replica" / "primary")
+    """
+    engine = db.engines.get("replica")
+    source = "replica"
+    if engine is None:
+        engine = db.engine
+        source = "primary"
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="REPEATABLE READ")
+        conn.exec_driver_sql("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+        try:
+            yield conn, source
+        finally:
+            conn.rollback()
+
+
+def _decimal(value, name):
+    try:
+        result = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise TariffValidationError(f"{name} 不是有效的数值")
+    if not result.is_finite() or result < 0:
+        raise TariffValidationError(f"{name} 不能为负数")
+    return result
+
+
+def _date(value, name):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise TariffValidationError(f"{name} 格式应为 YYYY-MM-DD")
+
+
+def _yuan(cents):
+    return float(Decimal(int(cents)) / 100)
+
+
+class _Totals:
+    """单个分组 (区域 / 角色 / 日期) 的累计值，金额单位为分"""
+
+    __slots__ = ("orders", "actual", "current", "proposed")
+
+    def __init__(self):
+        self.orders = 0
+        self.actual = 0
+        self.current = 0
+        self.proposed = 0
+
+    def to_dict(self):
+        return {
+            "orders": self.orders,
+            "actual_revenue": _yuan(self.actual),
+            "current_revenue": _yuan(self.current),
+            "proposed_revenue": _yuan(self.proposed),
+            "delta": _yuan(self.proposed - self.current),
+            "delta_rate": (
+                round((self.proposed - self.current) / self.current * 100, 2) if self.current else None
+            ),
+        }
+
+
+def _accumulate(groups, keys, actual, current, proposed):
+    """按分组键累加一批订单的金额"""
+    import numpy
+
+    unique_keys, inverse = numpy.unique(keys, return_inverse=True)
+    counts = numpy.bincount(inverse, minlength=len(unique_keys))
+    sums = []
+    for values in (actual, current, proposed):
+        total = numpy.zeros(len(unique_keys), dtype=numpy.int64)
+        numpy.add.at(total, inverse, values)
+        sums.append(total)
+
+    for k, key in enumerate(unique_keys.tolist()):
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = _Totals()
+        group.orders += int(counts[k])
+        group.actual += int(sums[0][k])
+        group.current += int(sums[1][k])
+        group.proposed += int(sums[2][k])
+
+
+class TariffService:
+    """计费方案模拟服务类"""
+
+    @staticmethod
+    def _parse_request(data, zones, snapshot, fallback_discount, utc_offset):
+        """
+        解析模拟参数，返回当前与拟调整的计费方案。
+
+        Returns:
+            dict: 筛选条件及 current / proposed 方案
+                  方案格式 {"zones": {区域: (费率, 免费分钟, CompiledTariff | None)},
+                            "multiplier": Decimal, "discounts": {角色: Decimal}}
+        """
+
+        def compiled(rate, tariff):
+            return compile_tariff(tariff, rate, utc_offset) if tariff else None
+
+        current_discounts = {role: snapshot.discount_for(role, fallback_discount) for role in range(4)}
+        current = {
+            "zones": {
+                zone_id: (rate, free, compiled(rate, tariff))
+                for zone_id, (_, rate, free, tariff) in zones.items()
+            },
+            "multiplier": snapshot.fee_multiplier,
+            "discounts": current_discounts,
+        }
+
+        proposed_zones = dict(current["zones"])
+        for key, change in (data.get("zones") or {}).items():
+            try:
+                zone_id = int(key)
+            except (TypeError, ValueError):
+                raise TariffValidationError(f"区域编号不合法: {key}")
+            if not isinstance(change, dict):
+                raise TariffValidationError(f"区域 {key} 的计费参数应为对象")
+            if zone_id not in proposed_zones:
+                raise TariffValidationError(f"区域不存在: {zone_id}")
+            _, rate, free, tariff = zones[zone_id]
+            if "fee_rate" in change:
+                rate = _decimal(change["fee_rate"], "fee_rate")
+            if "free_time" in change:
+                free = int(_decimal(change["free_time"], "free_time"))
+            if "tariff" in change:
+                try:
+                    tariff = normalize_tariff(change["tariff"])
+                except ValueError as e:
+                    raise TariffValidationError(f"区域 {key} 的计费方案不合法: {str(e)}")
+            proposed_zones[zone_id] = (rate, free, compiled(rate, tariff))
+
+        proposed_discounts = dict(current_discounts)
+        for role, rate in (data.get("roles") or {}).items():
+            try:
+                proposed_discounts[int(role)] = _decimal(rate, "roles")
+            except (TypeError, ValueError):
+                raise TariffValidationError(f"角色不合法: {role}")
+
+        proposed = {
+            "zones": proposed_zones,
+            "multiplier": (
+                _decimal(data["fee_multiplier"], "fee_multiplier")
+                if data.get("fee_multiplier") is not None
+                else current["multiplier"]
+            ),
+            "discounts": proposed_discounts,
+        }
+
+        start_date = _date(data["start_date"], "start_date") if data.get("start_date") else None
+        end_date = _date(data["end_date"], "end_date") if data.get("end_date") else None
+        if start_date and end_date and start_date > end_date:
+            raise TariffValidationError("开始日期不能晚于结束日期")
+
+        zone_id = data.get("zone_id")
+        if zone_id is not None:
+            try:
+                zone_id = int(zone_id)
+            except (TypeError, ValueError):
+                raise TariffValidationError(f"区域编号不合法: {zone_id}")
+            if zone_id not in zones:
+                raise TariffValidationError(f"区域不存在: {zone_id}")
+
+        return {
+            "start_date": start_date,
+            "end_date": end_date,
+            "zone_id": zone_id,
+            "current": current,
+            "proposed": proposed,
+        }
+
+    @staticmethod
+    def _price(tariff, zone_ids, roles, elapsed_us, valid, in_hours):
+        """按计费方案计算一批订单的费用 (分)"""
+        zone_tariffs = tariff["zones"]
+        return calculate_parking_fees_elapsed(
+            elapsed_us,
+            valid,
+            [zone_tariffs[z][0] for z in zone_ids],
+            [zone_tariffs[z][1] for z in zone_ids],
+            roles,
+            None,
+            multiplier=tariff["multiplier"],
+            discounts=tariff["discounts"],
+            tariffs=[zone_tariffs[z][2] for z in zone_ids],
+            in_hours=in_hours,
+        )
+
+    @staticmethod
+    @metrics.timed("tariff.simulate")
+    def simulate(data):
+        """
+        模拟调整计费方案后的历史收入变化。
+
+        Args:
+            data (dict): 模拟参数
+                zones (dict, optional): {"区域编号": {"fee_rate": 6.0, "free_time": 10, "tariff": {...}}}，
+                                        tariff 为分时/阶梯计费方案 (格式见 app.utils.tariff)，null 表示改为平价计费
+                fee_multiplier (float, optional): 费用倍率
+                roles (dict, optional): {"角色": 折扣}，格式同系统配置
+                start_date / end_date (str, optional): 按支付日期筛选，YYYY-MM-DD，包含两端
+                zone_id (int, optional): 只模拟指定区域
+
+        Returns:
+            tuple: 包含响应字典 (dict) 和 HTTP 状态码 (int) 的元组
+        """
+        import numpy
+
+        data = data or {}
+        app_config = current_app.config
+        chunk_size = app_config.get("TARIFF_SIM_CHUNK_SIZE", 5000)
+        started = datetime.utcnow()
+
+        with _snapshot_connection() as (conn, source):
+            zones = {
+                row.zone_id: (
+                    row.zone_name,
+                    Decimal(str(row.fee_rate or 0)),
+                    int(row.free_time or 0),
+                    json.loads(row.tariff) if isinstance(row.tariff, str) else row.tariff,
+                )
+                for row in conn.execute(
+                    text("SELECT zone_id, zone_name, fee_rate, free_time, tariff FROM parking_zone")
+                )
+            }
+            try:
+                params = TariffService._parse_request(
+                    data,
+                    zones,
+                    config_snapshot.get(),
+                    app_config.get("ROLE_DISCOUNT", {}),
+                    app_config.get("TARIFF_UTC_OFFSET_HOURS", 8),
+                )
+            except TariffValidationError as e:
+                return {"success": False, "message": str(e)}, 400
+
+            filters = []
+            bind = {"limit": chunk_size, "last_id": 0}
+            if params["start_date"]:
+                filters.append("AND o.pay_time >= :start_time")
+                bind["start_time"] = datetime.combine(params["start_date"], datetime.min.time())
+            if params["end_date"]:
+                filters.append("AND o.pay_time < :end_time")
+                bind["end_time"] = datetime.combine(params["end_date"] + timedelta(days=1), datetime.min.time())
+            if params["zone_id"] is not None:
+                filters.append("AND s.zone_id = :zone_id")
+                bind["zone_id"] = params["zone_id"]
+            query = text(_ORDERS_SQL.format(filters=" ".join(filters)))
+
+            totals = _Totals()
+            by_zone, by_role, by_day = {}, {}, {}
+            chunks = 0
+            while True:
+                rows = conn.execute(query, bind).all()
+                if not rows:
+                    break
+                chunks += 1
+                bind["last_id"] = rows[-1].order_id
+
+                count = len(rows)
+                zone_ids = [r.zone_id for r in rows]
+                roles = numpy.fromiter((r.role or 0 for r in rows), dtype=numpy.int64, count=count)
+                valid = numpy.fromiter((r.elapsed_us is not None for r in rows), dtype=bool, count=count)
+                elapsed_us = numpy.fromiter(
+                    (r.elapsed_us or 0 for r in rows), dtype=numpy.int64, count=count
+                )
+                in_hours = numpy.fromiter(
+                    (r.in_hour or 0 for r in rows), dtype=numpy.int64, count=count
+                )
+                days = numpy.fromiter(
+                    (r.pay_day.toordinal() if r.pay_day else 0 for r in rows), dtype=numpy.int64, count=count
+                )
+                actual = numpy.fromiter(
+                    (int((r.total_fee or 0) * 100) for r in rows), dtype=numpy.int64, count=count
+                )
+                current = TariffService._price(
+                    params["current"], zone_ids, roles, elapsed_us, valid, in_hours
+                )
+                proposed = TariffService._price(
+                    params["proposed"], zone_ids, roles, elapsed_us, valid, in_hours
+                )
+
+                totals.orders += count
+                totals.actual += int(actual.sum())
+                totals.current += int(current.sum())
+                totals.proposed += int(proposed.sum())
+                _accumulate(by_zone, numpy.asarray(zone_ids, dtype=numpy.int64), actual, current, proposed)
+                _accumulate(by_role, roles, actual, current, proposed)
+                _accumulate(by_day, days, actual, current, proposed)
+
+                if count < chunk_size:
+                    break
+
+        metrics.incr("tariff.simulated_orders", totals.orders)
+        return {
+            "success": True,
+            "data": {
+                "source": source,
+                "orders": totals.orders,
+                "chunks": chunks,
+                "elapsed_ms": round((datetime.utcnow() - started).total_seconds() * 1000, 1),
+                "summary": totals.to_dict(),
+                "by_zone": [
+                    dict(group.to_dict(), zone_id=zone_id, zone_name=zones.get(zone_id, ("",))[0])
+                    for zone_id, group in sorted(by_zone.items())
+                ],
+                "by_role": [dict(group.to_dict(), role=role) for role, group in sorted(by_role.items())],
+                "by_day": [
+                    dict(group.to_dict(), date=date.fromordinal(day).isoformat() if day else None)
+                    for day, group in sorted(by_day.items())
+                ],
+            },
+        }, 200
@@ -1,12 +1,15 @@
 """
-用户服务模块，提供获取用户画像、账户充值、用户列表分页及信息更新等功能。
+用户服务模块，提供获取用户画像、账户充值、用户列表分页、信息更新及按名册批量开通账号等功能。
 """
 
 from app.extensions import db
 from app.models.user import SysUser
 from app.services.car_service import CarService
 from app.utils.service_utils import handle_service_exception
+from app.utils import principal_cache, user_provisioner
+from app.utils.validators import validate_user_no
 from decimal import Decimal
+import threading
 
 
 class UserService:
@@ -109,8 +112,69 @@ class UserService:
             user.is_active = data["is_active"]
 
         db.session.commit()
+        # 角色、账号状态等已缓存的身份信息可能变化
+        principal_cache.invalidate_user(user.user_id)
         return {
             "success": True,
             "message": "用户信息更新成功",
             "data": user.to_dict(),
         }, 200
+
+    @staticmethod
+    def start_provision(data):
+        """
+        发起按学校名册批量开通账号的后台任务，已有账号的学号/工号自动跳过。
+
+        Args:
+            data (dict): user_nos (list, 可选，缺省时开通全部名册)、initial_password (str, 必填，账号首次登录时须修改)
+
+        Returns:
+            tuple: 包含任务ID的响应字典 (dict) 和 HTTP 状态码 (int) 的元组
+        """
+        from flask import current_app
+        from app.tasks.user_provision import provision_users
+
+        user_nos = data.get("user_nos")
+        if user_nos is not None:
+            if not isinstance(user_nos, list) or not user_nos:
+                return {"success": False, "message": "user_nos 须为非空列表"}, 400
+            invalid = [no for no in user_nos if not isinstance(no, str) or not validate_user_no(no)]
+            if invalid:
+                return {"success": False, "message": f"学号/工号格式不正确: {invalid[:10]}"}, 400
+
+        # 学号/工号公开可查，不能作为默认密码
+        initial_password = data.get("initial_password")
+        if not initial_password:
+            return {"success": False, "message": "请指定初始密码"}, 400
+        if not isinstance(initial_password, str) or len(initial_password) < 6:
+            return {"success": False, "message": "初始密码长度至少6位"}, 400
+
+        try:
+            job_id = user_provisioner.acquire()
+        except user_provisioner.ProvisionBusyError as e:
+            return {"success": False, "message": str(e), "data": {"job_id": e.job_id}}, 409
+
+        threading.Thread(
+            target=provision_users,
+            args=(current_app._get_current_object(), job_id, user_nos, initial_password),
+            name=f"user-provision-{job_id[:8]}",
+            daemon=True,
+        ).start()
+        return {
+            "success": True,
+            "message": "批量开通任务已开始",
+            "data": user_provisioner.get_progress(job_id),
+        }, 202
+
+    @staticmethod
+    def get_provision_progress(job_id):
+        """
+        查询批量开通任务进度。
+
+        Returns:
+            tuple: 包含进度的响应字典 (dict) 和 HTTP 状态码 (int) 的元组
+        """
+        progress = user_provisioner.get_progress(job_id)
+        if progress is None:
+            return {"success": False, "message": "任务不存在或已过期"}, 404
+        return {"success": True, "data": progress}, 200
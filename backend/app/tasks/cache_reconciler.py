@@ -0,0 +1,28 @@
+"""
+缓存校准定时任务，按数据库实际状态修正 Redis 中增量维护的停车数据。
+"""
+
+from app.utils import zone_counter, spot_index, reservation_claims
+
+
+def reconcile_zone_counters(app):
+    """按数据库重建全部区域车位计数器及车位状态索引"""
+    with app.app_context():
+        try:
+            stats = zone_counter.reconcile()
+            for zone_id in stats:
+                spot_index.rebuild(zone_id)
+        except Exception as e:
+            print(f"区域计数校准失败: {str(e)}")
+
+
+def reconcile_reservation_claims(app):
+    """按 parking_order 重建 Redis 预约占位，修正占位与订单之间的偏差"""
+    with app.app_context():
+        try:
+            interval = app.config.get('CLAIMS_RECONCILE_MINUTES', 5) * 60
+            spot_ttl = app.config.get('RESERVATION_TIMEOUT_MINUTES', 30) * 60 + 600
+            # 校准标记保留两个周期，定时任务停止后快速通道自动关闭
+            reservation_claims.reconcile(spot_ttl, interval * 2)
+        except Exception as e:
+            print(f"预约占位校准失败: {str(e)}")
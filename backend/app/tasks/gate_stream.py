@@ -0,0 +1,314 @@
+"""
+道闸摄像头流式识别任务。
+
+从摄像头视频流 (MJPEG/RTSP 地址或本地视频文件) 持续读取画面并识别车牌，同一车辆通过道闸期间的多次识别结果
+按置信度投票合并，每次通行只触发一次 vehicle_enter / vehicle_exit，省去客户端上传图片再调用入场/出场接口的往返。
+
+摄像头通过 GATE_CAMERAS 配置 (JSON 数组)：
+    [{"id": "north-in", "source": "rtsp://...", "direction": "enter"}, ...]
+
+读流、解码 (以及 LPR_WORKERS=0 时的进程内推理) 经 app.utils.blocking 在原生线程中执行，eventlet 下
+识别循环虽运行在协程中也不会阻塞事件循环。
+
+也可单独运行，便于用录像文件调试：
+    python -m app.tasks.gate_stream --source gate.mp4 --direction enter --dry-run
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from app.utils import metrics, image_preprocess, blocking
+from app.services.lpr_engine import LprBusyError, LprTimeoutError
+
+# 直播流断开后的重连间隔 (秒)
+RECONNECT_SECONDS = 5
+
+
+class PlateDeduplicator:
+    """
+    通行去重：时间窗口内的连续识别视为同一次通行，按车牌累计置信度投票。
+
+    领先车牌的识别次数达到 min_votes 时立即判定 (不必等车辆离开画面)；本次通行内之后的识别结果均被忽略。
+    超过 window_seconds 未再识别到车牌即视为通行结束，若此前尚未判定且识别次数足够，则以领先车牌判定。
+    同一车牌在 cooldown_seconds 内不会重复判定 (车辆在画面边缘进出)。
+    """
+
+    def __init__(self, window_seconds=3.0, min_votes=2, cooldown_seconds=30.0):
+        self.window_seconds = window_seconds
+        self.min_votes = min_votes
+        self.cooldown_seconds = cooldown_seconds
+        self._votes = {}  # 车牌 -> [识别次数, 累计置信度]
+        self._last_seen = None
+        self._decided = False
+        self._fired = {}  # 车牌 -> 上次判定时间
+
+    @property
+    def active(self):
+        """当前是否处于一次通行中"""
+        return self._last_seen is not None
+
+    def _leader(self):
+        plate, (votes, _) = max(self._votes.items(), key=lambda item: item[1][1])
+        return plate, votes
+
+    def _decide(self, plate, now):
+        self._decided = True
+        last = self._fired.get(plate)
+        if last is not None and now - last < self.cooldown_seconds:
+            metrics.incr("gate.suppressed")
+            return None
+        self._fired = {p: t for p, t in self._fired.items() if now - t < self.cooldown_seconds}
+        self._fired[plate] = now
+        return plate
+
+    def observe(self, plate, confidence, now):
+        """
+        记录一次识别结果。
+
+        Returns:
+            str | None: 本次通行判定的车牌，未判定时返回 None
+        """
+        decided = self.flush(now)
+        self._last_seen = now
+        if self._decided:
+            return decided
+
+        votes = self._votes.setdefault(plate, [0, 0.0])
+        votes[0] += 1
+        votes[1] += confidence
+        leader, leader_votes = self._leader()
+        if leader_votes >= self.min_votes:
+            return decided or self._decide(leader, now)
+        return decided
+
+    def flush(self, now):
+        """
+        结束已超出时间窗口的通行。
+
+        Returns:
+            str | None: 通行结束时补充判定的车牌
+        """
+        if self._last_seen is None or now - self._last_seen <= self.window_seconds:
+            return None
+
+        plate = None
+        if not self._decided and sum(v[0] for v in self._votes.values()) >= self.min_votes:
+            plate = self._decide(self._leader()[0], now)
+        self._votes = {}
+        self._last_seen = None
+        self._decided = False
+        return plate
+
+
+class GateStream:
+    """单个道闸摄像头的读流识别循环"""
+
+    def __init__(self, app, camera_id, source, direction, deduplicator=None, max_skip=15, on_plate=None):
+        """
+        Args:
+            app: Flask 应用
+            camera_id (str): 摄像头标识 (用于日志与指标)
+            source (str | int): 视频流地址、本地视频文件路径或设备号
+            direction (str): enter / exit
+            deduplicator (PlateDeduplicator, optional): 通行去重器
+            max_skip (int): 最大跳帧步长
+            on_plate (callable, optional): 判定车牌后的回调，默认调用入场/出场业务
+        """
+        if direction not in ("enter", "exit"):
+            raise ValueError(f"无效的道闸方向: {direction}")
+        self.app = app
+        self.camera_id = camera_id
+        self.source = source
+        self.direction = direction
+        self.deduplicator = deduplicator or PlateDeduplicator()
+        self.max_skip = max_skip
+        self.on_plate = on_plate or self._dispatch
+        # 本地文件按视频时间轴计时 (可快于实时回放)，直播流按系统时钟计时
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.roi = image_preprocess.camera_roi(app.config, camera_id)
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _next_stride(self, stride, fps, elapsed, plate_seen):
+        """
+        计算下一次读取的跳帧步长。
+
+        有车辆时步长等于一次识别期间流过的帧数，使处理速度跟上实时画面；
+        画面空闲时步长逐步加倍至 max_skip，降低空转的识别开销。
+        """
+        if plate_seen or self.deduplicator.active:
+            return max(1, min(self.max_skip, math.ceil(elapsed * fps)))
+        return min(self.max_skip, stride * 2)
+
+    def _dispatch(self, plate_number):
+        """按道闸方向调用入场/出场业务"""
+        from app.services.parking_service import ParkingService
+
+        with self.app.app_context():
+            if self.direction == "enter":
+                result, status_code = ParkingService.vehicle_enter(plate_number)
+            else:
+                result, status_code = ParkingService.vehicle_exit(plate_number)
+        metrics.incr(f"gate.events.{status_code}")
+        print(f"[gate:{self.camera_id}] {plate_number} {self.direction}: {result.get('message')}")
+
+    def _recognize(self, frame):
+        from app.services.parking_service import parking_service
+
+        # 模型预热期间的画面直接丢弃，避免排队等待加载后已是过时画面
+        if parking_service.lpr_status()["state"] == "warming":
+            metrics.incr("gate.dropped_frames")
+            return []
+
+        start = time.perf_counter()
+        try:
+            return parking_service.recognize_plate_candidates(frame, roi=self.roi)
+        except (LprBusyError, LprTimeoutError):
+            metrics.incr("gate.dropped_frames")
+            return []
+        finally:
+            metrics.observe("gate.recognize", time.perf_counter() - start)
+
+    @staticmethod
+    def _read_frame(capture, stride):
+        """跳过 stride - 1 帧 (只 grab 不解码) 后读取一帧，在原生线程中执行"""
+        for _ in range(stride - 1):
+            if not capture.grab():
+                return False, None
+        return capture.read()
+
+    def _consume(self, capture):
+        """读取一个视频流直至结束或停止，返回是否因流结束而退出"""
+        import cv2
+
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        stride = 1
+        while not self._stop.is_set():
+            ok, frame = blocking.run(self._read_frame, capture, stride)
+            if not ok:
+                return True
+
+            now = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 if self.is_file else time.monotonic()
+            start = time.perf_counter()
+            candidates = self._recognize(frame)
+            elapsed = time.perf_counter() - start
+            metrics.incr("gate.frames")
+
+            if candidates:
+                plate = self.deduplicator.observe(candidates[0][0], candidates[0][1], now)
+            else:
+                plate = self.deduplicator.flush(now)
+            if plate:
+                self.on_plate(plate)
+
+            stride = self._next_stride(stride, fps, elapsed, bool(candidates))
+            metrics.gauge(f"gate.{self.camera_id}.stride", stride)
+        return False
+
+    def run(self):
+        """读流识别主循环；直播流断开后自动重连，本地文件读完即结束"""
+        import cv2
+
+        with self.app.app_context():
+            while not self._stop.is_set():
+                # 打开直播流可能长时间阻塞 (连接超时)
+                capture = blocking.run(cv2.VideoCapture, self.source)
+                try:
+                    if capture.isOpened():
+                        ended = self._consume(capture)
+                    else:
+                        ended = True
+                        print(f"[gate:{self.camera_id}] 无法打开视频源: {self.source}")
+                finally:
+                    blocking.run(capture.release)
+
+                if self.is_file:
+                    break
+                if ended:
+                    metrics.incr("gate.reconnects")
+                    self._stop.wait(RECONNECT_SECONDS)
+
+            # 视频结束时补充判定最后一次通行
+            plate = self.deduplicator.flush(math.inf)
+            if plate:
+                self.on_plate(plate)
+
+
+def start_lpr_warmup(app):
+    """在后台线程中加载车牌识别模型并预热，Web 进程启动不必等待"""
+    from app.services.parking_service import parking_service
+
+    # 调试模式下 reloader 父进程不加载模型，避免模型加载两次
+    if app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return
+
+    def warm_up():
+        with app.app_context():
+            parking_service.warm_up_lpr()
+
+    threading.Thread(target=warm_up, name="lpr-warmup", daemon=True).start()
+
+
+def _build_streams(app, cameras, on_plate=None):
+    return [
+        GateStream(
+            app,
+            camera_id=camera.get("id", str(index)),
+            source=camera["source"],
+            direction=camera["direction"],
+            deduplicator=PlateDeduplicator(
+                window_seconds=app.config.get("GATE_DEDUP_WINDOW_SECONDS", 3.0),
+                min_votes=app.config.get("GATE_MIN_VOTES", 2),
+                cooldown_seconds=app.config.get("GATE_COOLDOWN_SECONDS", 30.0),
+            ),
+            max_skip=app.config.get("GATE_MAX_FRAME_SKIP", 15),
+            on_plate=on_plate,
+        )
+        for index, camera in enumerate(cameras)
+    ]
+
+
+def start_gate_streams(app):
+    """按 GATE_CAMERAS 配置为每个摄像头启动后台识别线程"""
+    # 调试模式下 reloader 父进程不启动，避免同一摄像头被打开两次、每辆车重复触发入场/出场
+    if app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return []
+    cameras = json.loads(app.config.get("GATE_CAMERAS") or "[]")
+    streams = _build_streams(app, cameras)
+    for stream in streams:
+        threading.Thread(
+            target=stream.run, name=f"gate-{stream.camera_id}", daemon=True
+        ).start()
+    return streams
+
+
+if __name__ == "__main__":
+    import argparse
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description="道闸摄像头流式车牌识别")
+    parser.add_argument("--source", help="视频流地址或本地视频文件，缺省时运行 GATE_CAMERAS 中的全部摄像头")
+    parser.add_argument("--direction", choices=["enter", "exit"], default="enter")
+    parser.add_argument("--camera-id", default="cli")
+    parser.add_argument("--dry-run", action="store_true", help="只打印判定的车牌，不调用入场/出场业务")
+    args = parser.parse_args()
+
+    app = create_app(os.getenv("FLASK_ENV", "development"))
+    if args.source:
+        cameras = [{"id": args.camera_id, "source": args.source, "direction": args.direction}]
+    else:
+        cameras = json.loads(app.config.get("GATE_CAMERAS") or "[]")
+
+    on_plate = (lambda plate: print(f"判定车牌: {plate}")) if args.dry_run else None
+    threads = []
+    for stream in _build_streams(app, cameras, on_plate=on_plate):
+        thread = threading.Thread(target=stream.run, name=f"gate-{stream.camera_id}")
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    print(json.dumps(metrics.snapshot(), ensure_ascii=False, indent=2))
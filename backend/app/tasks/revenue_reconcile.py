@@ -0,0 +1,30 @@
+"""
+每日营收汇总校准任务，按 parking_order 修正 revenue_daily 中增量维护的营收汇总。
+"""
+
+from datetime import datetime, timedelta
+from app.utils import revenue_rollup
+
+
+def reconcile_revenue(app):
+    """重新汇总最近 REVENUE_RECONCILE_DAYS 天 (含当天) 的营收并修正差异；返回修正行数，失败时返回 None"""
+    with app.app_context():
+        try:
+            today = datetime.utcnow().date()
+            days = app.config.get('REVENUE_RECONCILE_DAYS', 7)
+            fixed = revenue_rollup.reconcile(today - timedelta(days=days - 1), today)
+            if fixed:
+                print(f"营收汇总已校准: 修正 {fixed} 行")
+            return fixed
+        except Exception as e:
+            print(f"营收汇总校准失败: {str(e)}")
+
+
+if __name__ == "__main__":
+    import os
+    from app import create_app
+
+    # 命令行运行时按全部历史订单回填汇总表 (首次部署或汇总表数据异常时执行)
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        print(revenue_rollup.backfill())
@@ -0,0 +1,26 @@
+"""
+学校名册镜像同步定时任务，将 school_db 中的 school_members 增量同步到本地 school_member_mirror。
+"""
+
+from app.utils import roster_mirror
+
+
+def sync_school_roster(app):
+    """按 user_no 分批同步学校名册，只写入变化的行；返回同步统计，失败时返回 None"""
+    with app.app_context():
+        try:
+            stats = roster_mirror.sync(app.config.get('ROSTER_SYNC_CHUNK_SIZE', 2000))
+            if stats["inserted"] or stats["updated"] or stats["deleted"]:
+                print(f"名册镜像已同步: {stats}")
+            return stats
+        except Exception as e:
+            from app.extensions import db
+            db.session.rollback()
+            print(f"名册镜像同步失败: {str(e)}")
+
+
+if __name__ == "__main__":
+    import os
+    from app import create_app
+
+    print(sync_school_roster(create_app(os.getenv('FLASK_ENV', 'development'))))
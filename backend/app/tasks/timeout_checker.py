@@ -70,5 +70,44 @@ def start_scheduler(app):
         id='check_reservation_timeout'
     )
     
+    # 区域车位计数器校准
+    from app.tasks.cache_reconciler import reconcile_zone_counters
+    scheduler.add_job(
+        func=lambda: reconcile_zone_counters(app),
+        trigger='interval',
+        minutes=app.config.get('ZONE_STATS_RECONCILE_MINUTES', 5),
+        id='reconcile_zone_counters'
+    )
+    
+    # 预约占位校准 (启动时立即执行一次以开启快速通道)
+    from app.tasks.cache_reconciler import reconcile_reservation_claims
+    scheduler.add_job(
+        func=lambda: reconcile_reservation_claims(app),
+        trigger='interval',
+        minutes=app.config.get('CLAIMS_RECONCILE_MINUTES', 5),
+        next_run_time=datetime.now(),
+        id='reconcile_reservation_claims'
+    )
+    
+    # 学校名册镜像同步 (启动时立即执行一次)
+    from app.tasks.roster_sync import sync_school_roster
+    scheduler.add_job(
+        func=lambda: sync_school_roster(app),
+        trigger='interval',
+        minutes=app.config.get('ROSTER_SYNC_MINUTES', 10),
+        next_run_time=datetime.now(),
+        id='sync_school_roster'
+    )
+    
+    # 每晚校准每日营收汇总 (启动时立即执行一次，新部署时补齐仪表盘所需的最近数天)
+    from app.tasks.revenue_reconcile import reconcile_revenue
+    scheduler.add_job(
+        func=lambda: reconcile_revenue(app),
+        trigger='cron',
+        hour=app.config.get('REVENUE_RECONCILE_HOUR', 3),
+        next_run_time=datetime.now(),
+        id='reconcile_revenue'
+    )
+    
     scheduler.start()
     print('定时任务已启动 (正式模式: 1小时频率)')
@@ -0,0 +1,34 @@
+"""
+批量开通账号任务，按学校名册为师生批量创建 sys_user 账号。
+"""
+
+from app.utils import user_provisioner
+
+
+def provision_users(app, job_id, user_nos=None, initial_password=None):
+    """执行批量开通 (由管理接口在后台线程中启动，或在命令行中直接运行)；返回最终进度"""
+    with app.app_context():
+        progress = user_provisioner.run(
+            job_id,
+            user_nos=user_nos,
+            initial_password=initial_password,
+            chunk_size=app.config.get('PROVISION_CHUNK_SIZE', 1000),
+            processes=app.config.get('PROVISION_HASH_PROCESSES') or None,
+            method=app.config.get('PROVISION_HASH_METHOD') or None,
+        )
+        print(f"批量开通账号结束: {progress}")
+        return progress
+
+
+if __name__ == "__main__":
+    import os
+    from app import create_app
+
+    # 命令行运行时开通全部名册，须以 PROVISION_INITIAL_PASSWORD 指定统一初始密码 (账号首次登录时须修改)
+    initial_password = os.getenv('PROVISION_INITIAL_PASSWORD') or ''
+    if len(initial_password) < 6:
+        raise SystemExit("请通过 PROVISION_INITIAL_PASSWORD 指定至少6位的初始密码")
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        job_id = user_provisioner.acquire()
+    provision_users(app, job_id, initial_password=initial_password)
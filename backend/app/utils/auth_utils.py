@@ -1,20 +1,22 @@
-from werkzeug.security import generate_password_hash, check_password_hash
+import hashlib
+import time
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, current_app
 from app.models.user import SysUser
+from app.utils import metrics, principal_cache, session_registry, password_hasher
 
 def hash_password(password):
-    """Hash password"""
-    return generate_password_hash(password)
+    """Hash password (在原生线程中计算，不阻塞事件循环；算法由 PASSWORD_HASH_METHOD 配置)"""
+    return password_hasher.hash_password(password)
 
 def verify_password(password_hash, password):
-    """Verify password"""
-    return check_password_hash(password_hash, password)
+    """Verify password (在原生线程中计算，不阻塞事件循环)"""
+    return password_hasher.verify_password(password_hash, password)
 
-def generate_token(user_id, role):
-    """Generate JWT token"""
+def generate_token(user_id, role, sgen=None):
+    """Generate JWT token (sgen: 登录会话代次，用于单设备登录校验)"""
     import uuid
     payload = {
         'user_id': user_id,
@@ -23,6 +25,8 @@ def generate_token(user_id, role):
         'nonce': str(uuid.uuid4()),
         'exp': datetime.utcnow() + current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
     }
+    if sgen is not None:
+        payload['sgen'] = sgen
     token = jwt.encode(payload, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
     return token
 
@@ -59,12 +63,28 @@ def token_required(f):
             return jsonify({'success': False, 'message': 'Token无效或已过期'}), 401
         
         user_id = payload.get('user_id')
+
+        # 已认证身份缓存：命中时跳过会话校验与用户查询
+        digest = hashlib.sha256(token.encode()).hexdigest()
+        cache = principal_cache.get_cache(current_app.config)
+        if cache is not None:
+            principal = cache.lookup(digest)
+            if principal is not None:
+                return f(principal, *args, **kwargs)
+            generation = cache.generation
+        start = time.perf_counter()
         
-        # --- 核心：单设备登陆检查 ---
+        # --- 核心：单设备登陆检查 (按会话代次在本地校验；升级前签发的 token 仍比对 Redis 中保存的 token) ---
         import app.extensions
         if app.extensions.redis_client:
-            stored_token = app.extensions.redis_client.get(f"user_session:{user_id}")
-            if stored_token and stored_token != token:
+            if payload.get('sgen') is not None:
+                kicked = not session_registry.is_current(
+                    user_id, payload['sgen'], current_app.config.get('SESSION_SYNC_MAX_LAG_SECONDS', 5)
+                )
+            else:
+                stored_token = app.extensions.redis_client.get(f"user_session:{user_id}")
+                kicked = bool(stored_token and stored_token != token)
+            if kicked:
                 return jsonify({
                     'success': False, 
                     'message': '您的账号已在别处登陆，请重新登陆',
@@ -75,6 +95,11 @@ def token_required(f):
         current_user = SysUser.query.get(user_id)
         if not current_user or not current_user.is_active:
             return jsonify({'success': False, 'message': '用户不存在或已被禁用'}), 401
+
+        elapsed = time.perf_counter() - start
+        metrics.observe("auth.resolve", elapsed)
+        if cache is not None:
+            cache.store(digest, current_user, generation, elapsed, payload.get('exp'))
         
         return f(current_user, *args, **kwargs)
     
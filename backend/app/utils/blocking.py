@@ -0,0 +1,27 @@
+"""
+阻塞调用执行模块。
+
+生产环境以 eventlet 单 worker 运行，threading 已被 monkey patch，后台 "线程" 实际是协程。OpenCV 读流与解码、
+进程内模型推理等不经过 eventlet 的阻塞调用会冻结整个事件循环，期间所有 HTTP 与 Socket.IO 客户端都会停顿。
+run 在 eventlet 已 monkey patch 时通过 eventlet.tpool 交给原生线程执行 (等待期间让出事件循环)，否则直接调用。
+
+注意：原生线程中没有 Flask 应用上下文，传入的函数不能访问 current_app。
+"""
+
+
+def eventlet_patched():
+    """threading 是否已被 eventlet monkey patch"""
+    try:
+        from eventlet import patcher
+    except ImportError:
+        return False
+    return patcher.is_monkey_patched("thread")
+
+
+def run(fn, *args, **kwargs):
+    """执行阻塞调用 fn(*args, **kwargs) 并返回其结果"""
+    if eventlet_patched():
+        from eventlet import tpool
+
+        return tpool.execute(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
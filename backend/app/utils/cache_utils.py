@@ -0,0 +1,155 @@
+"""
+防击穿缓存工具模块。
+
+同一个缓存 key 失效时只允许一个调用方在 Redis 短租约锁下回源重算，其余调用方短暂等待结果
+或在 stale-while-revalidate 窗口内直接读取旧值。命中、回源及合并等待次数记录在 metrics 中：
+    cache.{name}.hit / cache.{name}.stale / cache.{name}.miss / cache.{name}.coalesced
+"""
+
+import json
+import time
+import uuid
+from app.utils import metrics
+
+# 仅释放自己持有的租约，避免误删他人在租约过期后重新获取的锁
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+_release_script = None
+
+POLL_INTERVAL_SECONDS = 0.05
+
+
+def acquire_lease(lock_key, lease_seconds=5):
+    """
+    尝试获取短租约锁。
+
+    Returns:
+        str | None: 成功时返回租约令牌；Redis 不可用时视为获取成功
+    """
+    from app.extensions import redis_client
+
+    token = uuid.uuid4().hex
+    if not redis_client:
+        return token
+    try:
+        if redis_client.set(lock_key, token, nx=True, px=int(lease_seconds * 1000)):
+            return token
+        return None
+    except:
+        return token
+
+
+def release_lease(lock_key, token):
+    """释放租约锁"""
+    global _release_script
+    from app.extensions import redis_client
+
+    if not redis_client or not token:
+        return
+    try:
+        if _release_script is None:
+            _release_script = redis_client.register_script(_RELEASE_LUA)
+        _release_script(keys=[lock_key], args=[token])
+    except:
+        pass
+
+
+def single_flight(name, lock_key, fill, retry, wait_seconds=1.0, lease_seconds=5):
+    """
+    合并并发回源：获得租约者执行 fill()，其余调用方轮询 retry() 直至取得结果或等待超时。
+
+    Args:
+        name (str): 指标名称
+        lock_key (str): 租约锁 key
+        fill (callable): 回源重算并写入缓存，返回结果
+        retry (callable): 重新读取缓存，未就绪时返回 None
+        wait_seconds (float): 未获得租约时的最长等待时间，超时后自行回源
+        lease_seconds (float): 租约时长，应大于一次回源的耗时
+
+    Returns:
+        any: 回源或等待得到的结果
+    """
+    token = acquire_lease(lock_key, lease_seconds)
+    if token:
+        metrics.incr(f"cache.{name}.miss")
+        try:
+            return fill()
+        finally:
+            release_lease(lock_key, token)
+
+    deadline = time.monotonic() + wait_seconds
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL_SECONDS)
+        result = retry()
+        if result is not None:
+            metrics.incr(f"cache.{name}.coalesced")
+            return result
+
+    metrics.incr(f"cache.{name}.miss")
+    return fill()
+
+
+def cached(name, key, loader, ttl, stale_ttl=0, wait_seconds=1.0, lease_seconds=5):
+    """
+    读取 JSON 缓存，失效时单飞回源。
+
+    值在 Redis 中保存为 {"v": 数据, "t": 新鲜截止时间戳}，key 的实际过期时间为 ttl + stale_ttl。
+    超过新鲜期但仍在 stale 窗口内时：获得租约者同步刷新，其余调用方直接返回旧值。
+
+    Args:
+        name (str): 指标名称
+        key (str): 缓存 key
+        loader (callable): 回源函数，返回可 JSON 序列化的数据
+        ttl (int): 新鲜期 (秒)
+        stale_ttl (int): 过期后仍可返回旧值的窗口 (秒)
+
+    Returns:
+        any: 缓存或回源得到的数据
+    """
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return loader()
+
+    def read():
+        try:
+            raw = redis_client.get(key)
+            return json.loads(raw) if raw else None
+        except:
+            return None
+
+    def fill():
+        data = loader()
+        try:
+            envelope = {"v": data, "t": time.time() + ttl}
+            redis_client.setex(key, ttl + stale_ttl, json.dumps(envelope))
+        except:
+            pass
+        return data
+
+    envelope = read()
+    if envelope is not None:
+        if envelope["t"] >= time.time():
+            metrics.incr(f"cache.{name}.hit")
+            return envelope["v"]
+        token = acquire_lease(f"lock:{key}", lease_seconds)
+        if not token:
+            metrics.incr(f"cache.{name}.stale")
+            return envelope["v"]
+        metrics.incr(f"cache.{name}.miss")
+        try:
+            return fill()
+        finally:
+            release_lease(f"lock:{key}", token)
+
+    def retry():
+        envelope = read()
+        return envelope["v"] if envelope is not None else None
+
+    return single_flight(
+        name, f"lock:{key}", fill, retry, wait_seconds=wait_seconds, lease_seconds=lease_seconds
+    )
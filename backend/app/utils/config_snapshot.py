@@ -0,0 +1,202 @@
+"""
+系统配置快照模块。
+
+将 sys_config 表 (缺失项取应用配置默认值) 解析为进程内只读快照，计费、预约等热路径读取配置无需访问数据库。
+
+各区域的分时/阶梯计费方案 (parking_zone.tariff) 在加载快照时编译为累计费用表，随快照一同缓存与失效。
+
+配置变更时递增 Redis 版本号 sys_config:version 并在 sys_config:changed 频道发布新版本，各 worker 收到后
+在下一次读取时重新加载快照。订阅断线期间可能丢失的通知由重连时的版本号比对及 VERSION_CHECK_SECONDS
+周期性比对兜底。
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Mapping, Optional
+from app.utils import metrics, pubsub
+
+VERSION_KEY = "sys_config:version"
+CHANNEL = "sys_config:changed"
+
+# 未收到订阅通知时，按此间隔比对一次 Redis 版本号 (只读 Redis，不访问数据库)
+VERSION_CHECK_SECONDS = 30
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """只读配置快照"""
+
+    version: int
+    fee_multiplier: Decimal
+    # 数据库中的角色折扣 {"角色": 折扣}；未配置时为 None，由调用方回退到应用配置
+    role_discount: Optional[Mapping[str, Decimal]]
+    min_credit_score: int
+    good_credit_score: int
+    perfect_credit_score: int
+    violation_fee: Decimal
+    reservation_timeout_minutes: int
+    payment_timeout_hours: int
+    credit_penalty_timeout: int
+    credit_penalty_delay: int
+    # 区域ID -> 已编译的分时/阶梯计费方案 (CompiledTariff)；未配置方案的区域按 fee_rate 平价计费
+    zone_tariffs: Mapping[int, object]
+
+    def discount_for(self, user_role, fallback=None):
+        """
+        获取角色折扣。
+
+        Args:
+            user_role (int): 用户角色
+            fallback (dict, optional): 数据库未配置折扣时使用的 {角色: 折扣}
+
+        Returns:
+            Decimal: 折扣率
+        """
+        if self.role_discount is not None:
+            return self.role_discount.get(str(user_role), Decimal("1.0"))
+        return Decimal(str((fallback or {}).get(user_role, 1.0)))
+
+
+_snapshot = None
+_latest_version = 0
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _parse(value):
+    """按 JSON / 数值 / 字符串的顺序解析配置值"""
+    try:
+        return json.loads(value)
+    except:
+        return value
+
+
+def _read_version():
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return 0
+    try:
+        return int(redis_client.get(VERSION_KEY) or 0)
+    except:
+        return 0
+
+
+def _load(version, app_config):
+    """一次查询读取全部配置行，并编译各区域计费方案，构建快照"""
+    from app.models.config import SysConfig
+    from app.models.parking import ParkingZone
+    from app.utils.tariff import compile_tariff
+
+    rows = dict(SysConfig.query.with_entities(SysConfig.config_key, SysConfig.config_value).all())
+    utc_offset = app_config.get("TARIFF_UTC_OFFSET_HOURS", 8)
+    zone_tariffs = MappingProxyType({
+        zone_id: compile_tariff(tariff, fee_rate or 0, utc_offset)
+        for zone_id, fee_rate, tariff in ParkingZone.query.with_entities(
+            ParkingZone.zone_id, ParkingZone.fee_rate, ParkingZone.tariff
+        ).filter(ParkingZone.tariff.isnot(None))
+        if tariff
+    })
+
+    def value(key, default):
+        return _parse(rows[key]) if key in rows else default
+
+    # 与原计费逻辑一致：折扣配置为空 (或未配置) 时 role_discount 为 None，按应用配置 ROLE_DISCOUNT 计算
+    role_discount = None
+    if rows.get("ROLE_DISCOUNT"):
+        try:
+            discounts = json.loads(rows["ROLE_DISCOUNT"])
+            role_discount = MappingProxyType(
+                {str(role): Decimal(str(rate)) for role, rate in discounts.items()}
+            )
+        except:
+            # 与原计费逻辑一致：折扣配置无法解析时按无折扣计算
+            role_discount = MappingProxyType({})
+
+    return ConfigSnapshot(
+        version=version,
+        fee_multiplier=Decimal(str(rows.get("FEE_MULTIPLIER", "1.0"))),
+        role_discount=role_discount,
+        min_credit_score=int(value("MIN_CREDIT_SCORE", app_config.get("MIN_CREDIT_SCORE", 70))),
+        good_credit_score=int(value("GOOD_CREDIT_SCORE", app_config.get("GOOD_CREDIT_SCORE", 85))),
+        perfect_credit_score=int(
+            value("PERFECT_CREDIT_SCORE", app_config.get("PERFECT_CREDIT_SCORE", 100))
+        ),
+        violation_fee=Decimal(str(value("VIOLATION_FEE", app_config.get("VIOLATION_FEE", 5.0)))),
+        reservation_timeout_minutes=int(
+            value("RESERVATION_TIMEOUT_MINUTES", app_config.get("RESERVATION_TIMEOUT_MINUTES", 30))
+        ),
+        payment_timeout_hours=int(
+            value("PAYMENT_TIMEOUT_HOURS", app_config.get("PAYMENT_TIMEOUT_HOURS", 24))
+        ),
+        credit_penalty_timeout=int(
+            value("CREDIT_PENALTY_TIMEOUT", app_config.get("CREDIT_PENALTY_TIMEOUT", 30))
+        ),
+        credit_penalty_delay=int(
+            value("CREDIT_PENALTY_DELAY", app_config.get("CREDIT_PENALTY_DELAY", 10))
+        ),
+        zone_tariffs=zone_tariffs,
+    )
+
+
+def _on_changed(data):
+    """订阅通知：记录最新版本号；连接 (重新) 建立时主动读取一次"""
+    global _latest_version
+    version = int(data) if data is not None else _read_version()
+    with _lock:
+        _latest_version = max(_latest_version, version)
+
+
+pubsub.subscribe(CHANNEL, _on_changed)
+
+
+def get():
+    """
+    获取当前配置快照，版本落后时重新加载。
+
+    Returns:
+        ConfigSnapshot
+    """
+    global _snapshot, _latest_version, _checked_at
+    from flask import current_app
+
+    now = time.monotonic()
+    if now - _checked_at >= VERSION_CHECK_SECONDS or not pubsub.is_listening():
+        _checked_at = now
+        _on_changed(None)
+
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version >= _latest_version:
+        metrics.incr("config_snapshot.hit")
+        return snapshot
+
+    with _lock:
+        if _snapshot is not None and _snapshot.version >= _latest_version:
+            return _snapshot
+        # 先取版本号再读数据库：加载期间发生的变更会使版本号再次领先，下一次读取重新加载
+        version = max(_read_version(), _latest_version)
+        _snapshot = _load(version, current_app.config)
+        _latest_version = max(_latest_version, version)
+    metrics.incr("config_snapshot.reload")
+    return _snapshot
+
+
+def bump():
+    """配置已写入数据库后调用：递增版本号并通知所有 worker"""
+    global _snapshot
+    from app.extensions import redis_client
+
+    with _lock:
+        _snapshot = None
+    if not redis_client:
+        return
+    try:
+        version = redis_client.incr(VERSION_KEY)
+        pubsub.publish(CHANNEL, version)
+        _on_changed(str(version))
+    except:
+        pass
@@ -1,7 +1,7 @@
 from datetime import datetime
 from decimal import Decimal
 
-def calculate_parking_fee(in_time, out_time, fee_rate, free_time_minutes, user_role, role_discount):
+def calculate_parking_fee(in_time, out_time, fee_rate, free_time_minutes, user_role, role_discount, zone_id=None):
     """
     计算停车费用
     
@@ -12,13 +12,34 @@ def calculate_parking_fee(in_time, out_time, fee_rate, free_time_minutes, user_r
         free_time_minutes: 免费时长(分钟)
         user_role: 用户角色
         role_discount: 角色折扣配置
+        zone_id: 区域ID，区域配置了分时/阶梯计费方案时按方案计费
     
+    Returns:
+        Decimal: 应付费用
+    """
+    from app.utils import config_snapshot
+
+    # 获取动态业务配置 (进程内配置快照，无数据库往返)；数据库未配置折扣时兼容旧配置
+    snapshot = config_snapshot.get()
+    discount = snapshot.discount_for(user_role, role_discount)
+    tariff = snapshot.zone_tariffs.get(zone_id) if zone_id is not None else None
+    return compute_fee(
+        in_time, out_time, fee_rate, free_time_minutes, discount, snapshot.fee_multiplier, tariff=tariff
+    )
+
+def compute_fee(in_time, out_time, fee_rate, free_time_minutes, discount, multiplier, tariff=None):
+    """
+    按给定折扣与倍率计算停车费用 (不读取配置)。
+
+    Args:
+        discount (Decimal): 角色折扣率
+        multiplier (Decimal): 费用倍率因子
+        tariff (CompiledTariff, optional): 已编译的分时/阶梯计费方案，缺省时按 fee_rate 平价计费
+
     Returns:
         Decimal: 应付费用
     """
     import math
-    from app.models.config import SysConfig
-    import json
 
     if not in_time or not out_time:
         return Decimal('0.00')
@@ -34,31 +55,195 @@ def calculate_parking_fee(in_time, out_time, fee_rate, free_time_minutes, user_r
     # 计费规则：超过免费时长后，按小时计费，不足1小时按1小时计 (向上取整)
     chargeable_hours = math.ceil(duration / 60)
     
-    # 1. 获取动态业务配置
-    # 获取倍率因子 (默认 1.0)
-    db_multiplier = SysConfig.get_value('FEE_MULTIPLIER', '1.0')
-    multiplier = Decimal(str(db_multiplier))
-    
-    # 2. 获取动态角色折扣 (默认无折扣)
-    db_discounts = SysConfig.get_value('ROLE_DISCOUNT')
-    if db_discounts:
-        try:
-            discounts = json.loads(db_discounts)
-            discount_val = discounts.get(str(user_role), 1.0)
-        except:
-            discount_val = 1.0
+    # 计算最终费用 (分时/阶梯方案查累计费用表)
+    if tariff is not None:
+        base_fee = tariff.base_fee(tariff.local_hour(in_time), chargeable_hours)
     else:
-        # 兼容旧配置
-        discount_val = role_discount.get(user_role, 1.0)
-        
-    discount = Decimal(str(discount_val))
-    
-    # 3. 计算最终费用
-    final_fee = Decimal(str(chargeable_hours)) * Decimal(str(fee_rate)) * discount * multiplier
+        base_fee = Decimal(str(chargeable_hours)) * Decimal(str(fee_rate))
+    final_fee = base_fee * discount * multiplier
     
     # 保留两位小数
     return final_fee.quantize(Decimal('0.01'))
 
+def _scaled_integers(values):
+    """
+    将一组十进制数放大为同一 10 的幂次下的整数，相同取值只转换一次。
+
+    Returns:
+        tuple: ([整数, ...], 小数位数)
+    """
+    decimals = {}
+    for v in values:
+        if v not in decimals:
+            decimals[v] = Decimal(str(v))
+    scale = max([max(0, -d.as_tuple().exponent) for d in decimals.values()] or [0])
+    scaled = {v: int(d.scaleb(scale)) for v, d in decimals.items()}
+    return [scaled[v] for v in values], scale
+
+def _div_half_even(numerator, divisor):
+    """非负整数数组按银行家舍入整除 (与 Decimal.quantize 默认的 ROUND_HALF_EVEN 一致)"""
+    quotient = numerator // divisor
+    twice_remainder = 2 * (numerator - quotient * divisor)
+    round_up = (twice_remainder > divisor) | ((twice_remainder == divisor) & (quotient % 2 == 1))
+    return quotient + round_up
+
+def _tariff_groups(tariffs):
+    """按计费方案对象分组，返回 [(CompiledTariff, 布尔掩码), ...] (平价计费的订单不在任何分组中)"""
+    import numpy
+
+    index = {}
+    distinct = []
+
+    def code(tariff):
+        if tariff is None:
+            return -1
+        if id(tariff) not in index:
+            index[id(tariff)] = len(distinct)
+            distinct.append(tariff)
+        return index[id(tariff)]
+
+    codes = numpy.fromiter((code(t) for t in tariffs), dtype=numpy.int64)
+    return [(tariff, codes == c) for c, tariff in enumerate(distinct)]
+
+def calculate_parking_fees_bulk(in_times, out_times, fee_rates, free_time_minutes, user_roles,
+                                role_discount, multiplier=None, discounts=None, tariffs=None):
+    """
+    批量计算停车费用 (NumPy 向量化)，逐项结果与 calculate_parking_fee 完全一致。
+
+    Args:
+        in_times / out_times: datetime 序列或 numpy datetime64 数组 (UTC)，缺失值为 None / NaT
+        其余参数同 calculate_parking_fees_elapsed (入场小时由 in_times 取得)
+
+    Returns:
+        numpy.ndarray: int64 费用数组，单位为分
+    """
+    import numpy
+    from datetime import timedelta
+
+    if isinstance(in_times, numpy.ndarray) and isinstance(out_times, numpy.ndarray):
+        in_us = in_times.astype("datetime64[us]")
+        out_us = out_times.astype("datetime64[us]")
+        valid = ~(numpy.isnat(in_us) | numpy.isnat(out_us))
+        elapsed_us = numpy.where(valid, (out_us - in_us).astype(numpy.int64), 0)
+        in_hours = None
+        if tariffs is not None:
+            hour_of_day = (in_us.astype("datetime64[h]") - in_us.astype("datetime64[D]")).astype(numpy.int64)
+            in_hours = numpy.where(valid, hour_of_day, 0)
+    else:
+        # datetime 对象序列逐项相减比先转换为 datetime64 数组快数倍
+        microsecond = timedelta(microseconds=1)
+        valid = numpy.fromiter(
+            (i is not None and o is not None for i, o in zip(in_times, out_times)), dtype=bool
+        )
+        elapsed_us = numpy.fromiter(
+            ((o - i) // microsecond if v else 0 for i, o, v in zip(in_times, out_times, valid)),
+            dtype=numpy.int64,
+            count=len(valid),
+        )
+        in_hours = None
+        if tariffs is not None:
+            in_hours = numpy.fromiter(
+                (i.hour if i is not None else 0 for i in in_times), dtype=numpy.int64, count=len(valid)
+            )
+    return calculate_parking_fees_elapsed(
+        elapsed_us, valid, fee_rates, free_time_minutes, user_roles,
+        role_discount, multiplier=multiplier, discounts=discounts,
+        tariffs=tariffs, in_hours=in_hours,
+    )
+
+def calculate_parking_fees_elapsed(elapsed_us, valid, fee_rates, free_time_minutes, user_roles,
+                                   role_discount, multiplier=None, discounts=None, tariffs=None, in_hours=None):
+    """
+    按停车时长 (整数微秒) 批量计算停车费用。
+
+    时长按与标量版本相同的浮点运算取整为计费小时；费率、折扣、倍率各自放大为整数后以 int64 相乘，
+    最后按 ROUND_HALF_EVEN 舍入到分，全程不经过浮点金额。从数据库批量计费时可直接以
+    TIMESTAMPDIFF(MICROSECOND, in_time, out_time) 取得时长，省去 datetime 对象的转换。
+
+    Args:
+        elapsed_us: 停车时长 (微秒) 序列
+        valid: 入场/出场时间均存在的布尔序列 (缺失时费用为 0)
+        fee_rates: 每小时费率序列
+        free_time_minutes: 免费时长(分钟)序列
+        user_roles: 用户角色序列
+        role_discount: 数据库未配置折扣时的角色折扣 (同 calculate_parking_fee)
+        multiplier (Decimal, optional): 费用倍率，缺省时取配置快照
+        discounts (dict, optional): {角色: 折扣}，缺省时按配置快照逐角色取折扣 (用于模拟调价)
+        tariffs (optional): 每单的 CompiledTariff 序列，平价计费的订单为 None
+        in_hours (optional): 每单入场时刻的 UTC 小时 (0~23)，tariffs 不为空时必填
+
+    Returns:
+        numpy.ndarray: int64 费用数组，单位为分
+    """
+    import numpy
+
+    elapsed_us = numpy.asarray(elapsed_us, dtype=numpy.int64)
+    valid = numpy.asarray(valid, dtype=bool)
+    roles = numpy.asarray(user_roles, dtype=numpy.int64)
+    free = numpy.asarray(free_time_minutes, dtype=numpy.float64)
+    if len(roles) == 0:
+        return numpy.zeros(0, dtype=numpy.int64)
+
+    unique_roles = numpy.unique(roles)
+    if multiplier is None or discounts is None:
+        from app.utils import config_snapshot
+
+        snapshot = config_snapshot.get()
+        if multiplier is None:
+            multiplier = snapshot.fee_multiplier
+        if discounts is None:
+            discounts = {
+                int(role): snapshot.discount_for(int(role), role_discount) for role in unique_roles
+            }
+
+    # 与 timedelta.total_seconds() / 60 相同的浮点运算：整数微秒 / 1e6 (两者均为正确舍入)
+    duration = elapsed_us / 1e6 / 60
+    chargeable = valid & ~(duration <= free)
+    hours = numpy.where(chargeable, numpy.ceil(duration / 60), 0).astype(numpy.int64)
+
+    rate_values, rate_scale = _scaled_integers(list(fee_rates))
+    rates = numpy.asarray(rate_values, dtype=numpy.int64)
+    discount_values, discount_scale = _scaled_integers(
+        [discounts.get(int(role), Decimal("1.0")) for role in unique_roles]
+    )
+    role_factors = numpy.asarray(discount_values, dtype=numpy.int64)[
+        numpy.searchsorted(unique_roles, roles)
+    ]
+    (multiplier_value,), multiplier_scale = _scaled_integers([multiplier])
+
+    # 分时/阶梯方案的订单查累计费用表，费率与费用表放大到相同的小数位数
+    groups = _tariff_groups(tariffs) if tariffs is not None else []
+    base_scale = max([rate_scale] + [tariff.scale for tariff, _ in groups])
+    rates = rates * 10 ** (base_scale - rate_scale)
+    scale = base_scale + discount_scale + multiplier_scale
+
+    # int64 溢出保护：极端输入时改用 Python 整数 (结果不变，只是更慢)
+    max_hours = int(hours.max())
+    base_bound = max_hours * int(rates.max())
+    for tariff, _ in groups:
+        day_cost = max(row[-1] for row in tariff.table)
+        base_bound = max(base_bound, (max_hours // 24 + 1) * int(day_cost.scaleb(base_scale)))
+    dtype = numpy.int64
+    if base_bound * int(role_factors.max()) * multiplier_value >= 2 ** 62:
+        dtype = object
+        rates, role_factors = rates.astype(object), role_factors.astype(object)
+
+    base = hours.astype(dtype) * rates
+    if groups:
+        start_hours = numpy.asarray(in_hours, dtype=numpy.int64)
+        days, remainder = numpy.divmod(hours, 24)
+        for tariff, mask in groups:
+            table = tariff.scaled_table(base_scale, dtype)
+            start = (start_hours[mask] + tariff.utc_offset_hours) % 24
+            base[mask] = days[mask].astype(dtype) * table[start, 24] + table[start, remainder[mask]]
+
+    numerator = base * role_factors * multiplier_value
+    if scale >= 2:
+        cents = _div_half_even(numerator, 10 ** (scale - 2))
+    else:
+        cents = numerator * 10 ** (2 - scale)
+    return cents.astype(numpy.int64)
+
 def get_discount_rate(user_role, role_discount):
     """获取用户折扣率"""
     return role_discount.get(user_role, 1.0)
@@ -0,0 +1,172 @@
+"""
+车牌识别图像预处理模块。
+
+    读取   按大小上限从上传流直接读入预分配缓冲区 (readinto)，避免 read() 产生的额外副本
+    尺寸   只解析 JPEG/PNG 文件头获取宽高，不解码像素
+    解码   图像长边超出识别所需分辨率时以 IMREAD_REDUCED_COLOR_2/4/8 缩小解码 (JPEG 在 DCT 阶段缩放，耗时与内存成倍下降)
+    裁剪   按道闸摄像头配置的感兴趣区域 (ROI，按宽高比例) 裁剪
+
+缩小解码未能识别出车牌时，由调用方以原始分辨率重试。
+"""
+
+import json
+import struct
+
+# 缩小解码倍数 -> OpenCV 解码标志名
+_REDUCED_FLAGS = {2: "IMREAD_REDUCED_COLOR_2", 4: "IMREAD_REDUCED_COLOR_4", 8: "IMREAD_REDUCED_COLOR_8"}
+
+# 含尺寸信息的 JPEG SOF 标记 (排除 DHT/JPG/DAC)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class ImageTooLargeError(Exception):
+    """上传图片超出大小上限"""
+
+
+def read_upload(file_storage, max_bytes):
+    """
+    从上传文件流读取全部内容。
+
+    已知 Content-Length 时一次性预分配缓冲区，否则按块扩展；超出上限立即停止读取。
+
+    Args:
+        file_storage: werkzeug FileStorage
+        max_bytes (int): 单个文件大小上限
+
+    Returns:
+        bytearray: 文件内容 (numpy.frombuffer 可直接引用，无需复制)
+
+    Raises:
+        ImageTooLargeError: 超出大小上限
+    """
+    stream = file_storage.stream
+    expected = file_storage.content_length or 0
+    if expected > max_bytes:
+        raise ImageTooLargeError(f"图片不能超过 {max_bytes // 1024 // 1024}MB")
+
+    # 缓冲区最多比上限多 1 字节，读满即说明超限
+    buffer = bytearray(expected or min(READ_CHUNK_SIZE, max_bytes + 1))
+    size = 0
+    while True:
+        if size == len(buffer):
+            # 缓冲区已满时先探测是否还有数据，恰好读完时不必再扩容
+            extra = stream.read(1)
+            if not extra:
+                break
+            if size + 1 > max_bytes:
+                raise ImageTooLargeError(f"图片不能超过 {max_bytes // 1024 // 1024}MB")
+            buffer.extend(bytes(min(len(buffer), max_bytes + 1 - size)))
+            buffer[size] = extra[0]
+            size += 1
+        with memoryview(buffer) as view:
+            count = stream.readinto(view[size:])
+        if not count:
+            break
+        size += count
+        if size > max_bytes:
+            raise ImageTooLargeError(f"图片不能超过 {max_bytes // 1024 // 1024}MB")
+
+    del buffer[size:]
+    return buffer
+
+
+def image_size(data):
+    """
+    解析 JPEG/PNG 文件头获取图像尺寸。
+
+    Returns:
+        tuple | None: (宽, 高)，无法识别的格式返回 None
+    """
+    if len(data) >= 24 and data[:8] == b"\x89PNG\r\n\x1a\n":
+        width, height = struct.unpack(">II", bytes(data[16:24]))
+        return width, height
+
+    if len(data) < 4 or data[:2] != b"\xff\xd8":
+        return None
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:  # 填充字节
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:  # 无长度字段的独立标记
+            offset += 2
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", bytes(data[offset + 5:offset + 9]))
+            return width, height
+        (length,) = struct.unpack(">H", bytes(data[offset + 2:offset + 4]))
+        offset += 2 + length
+    return None
+
+
+def reduction_for(data, max_side):
+    """
+    选择缩小解码倍数：缩小后长边仍不低于 max_side 的最大倍数。
+
+    Returns:
+        int: 1 / 2 / 4 / 8，尺寸未知或 max_side 不大于 0 时返回 1
+    """
+    size = image_size(data) if max_side and max_side > 0 else None
+    if not size:
+        return 1
+    long_side = max(size)
+    for factor in (8, 4, 2):
+        if long_side // factor >= max_side:
+            return factor
+    return 1
+
+
+def camera_roi(app_config, camera_id):
+    """
+    读取摄像头的感兴趣区域配置 LPR_CAMERA_ROI ({"摄像头": [x1, y1, x2, y2]}，取值为 0~1 的宽高比例)。
+
+    Returns:
+        tuple | None
+    """
+    if not camera_id:
+        return None
+    rois = app_config.get("LPR_CAMERA_ROI") or "{}"
+    if isinstance(rois, str):
+        rois = json.loads(rois)
+    roi = rois.get(camera_id)
+    return tuple(roi) if roi else None
+
+
+def crop_roi(img, roi):
+    """按比例 ROI 裁剪 (返回视图，不复制像素)"""
+    if not roi or img is None:
+        return img
+    height, width = img.shape[:2]
+    x1, y1, x2, y2 = roi
+    cropped = img[int(y1 * height):int(y2 * height), int(x1 * width):int(x2 * width)]
+    return cropped if cropped.size else img
+
+
+def decode(image_data, reduce=1, roi=None):
+    """
+    解码图像并裁剪 ROI。
+
+    Args:
+        image_data (bytes | bytearray | numpy.ndarray): 原始图片字节或已解码的图像
+        reduce (int): 缩小解码倍数 1 / 2 / 4 / 8
+        roi (tuple, optional): 比例 ROI
+
+    Returns:
+        numpy.ndarray | None: 无法解码时返回 None
+    """
+    import cv2
+    import numpy
+
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        flag = getattr(cv2, _REDUCED_FLAGS[reduce]) if reduce in _REDUCED_FLAGS else cv2.IMREAD_COLOR
+        img = cv2.imdecode(numpy.frombuffer(image_data, numpy.uint8), flag)
+    else:
+        img = image_data
+    return crop_roi(img, roi)
@@ -0,0 +1,92 @@
+"""
+进程内运行指标模块，提供计数器、瞬时值及耗时分布的记录与快照导出。
+
+指标按 worker 进程独立统计，由 /api/admin/metrics 导出。
+"""
+
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_timings = {}
+
+# 每个耗时指标保留的最近样本数，用于估算分位数
+TIMING_WINDOW = 1000
+
+
+def incr(name, value=1):
+    """累加计数器"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def gauge(name, value):
+    """设置瞬时值"""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, seconds):
+    """记录一次耗时 (秒)"""
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            timing = _timings[name] = {
+                "count": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "samples": deque(maxlen=TIMING_WINDOW),
+            }
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+        timing["samples"].append(seconds)
+
+
+def timed(name):
+    """装饰器：记录函数耗时"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start)
+        return decorated_function
+    return decorator
+
+
+def _percentile(sorted_samples, q):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(q * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def snapshot():
+    """
+    导出全部指标快照。
+
+    Returns:
+        dict: {counters, gauges, timings}，耗时单位为毫秒
+    """
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        timings = {}
+        for name, timing in _timings.items():
+            samples = sorted(timing["samples"])
+            timings[name] = {
+                "count": timing["count"],
+                "avg_ms": round(timing["total"] / timing["count"] * 1000, 3),
+                "max_ms": round(timing["max"] * 1000, 3),
+                "p50_ms": round(_percentile(samples, 0.50) * 1000, 3),
+                "p95_ms": round(_percentile(samples, 0.95) * 1000, 3),
+                "p99_ms": round(_percentile(samples, 0.99) * 1000, 3),
+            }
+    return {"counters": counters, "gauges": gauges, "timings": timings}
@@ -0,0 +1,126 @@
+"""
+密码哈希计算模块。
+
+密码哈希 (scrypt / pbkdf2) 刻意设计为高耗时的 CPU 运算。eventlet 单 worker 下直接在请求中计算会阻塞事件循环，
+登录高峰期所有请求随之停顿。此处将哈希计算交给原生线程执行 (hashlib 计算期间释放 GIL，可并行使用多核)：
+    eventlet 已 monkey patch 时   通过 eventlet.tpool 在原生线程中执行，等待期间让出事件循环
+    其他情况                      提交到有界线程池执行
+
+同时执行的哈希计算不超过 PASSWORD_HASH_WORKERS 个，排队及执行中的请求超过 PASSWORD_HASH_QUEUE_SIZE 时
+立即拒绝 (PasswordHashBusyError)，避免登录洪峰耗尽内存 (scrypt 每次计算约占 32MB)。
+
+哈希算法及强度由 PASSWORD_HASH_METHOD 配置 (werkzeug 格式，如 scrypt:32768:8:1、pbkdf2:sha256:600000)，
+登录成功时若已存哈希与当前配置不一致则自动重新计算 (needs_rehash)。
+
+运行指标：
+    password_hash.hash / password_hash.verify (timing)   含排队等待的总耗时
+    password_hash.rejected (counter)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+from app.utils import metrics
+
+DEFAULT_METHOD = "scrypt"
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 64
+
+
+class PasswordHashBusyError(Exception):
+    """排队的密码哈希计算超出上限"""
+
+
+class _Pool:
+    def __init__(self, workers, queue_size):
+        self.workers = threading.BoundedSemaphore(workers)
+        self.slots = threading.BoundedSemaphore(queue_size)
+        self.executor = None
+        self.use_tpool = _eventlet_patched()
+        if not self.use_tpool:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _eventlet_patched():
+    try:
+        from eventlet import patcher
+    except ImportError:
+        return False
+    return patcher.is_monkey_patched("thread")
+
+
+def _app_config():
+    from flask import current_app, has_app_context
+
+    return current_app.config if has_app_context() else {}
+
+
+def configure(workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+    """按指定并发数 (重新) 创建执行池；应用内由首次调用时按配置自动创建"""
+    global _pool
+    with _pool_lock:
+        _pool = _Pool(workers, queue_size)
+        return _pool
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            config = _app_config()
+            _pool = _Pool(
+                config.get("PASSWORD_HASH_WORKERS", DEFAULT_WORKERS),
+                config.get("PASSWORD_HASH_QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+            )
+        return _pool
+
+
+def _run(name, fn, *args):
+    """在原生线程中执行 fn(*args)，返回其结果"""
+    pool = _get_pool()
+    if not pool.slots.acquire(blocking=False):
+        metrics.incr("password_hash.rejected")
+        raise PasswordHashBusyError("登录请求较多，请稍后重试")
+    start = time.perf_counter()
+    try:
+        if pool.use_tpool:
+            from eventlet import tpool
+
+            # 等待名额时让出事件循环 (threading 已被 monkey patch 为协程版本)
+            with pool.workers:
+                return tpool.execute(fn, *args)
+        return pool.executor.submit(fn, *args).result()
+    finally:
+        pool.slots.release()
+        metrics.observe(f"password_hash.{name}", time.perf_counter() - start)
+
+
+def configured_method():
+    """当前配置的哈希算法 (补全 werkzeug 的默认参数，便于与已存哈希比较)"""
+    method = _app_config().get("PASSWORD_HASH_METHOD", DEFAULT_METHOD)
+    name, *args = method.split(":")
+    if name == "scrypt" and not args:
+        return "scrypt:32768:8:1"
+    if name == "pbkdf2" and len(args) < 2:
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+def hash_password(password):
+    """按配置的算法计算密码哈希"""
+    return _run("hash", generate_password_hash, password, configured_method())
+
+
+def verify_password(password_hash, password):
+    """校验密码"""
+    return _run("verify", check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """已存哈希的算法或强度是否与当前配置不同"""
+    return password_hash.split("$", 1)[0] != configured_method()
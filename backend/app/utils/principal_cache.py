@@ -0,0 +1,211 @@
+"""
+已认证身份缓存模块。
+
+token_required 每次请求需校验登录会话并查询用户，缓存以 token 的 SHA-256 摘要为 key，保存校验通过时的
+用户ID、角色与账号状态，命中时两者均可省去。缓存为进程内有界 LRU，条目在 TTL 或 token 过期后失效。
+
+以下变更通过 Redis 频道 auth:principal_invalidated 通知所有 worker 立即删除该用户的全部条目：
+    登录 (含挤下线其他设备)、管理员修改用户信息
+订阅连接未建立时 (含断线期间) 不使用缓存，重新连接后清空缓存，避免错过失效通知。
+
+运行指标：
+    auth.principal_cache.hit / miss / bypass (counter)
+    auth.principal_cache.saved_ms (counter)   命中时省去的身份校验耗时累计 (按写入条目时的耗时计)
+    auth.principal_cache.hit_ratio / size (gauge)
+    auth.resolve (timing)                     未命中时会话校验与用户查询的耗时
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from app.utils import metrics, pubsub
+
+CHANNEL = "auth:principal_invalidated"
+
+
+class Principal:
+    """
+    已认证用户的轻量代理。
+
+    缓存的字段 (user_id / role / is_active) 直接返回；访问其他属性时才按 user_id 查询 SysUser 并委托给它，
+    只做权限判断的请求无需访问数据库。
+    """
+
+    __slots__ = ("user_id", "role", "is_active", "_user")
+
+    def __init__(self, user_id, role, is_active):
+        object.__setattr__(self, "user_id", user_id)
+        object.__setattr__(self, "role", role)
+        object.__setattr__(self, "is_active", is_active)
+        object.__setattr__(self, "_user", None)
+
+    def _load(self):
+        if self._user is None:
+            from app.models.user import SysUser
+
+            object.__setattr__(self, "_user", SysUser.query.get(self.user_id))
+            metrics.incr("auth.principal_cache.lazy_load")
+        return self._user
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        if name == "user_id" or name == "_user":
+            raise AttributeError(f"{name} 不可修改")
+        if name in ("role", "is_active"):
+            object.__setattr__(self, name, value)
+        setattr(self._load(), name, value)
+
+    def __repr__(self):
+        return f"<Principal {self.user_id}>"
+
+
+class PrincipalCache:
+    """已认证身份 LRU 缓存"""
+
+    def __init__(self, max_size=4096, ttl=10.0):
+        """
+        Args:
+            max_size (int): 最大条目数
+            ttl (float): 条目有效期 (秒)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # token 摘要 -> (用户ID, 角色, 账号状态, 过期时间, 校验耗时)
+        self._by_user = {}  # 用户ID -> {token 摘要}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._lookups = 0
+        # 每次失效递增；写入时与校验开始时的值不同说明期间发生过失效，结果可能已过时，不写入
+        self.generation = 0
+
+    def _record(self, kind):
+        self._lookups += 1
+        if kind == "hit":
+            self._hits += 1
+        metrics.incr(f"auth.principal_cache.{kind}")
+        metrics.gauge("auth.principal_cache.hit_ratio", round(self._hits / self._lookups, 4))
+
+    def _remove(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry is not None:
+            digests = self._by_user.get(entry[0])
+            if digests is not None:
+                digests.discard(digest)
+                if not digests:
+                    del self._by_user[entry[0]]
+
+    def lookup(self, digest):
+        """
+        查找已认证身份。
+
+        Returns:
+            Principal | None: 未命中或订阅连接不可用时返回 None
+        """
+        if not pubsub.is_listening():
+            metrics.incr("auth.principal_cache.bypass")
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[3] <= now:
+                self._remove(digest)
+                entry = None
+            if entry is None:
+                self._record("miss")
+                return None
+            self._entries.move_to_end(digest)
+            self._record("hit")
+        metrics.incr("auth.principal_cache.saved_ms", int(entry[4] * 1000))
+        return Principal(entry[0], entry[1], entry[2])
+
+    def store(self, digest, user, generation, elapsed, token_exp=None):
+        """
+        写入校验通过的身份。
+
+        Args:
+            digest (str): token 摘要
+            user: 已通过会话校验的 SysUser
+            generation (int): 开始校验前读取的 self.generation
+            elapsed (float): 本次校验耗时 (秒)，命中时计入节省时间
+            token_exp (int, optional): token 过期时间 (Unix 时间戳)，条目不会在 token 过期后继续命中
+        """
+        if not pubsub.is_listening():
+            return
+        ttl = self.ttl
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._remove(digest)
+            self._entries[digest] = (user.user_id, user.role, user.is_active, time.monotonic() + ttl, elapsed)
+            self._by_user.setdefault(user.user_id, set()).add(digest)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+            metrics.gauge("auth.principal_cache.size", len(self._entries))
+
+    def invalidate_user(self, user_id):
+        """删除该用户的全部条目"""
+        with self._lock:
+            self.generation += 1
+            for digest in list(self._by_user.get(user_id, ())):
+                self._remove(digest)
+            metrics.gauge("auth.principal_cache.size", len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._by_user.clear()
+            metrics.gauge("auth.principal_cache.size", 0)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache(app_config):
+    """
+    按应用配置获取进程级单例缓存。
+
+    Returns:
+        PrincipalCache | None: PRINCIPAL_CACHE_SIZE 为 0 时返回 None (不缓存)
+    """
+    global _cache
+    if app_config.get("PRINCIPAL_CACHE_SIZE", 4096) <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = PrincipalCache(
+                max_size=app_config.get("PRINCIPAL_CACHE_SIZE", 4096),
+                ttl=app_config.get("PRINCIPAL_CACHE_TTL_SECONDS", 10),
+            )
+        return _cache
+
+
+def _on_invalidated(data):
+    """订阅通知：删除指定用户的条目；连接 (重新) 建立时清空缓存，补偿断线期间可能错过的通知"""
+    cache = _cache
+    if cache is None:
+        return
+    if data is None:
+        cache.clear()
+    else:
+        cache.invalidate_user(int(data))
+
+
+pubsub.subscribe(CHANNEL, _on_invalidated)
+
+
+def invalidate_user(user_id):
+    """用户身份相关信息变更后调用：删除本进程条目并通知其他 worker"""
+    cache = _cache
+    if cache is not None:
+        cache.invalidate_user(user_id)
+    pubsub.publish(CHANNEL, user_id)
@@ -0,0 +1,110 @@
+"""
+Redis 发布/订阅监听模块，用于跨 worker 进程广播缓存失效等通知。
+
+每个进程只维护一条订阅连接，由后台线程按频道分发给已注册的处理函数。连接建立 (含断线重连) 时，
+处理函数会以 None 调用一次，用于补偿断线期间可能丢失的消息。
+"""
+
+import threading
+import time
+
+RECONNECT_SECONDS = 1
+
+_handlers = {}  # 频道 -> [处理函数]
+_lock = threading.Lock()
+_listener = None
+_pubsub = None
+
+
+def subscribe(channel, handler):
+    """
+    注册频道处理函数。
+
+    Args:
+        channel (str): 频道名
+        handler (callable): handler(data)，data 为消息内容 (str)；连接 (重新) 建立时为 None
+    """
+    global _pubsub
+    with _lock:
+        _handlers.setdefault(channel, []).append(handler)
+        pubsub = _pubsub
+    if pubsub is not None:
+        # 关闭当前连接，监听线程按新的频道列表重新订阅
+        try:
+            pubsub.close()
+        except:
+            pass
+
+
+def publish(channel, message):
+    """
+    发布消息。
+
+    Returns:
+        bool: 是否发布成功 (Redis 不可用时返回 False)
+    """
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return False
+    try:
+        redis_client.publish(channel, message)
+        return True
+    except:
+        return False
+
+
+def _dispatch(channel, data):
+    with _lock:
+        handlers = list(_handlers.get(channel, []))
+    for handler in handlers:
+        try:
+            handler(data)
+        except Exception as e:
+            print(f"订阅消息处理失败 ({channel}): {str(e)}")
+
+
+def _listen():
+    global _pubsub
+    from app.extensions import redis_client
+
+    while True:
+        with _lock:
+            channels = list(_handlers)
+        if not channels:
+            time.sleep(RECONNECT_SECONDS)
+            continue
+        try:
+            pubsub = redis_client.pubsub()
+            with _lock:
+                _pubsub = pubsub
+            pubsub.subscribe(*channels)
+            for message in pubsub.listen():
+                if message["type"] == "subscribe":
+                    _dispatch(message["channel"], None)
+                elif message["type"] == "message":
+                    _dispatch(message["channel"], message["data"])
+        except Exception:
+            time.sleep(RECONNECT_SECONDS)
+        finally:
+            with _lock:
+                _pubsub = None
+
+
+def start_listener():
+    """启动本进程的订阅监听线程 (重复调用无副作用)"""
+    global _listener
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return
+    with _lock:
+        if _listener is None:
+            _listener = threading.Thread(target=_listen, name="redis-pubsub", daemon=True)
+            _listener.start()
+
+
+def is_listening():
+    """监听线程当前是否持有订阅连接"""
+    with _lock:
+        return _pubsub is not None
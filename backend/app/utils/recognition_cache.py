@@ -0,0 +1,184 @@
+"""
+车牌识别结果缓存模块。
+
+道闸摄像头会在数秒内重复提交同一辆车几乎相同的画面，缓存以两级 key 命中，跳过解码与推理：
+    精确 key      摄像头标识、ROI 与原始图片字节的 SHA-1
+    感知 key      ROI 区域缩小灰度图的 64 位差值哈希 (dHash)，同一摄像头及 ROI 下汉明距离不超过阈值即视为同一画面
+
+固定机位下前后两辆车的整幅画面差异很小，因此感知哈希只取 ROI 区域，默认阈值与 TTL 都很小；
+未识别出车牌 (None) 的结果只按精确 key 命中，不会以近似画面返回给下一辆车。
+
+缓存为进程内有界 LRU，条目在 TTL 后失效。运行指标：
+    lpr_cache.hit_exact / lpr_cache.hit_similar / lpr_cache.miss (counter)
+    lpr_cache.saved_ms (counter)   命中时省去的推理耗时累计 (按原始识别耗时计)
+    lpr_cache.hit_ratio / lpr_cache.size (gauge)
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from app.utils import metrics
+from app.utils.image_preprocess import crop_roi
+
+# dHash 采样尺寸：9x8 灰度图逐行比较相邻像素得到 64 位
+_HASH_WIDTH = 9
+_HASH_HEIGHT = 8
+
+
+def _dhash(image_data, roi=None):
+    """计算 ROI 区域的差值哈希，无法解码时返回 None"""
+    import cv2
+    import numpy
+
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        # 按 1/8 比例解码 JPEG 只需部分 DCT 运算，远低于完整解码的开销
+        gray = cv2.imdecode(
+            numpy.frombuffer(image_data, numpy.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8
+        )
+    elif getattr(image_data, "ndim", 0) == 3:
+        gray = cv2.cvtColor(image_data, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = image_data
+    if gray is None:
+        return None
+    gray = crop_roi(gray, roi)
+
+    small = cv2.resize(gray, (_HASH_WIDTH, _HASH_HEIGHT), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(numpy.packbits(bits).tobytes(), "big")
+
+
+class RecognitionCache:
+    """识别结果 LRU 缓存"""
+
+    def __init__(self, max_size=256, ttl=3.0, max_distance=1):
+        """
+        Args:
+            max_size (int): 最大条目数
+            ttl (float): 条目有效期 (秒)
+            max_distance (int): 感知哈希允许的最大汉明距离，小于 0 时仅使用精确 key
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # digest -> (范围, dhash, 结果, 识别耗时, 过期时间)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._lookups = 0
+
+    def fingerprint(self, image_data, camera_id=None, roi=None):
+        """
+        计算图像的 (范围, 精确 key, 感知 key)，不同摄像头或 ROI 的画面互不命中。
+        包含 SHA-1 与图片解码，属于阻塞调用，在请求中应经 blocking.run 执行 (不访问应用上下文)。
+
+        Args:
+            camera_id (str, optional): 道闸摄像头标识
+            roi (tuple, optional): 比例 ROI，感知哈希只取该区域
+
+        Returns:
+            tuple: (str, str, int | None)
+        """
+        scope = f"{camera_id or ''}|{','.join(map(str, roi)) if roi else ''}"
+        sha1 = hashlib.sha1(scope.encode())
+        if isinstance(image_data, (bytes, bytearray, memoryview)):
+            sha1.update(image_data)
+        else:
+            sha1.update(image_data.tobytes())
+        phash = None
+        if self.max_distance >= 0:
+            try:
+                phash = _dhash(image_data, roi)
+            except Exception:
+                phash = None
+        return scope, sha1.hexdigest(), phash
+
+    def _record(self, kind):
+        self._lookups += 1
+        if kind != "miss":
+            self._hits += 1
+        metrics.incr(f"lpr_cache.{kind}")
+        metrics.gauge("lpr_cache.hit_ratio", round(self._hits / self._lookups, 4))
+
+    def lookup(self, fingerprint):
+        """
+        查找缓存结果。
+
+        Returns:
+            tuple: (是否命中, 识别结果)
+        """
+        scope, digest, phash = fingerprint
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[4] <= now]:
+                del self._entries[key]
+
+            entry = self._entries.get(digest)
+            kind = "hit_exact"
+            if entry is None and phash is not None:
+                # 条目数有界，线性扫描的代价远低于一次推理
+                for key, candidate in reversed(self._entries.items()):
+                    if (
+                        candidate[0] == scope
+                        and candidate[1] is not None
+                        and candidate[2] is not None
+                        and bin(candidate[1] ^ phash).count("1") <= self.max_distance
+                    ):
+                        digest, entry = key, candidate
+                        kind = "hit_similar"
+                        break
+
+            if entry is None:
+                self._record("miss")
+                metrics.gauge("lpr_cache.size", len(self._entries))
+                return False, None
+
+            self._entries.move_to_end(digest)
+            self._record(kind)
+            metrics.incr("lpr_cache.saved_ms", int(entry[3] * 1000))
+            return True, entry[2]
+
+    def store(self, fingerprint, result, elapsed):
+        """
+        写入识别结果。
+
+        Args:
+            fingerprint (tuple): fingerprint() 的返回值
+            result: 识别结果 (含未识别到的 None，只按精确 key 命中)
+            elapsed (float): 本次识别耗时 (秒)，命中时计入节省时间
+        """
+        scope, digest, phash = fingerprint
+        with self._lock:
+            self._entries[digest] = (scope, phash, result, elapsed, time.monotonic() + self.ttl)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            metrics.gauge("lpr_cache.size", len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache(app_config):
+    """
+    按应用配置获取进程级单例缓存。
+
+    Returns:
+        RecognitionCache | None: LPR_CACHE_SIZE 为 0 时返回 None (不缓存)
+    """
+    global _cache
+    if app_config.get("LPR_CACHE_SIZE", 256) <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = RecognitionCache(
+                max_size=app_config.get("LPR_CACHE_SIZE", 256),
+                ttl=app_config.get("LPR_CACHE_TTL_SECONDS", 3),
+                max_distance=app_config.get("LPR_CACHE_MAX_DISTANCE", 1),
+            )
+        return _cache
@@ -0,0 +1,258 @@
+"""
+预约占位模块，在 Redis 中以单个 Lua 脚本原子完成车位抢占与限额校验，让竞争失败的请求在进入数据库事务前即被拒绝。
+
+    parking:claim:spot:{spot_id}   预约中车位 -> 车牌 (订单 status=0 期间持有)
+    parking:claim:plate:{plate}    车牌存在活跃订单 (status 0/1/2/6)
+    parking:claim:user:{user_id}   用户活跃订单数
+    parking:claim:ready            占位数据已按数据库校准的标记，缺失时快速通道关闭，完全依赖数据库校验
+    parking:claim:rebuilding       重建租约，存在期间快速通道关闭 (claim 返回 CLAIM_SKIPPED)
+    parking:claim:inflight         已占位但数据库事务尚未结束的预约 (有序集合，分值为占位时间)
+
+Redis 占位只是快速过滤，数据库中的订单仍是唯一权威来源；定时任务按 parking_order 重建全部占位以修正偏差。
+重建时先取得租约，等待租约前已占位的预约事务结束 (settle) 后再读取数据库，避免删除尚未提交的预约的占位。
+"""
+
+import time
+import uuid
+from app.extensions import db
+
+CLAIM_OK = 0
+CLAIM_SPOT_TAKEN = 1
+CLAIM_PLATE_ACTIVE = 2
+CLAIM_USER_LIMIT = 3
+CLAIM_SKIPPED = -1
+
+READY_KEY = "parking:claim:ready"
+REBUILD_KEY = "parking:claim:rebuilding"
+INFLIGHT_KEY = "parking:claim:inflight"
+
+# 占位后数据库事务的最长耗时 (秒)，超过该时间未 settle 的记录视为已结束 (进程异常退出等)
+INFLIGHT_MAX_SECONDS = 30
+REBUILD_POLL_SECONDS = 0.05
+
+_CLAIM_LUA = """
+if redis.call('EXISTS', KEYS[4]) == 0 or redis.call('EXISTS', KEYS[5]) == 1 then
+    return -1
+end
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 1
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 2
+end
+if tonumber(redis.call('GET', KEYS[3]) or '0') >= tonumber(ARGV[2]) then
+    return 3
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('SET', KEYS[2], '1')
+redis.call('INCR', KEYS[3])
+redis.call('ZADD', KEYS[6], ARGV[4], ARGV[5])
+return 0
+"""
+
+# 释放车位占位 (仅当仍由该车牌持有)
+_RELEASE_SPOT_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+return 1
+"""
+
+# 释放车牌活跃标记并递减用户活跃订单数 (不低于 0)
+_RELEASE_ACTIVE_LUA = """
+if redis.call('DEL', KEYS[1]) == 1 then
+    if tonumber(redis.call('GET', KEYS[2]) or '0') > 0 then
+        redis.call('DECR', KEYS[2])
+    end
+end
+return 1
+"""
+
+_scripts = {}
+
+
+def _spot_key(spot_id):
+    return f"parking:claim:spot:{spot_id}"
+
+
+def _plate_key(plate_number):
+    return f"parking:claim:plate:{plate_number}"
+
+
+def _user_key(user_id):
+    return f"parking:claim:user:{user_id}"
+
+
+def _inflight_member(spot_id, plate_number):
+    return f"{spot_id}:{plate_number}"
+
+
+def _run(name, source, keys, args):
+    from app.extensions import redis_client
+
+    if name not in _scripts:
+        _scripts[name] = redis_client.register_script(source)
+    return _scripts[name](keys=keys, args=args)
+
+
+def claim(spot_id, plate_number, user_id, limit, ttl_seconds):
+    """
+    原子抢占车位并校验车牌/用户活跃订单限额。
+
+    Args:
+        spot_id (int): 车位 ID
+        plate_number (str): 车牌号
+        user_id (int): 用户 ID
+        limit (int): 用户活跃订单上限
+        ttl_seconds (int): 车位占位的兜底过期时间
+
+    Returns:
+        int: CLAIM_OK / CLAIM_SPOT_TAKEN / CLAIM_PLATE_ACTIVE / CLAIM_USER_LIMIT；
+            Redis 不可用或占位未校准时返回 CLAIM_SKIPPED
+    """
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return CLAIM_SKIPPED
+    try:
+        return int(
+            _run(
+                "claim",
+                _CLAIM_LUA,
+                [
+                    _spot_key(spot_id), _plate_key(plate_number), _user_key(user_id),
+                    READY_KEY, REBUILD_KEY, INFLIGHT_KEY,
+                ],
+                [plate_number, limit, ttl_seconds, time.time(), _inflight_member(spot_id, plate_number)],
+            )
+        )
+    except:
+        return CLAIM_SKIPPED
+
+
+def settle(spot_id, plate_number):
+    """claim 成功后数据库事务结束 (无论成功与否) 时调用，允许重建任务继续"""
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return
+    try:
+        redis_client.zrem(INFLIGHT_KEY, _inflight_member(spot_id, plate_number))
+    except:
+        pass
+
+
+def _wait_inflight():
+    """等待租约生效前已占位的预约事务结束；超时返回 False"""
+    from app.extensions import redis_client
+
+    deadline = time.monotonic() + INFLIGHT_MAX_SECONDS
+    while True:
+        redis_client.zremrangebyscore(INFLIGHT_KEY, "-inf", time.time() - INFLIGHT_MAX_SECONDS)
+        if redis_client.zcard(INFLIGHT_KEY) == 0:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(REBUILD_POLL_SECONDS)
+
+
+def rollback(spot_id, plate_number, user_id):
+    """数据库事务未成功时撤销 claim 写入的全部占位"""
+    release_spot(spot_id, plate_number)
+    release_active(plate_number, user_id)
+
+
+def release_spot(spot_id, plate_number):
+    """订单离开预约状态 (入场/取消/预约违约) 时释放车位占位"""
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return
+    try:
+        _run("release_spot", _RELEASE_SPOT_LUA, [_spot_key(spot_id)], [plate_number])
+    except:
+        pass
+
+
+def release_active(plate_number, user_id):
+    """订单结束活跃状态 (完成/取消) 时释放车牌标记并递减用户活跃订单数"""
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return
+    try:
+        _run(
+            "release_active",
+            _RELEASE_ACTIVE_LUA,
+            [_plate_key(plate_number), _user_key(user_id)],
+            [],
+        )
+    except:
+        pass
+
+
+def reconcile(spot_ttl_seconds, ready_ttl_seconds):
+    """
+    按 parking_order 重建全部占位数据并设置校准标记。
+
+    重建期间持有租约 (快速通道关闭，预约只经数据库校验)，并在读取数据库前等待此前已占位的预约事务结束，
+    保证读取到的活跃订单包含全部现存占位对应的订单。
+
+    Args:
+        spot_ttl_seconds (int): 车位占位的兜底过期时间
+        ready_ttl_seconds (int): 校准标记有效期，定时任务停止运行后快速通道自动关闭
+
+    Returns:
+        bool: 是否完成重建 (另一重建正在进行或等待超时时为 False，保留现有占位)
+    """
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return False
+
+    token = uuid.uuid4().hex
+    if not redis_client.set(REBUILD_KEY, token, nx=True, ex=INFLIGHT_MAX_SECONDS * 3):
+        return False
+    try:
+        if not _wait_inflight():
+            return False
+        _rebuild(redis_client, spot_ttl_seconds, ready_ttl_seconds)
+        return True
+    finally:
+        if redis_client.get(REBUILD_KEY) == token:
+            redis_client.delete(REBUILD_KEY)
+
+
+def _rebuild(redis_client, spot_ttl_seconds, ready_ttl_seconds):
+    from app.models.order import ParkingOrder
+
+    # 结束当前事务，确保读取到租约生效前已提交的全部订单
+    db.session.rollback()
+    active_orders = (
+        db.session.query(
+            ParkingOrder.spot_id,
+            ParkingOrder.plate_number,
+            ParkingOrder.user_id,
+            ParkingOrder.status,
+        )
+        .filter(ParkingOrder.status.in_([0, 1, 2, 6]))
+        .all()
+    )
+
+    user_counts = {}
+    pipe = redis_client.pipeline(transaction=True)
+    stale_keys = [
+        key for key in redis_client.scan_iter("parking:claim:*", count=1000)
+        if key not in (REBUILD_KEY, INFLIGHT_KEY)
+    ]
+    if stale_keys:
+        pipe.delete(*stale_keys)
+    for spot_id, plate_number, user_id, status in active_orders:
+        if status == 0:
+            pipe.set(_spot_key(spot_id), plate_number, ex=spot_ttl_seconds)
+        pipe.set(_plate_key(plate_number), "1")
+        user_counts[user_id] = user_counts.get(user_id, 0) + 1
+    for user_id, count in user_counts.items():
+        pipe.set(_user_key(user_id), count)
+    pipe.set(READY_KEY, "1", ex=ready_ttl_seconds)
+    pipe.execute()
@@ -0,0 +1,167 @@
+"""
+每日营收汇总模块。
+
+仪表盘营收原本每次按 DATE(pay_time) 逐日汇总 parking_order (无法使用索引)。revenue_daily 按
+(支付日期, 区域, 支付方式) 保存已完成订单 (status 3) 的营收合计与订单数，在订单状态变更的同一事务内增量更新：
+    进入 status 3 (余额/支付宝支付、出场自动扣费)   计入
+    离开 status 3 (申请退款 7、退款 5)              扣除，与按 status == 3 统计的口径一致
+
+reconcile 按 parking_order 重新汇总指定日期范围并修正差异：首次部署时回填全部历史 (backfill)，
+每晚校准最近 REVENUE_RECONCILE_DAYS 天。校准期间锁定范围内的汇总行，同时发生的状态变更在校准提交后再累加。
+
+运行指标：
+    revenue.rollup_updates (counter)
+    revenue.reconcile_mismatch (counter)   校准时发现并修正的汇总行数
+    revenue.reconcile (timing)
+"""
+
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert
+from app.extensions import db
+from app.utils import metrics
+
+UNKNOWN_PAY_WAY = -1
+
+
+def record(order, sign=1, zone_id=None):
+    """
+    在当前事务中累加 (sign=1) 或扣除 (sign=-1) 订单营收，须在设置 pay_time 之后、提交之前调用。
+
+    Args:
+        order (ParkingOrder): 进入或离开 status 3 的订单
+        sign (int): 1 表示计入，-1 表示扣除
+        zone_id (int, optional): 订单车位所属区域，未提供时按 spot_id 查询
+    """
+    from app.models.order import RevenueDaily
+    from app.models.parking import ParkingSpot
+
+    if zone_id is None:
+        zone_id = db.session.query(ParkingSpot.zone_id).filter_by(spot_id=order.spot_id).scalar()
+    amount = Decimal(str(order.total_fee or 0)) * sign
+    stmt = insert(RevenueDaily.__table__).values(
+        day=order.pay_time.date(),
+        zone_id=zone_id,
+        pay_way=UNKNOWN_PAY_WAY if order.pay_way is None else order.pay_way,
+        revenue=amount,
+        order_count=sign,
+        updated_at=datetime.utcnow(),
+    )
+    db.session.execute(
+        stmt.on_duplicate_key_update(
+            revenue=RevenueDaily.revenue + stmt.inserted.revenue,
+            order_count=RevenueDaily.order_count + stmt.inserted.order_count,
+            updated_at=stmt.inserted.updated_at,
+        )
+    )
+    metrics.incr("revenue.rollup_updates")
+
+
+def daily_totals(start_day, end_day):
+    """
+    读取日期范围内每天的营收合计。
+
+    Returns:
+        dict: {date: Decimal}，没有营收的日期不包含在内
+    """
+    from app.models.order import RevenueDaily
+
+    rows = (
+        db.session.query(RevenueDaily.day, func.sum(RevenueDaily.revenue))
+        .filter(RevenueDaily.day >= start_day, RevenueDaily.day <= end_day)
+        .group_by(RevenueDaily.day)
+    )
+    return {day: total or Decimal("0.00") for day, total in rows}
+
+
+def reconcile(start_day, end_day):
+    """
+    按 parking_order 重新汇总 [start_day, end_day] 并修正汇总表中的差异。
+
+    Returns:
+        int: 修正 (新增、更新或删除) 的汇总行数
+    """
+    from app.models.order import ParkingOrder, RevenueDaily
+    from app.models.parking import ParkingSpot
+
+    start = time.perf_counter()
+    try:
+        # 先锁定范围内的汇总行 (含间隙)，期间的增量更新等待本次校准提交，不会被覆盖
+        actual = {
+            (row.day, row.zone_id, row.pay_way): row
+            for row in RevenueDaily.query.filter(
+                RevenueDaily.day >= start_day, RevenueDaily.day <= end_day
+            ).with_for_update()
+        }
+
+        pay_day = func.date(ParkingOrder.pay_time)
+        expected = {
+            (day, zone_id, pay_way): (revenue, count)
+            for day, zone_id, pay_way, revenue, count in (
+                db.session.query(
+                    pay_day,
+                    ParkingSpot.zone_id,
+                    func.coalesce(ParkingOrder.pay_way, UNKNOWN_PAY_WAY),
+                    func.sum(ParkingOrder.total_fee),
+                    func.count(ParkingOrder.order_id),
+                )
+                .join(ParkingSpot, ParkingSpot.spot_id == ParkingOrder.spot_id)
+                .filter(
+                    ParkingOrder.status == 3,
+                    ParkingOrder.pay_time >= datetime.combine(start_day, datetime.min.time()),
+                    ParkingOrder.pay_time < datetime.combine(end_day + timedelta(days=1), datetime.min.time()),
+                )
+                .group_by(pay_day, ParkingSpot.zone_id, func.coalesce(ParkingOrder.pay_way, UNKNOWN_PAY_WAY))
+            )
+        }
+
+        fixed = 0
+        for key, (revenue, count) in expected.items():
+            revenue = Decimal(str(revenue or 0))
+            row = actual.pop(key, None)
+            if row is None:
+                day, zone_id, pay_way = key
+                db.session.add(RevenueDaily(day=day, zone_id=zone_id, pay_way=pay_way, revenue=revenue, order_count=count))
+                fixed += 1
+            elif row.revenue != revenue or row.order_count != count:
+                row.revenue = revenue
+                row.order_count = count
+                fixed += 1
+        for row in actual.values():
+            # 已无对应订单 (如全部退款) 的汇总行，金额应为 0
+            if row.revenue or row.order_count:
+                fixed += 1
+            db.session.delete(row)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    metrics.observe("revenue.reconcile", time.perf_counter() - start)
+    metrics.incr("revenue.reconcile_mismatch", fixed)
+    return fixed
+
+
+def backfill(days_per_batch=31):
+    """
+    按 parking_order 全部历史重建汇总表，每批 days_per_batch 天一个事务。
+
+    Returns:
+        dict: {"days": int, "fixed": int}
+    """
+    from app.models.order import ParkingOrder
+
+    first_paid = db.session.query(func.min(ParkingOrder.pay_time)).filter(ParkingOrder.status == 3).scalar()
+    today = datetime.utcnow().date()
+    if first_paid is None:
+        return {"days": 0, "fixed": 0}
+
+    fixed = 0
+    start_day = first_paid.date()
+    while start_day <= today:
+        end_day = min(start_day + timedelta(days=days_per_batch - 1), today)
+        fixed += reconcile(start_day, end_day)
+        start_day = end_day + timedelta(days=1)
+    return {"days": (today - first_paid.date()).days + 1, "fixed": fixed}
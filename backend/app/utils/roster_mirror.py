@@ -0,0 +1,190 @@
+"""
+学校师生名册本地镜像模块。
+
+注册时的身份交叉验证原本每次都查询外部库 school_db (独立连接池、跨库延迟)。定时任务按 user_no 键集分页
+读取 school_members，只写入新增或变化的行，并删除外部库中已不存在的行，得到本地表 school_member_mirror。
+
+注册校验优先查询镜像：
+    镜像中有该学号/工号             以镜像判定 (姓名不符直接拒绝)；镜像同步滞后超过 ROSTER_MIRROR_MAX_LAG_MINUTES 时仍回源
+    镜像中没有 (如刚入库的新成员)   回源查询外部库，命中后写入镜像
+
+运行指标：
+    roster.mirror_hit / mirror_reject / live_hit / live_miss (counter)
+    roster.lookup / roster.live_lookup / roster.sync (timing)
+    roster.sync_lag_seconds (gauge)   距最近一次完整同步的时间，注册校验时更新
+    roster.synced_inserted / synced_updated / synced_deleted (counter)
+"""
+
+import time
+from datetime import datetime
+from app.extensions import db
+from app.utils import metrics
+
+LAST_SYNC_KEY = "roster:last_sync"
+
+# 距上次读取同步时间超过该间隔 (秒) 才重新读取 Redis
+LAG_CHECK_SECONDS = 30
+
+_last_sync = None  # 最近一次完整同步完成的时间 (Unix 时间戳)
+_lag_checked_at = 0.0
+
+
+def _fields(member):
+    return member.real_name, member.member_type, member.department
+
+
+def _write(mirror, member, now):
+    mirror.real_name, mirror.member_type, mirror.department = _fields(member)
+    mirror.synced_at = now
+
+
+def sync(chunk_size=2000):
+    """
+    从外部库增量同步全部名册。
+
+    Returns:
+        dict: {"inserted": int, "updated": int, "deleted": int, "total": int}
+    """
+    global _last_sync
+    from app.extensions import redis_client
+    from app.models.school import SchoolMember, SchoolMemberMirror
+
+    start = time.perf_counter()
+    pass_start = datetime.utcnow()
+    seen = set()
+    inserted = updated = 0
+
+    last_user_no = ""
+    while True:
+        members = (
+            SchoolMember.query.filter(SchoolMember.user_no > last_user_no)
+            .order_by(SchoolMember.user_no)
+            .limit(chunk_size)
+            .all()
+        )
+        if not members:
+            break
+        keys = [m.user_no for m in members]
+        existing = {
+            m.user_no: m
+            for m in SchoolMemberMirror.query.filter(SchoolMemberMirror.user_no.in_(keys))
+        }
+        for member in members:
+            mirror = existing.get(member.user_no)
+            if mirror is None:
+                mirror = SchoolMemberMirror(user_no=member.user_no)
+                _write(mirror, member, pass_start)
+                db.session.add(mirror)
+                inserted += 1
+            elif _fields(mirror) != _fields(member):
+                _write(mirror, member, pass_start)
+                updated += 1
+        db.session.commit()
+        # 释放本批已加载的对象，内存占用与名册规模无关
+        db.session.expunge_all()
+        seen.update(keys)
+        last_user_no = keys[-1]
+        if len(members) < chunk_size:
+            break
+
+    # 删除外部库中已不存在的行 (同步期间由回源查询写入的行不受影响)
+    deleted = 0
+    last_user_no = ""
+    while True:
+        keys = [
+            user_no
+            for (user_no,) in db.session.query(SchoolMemberMirror.user_no)
+            .filter(SchoolMemberMirror.user_no > last_user_no)
+            .order_by(SchoolMemberMirror.user_no)
+            .limit(chunk_size)
+        ]
+        if not keys:
+            break
+        stale = [k for k in keys if k not in seen]
+        if stale:
+            deleted += SchoolMemberMirror.query.filter(
+                SchoolMemberMirror.user_no.in_(stale), SchoolMemberMirror.synced_at < pass_start
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        last_user_no = keys[-1]
+
+    _last_sync = time.time()
+    if redis_client:
+        try:
+            redis_client.set(LAST_SYNC_KEY, _last_sync)
+        except:
+            pass
+
+    metrics.observe("roster.sync", time.perf_counter() - start)
+    metrics.incr("roster.synced_inserted", inserted)
+    metrics.incr("roster.synced_updated", updated)
+    metrics.incr("roster.synced_deleted", deleted)
+    metrics.gauge("roster.sync_lag_seconds", 0)
+    return {"inserted": inserted, "updated": updated, "deleted": deleted, "total": len(seen)}
+
+
+def _sync_lag():
+    """距最近一次完整同步的秒数，从未同步时为 None"""
+    global _last_sync, _lag_checked_at
+    from app.extensions import redis_client
+
+    now = time.monotonic()
+    if redis_client and now - _lag_checked_at >= LAG_CHECK_SECONDS:
+        _lag_checked_at = now
+        try:
+            value = redis_client.get(LAST_SYNC_KEY)
+            if value:
+                _last_sync = max(_last_sync or 0, float(value))
+        except:
+            pass
+    if _last_sync is None:
+        return None
+    lag = max(0.0, time.time() - _last_sync)
+    metrics.gauge("roster.sync_lag_seconds", round(lag, 1))
+    return lag
+
+
+def find_member(user_no, real_name, max_lag_seconds):
+    """
+    按学号/工号与姓名查找在库师生。
+
+    Args:
+        user_no (str): 学号/工号
+        real_name (str): 真实姓名
+        max_lag_seconds (float): 镜像允许的最大同步滞后，超出时以外部库为准
+
+    Returns:
+        SchoolMemberMirror | SchoolMember | None: 含 member_type 等字段的记录，不匹配时返回 None
+    """
+    from app.models.school import SchoolMember, SchoolMemberMirror
+
+    start = time.perf_counter()
+    mirror = SchoolMemberMirror.query.get(user_no)
+    metrics.observe("roster.lookup", time.perf_counter() - start)
+
+    lag = _sync_lag()
+    if mirror is not None and lag is not None and lag <= max_lag_seconds:
+        if mirror.real_name == real_name:
+            metrics.incr("roster.mirror_hit")
+            return mirror
+        metrics.incr("roster.mirror_reject")
+        return None
+
+    start = time.perf_counter()
+    member = SchoolMember.query.filter_by(user_no=user_no, real_name=real_name).first()
+    metrics.observe("roster.live_lookup", time.perf_counter() - start)
+    if member is None:
+        metrics.incr("roster.live_miss")
+        return None
+
+    metrics.incr("roster.live_hit")
+    try:
+        if mirror is None:
+            mirror = SchoolMemberMirror(user_no=member.user_no)
+            db.session.add(mirror)
+        _write(mirror, member, datetime.utcnow())
+        db.session.commit()
+    except Exception:
+        # 镜像写入失败 (如并发写入同一行) 不影响本次注册
+        db.session.rollback()
+    return member
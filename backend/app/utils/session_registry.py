@@ -0,0 +1,147 @@
+"""
+登录会话代次模块，实现单设备登录的本地校验。
+
+每次登录为用户递增会话代次 (Redis 哈希 user_session:gen)，代次写入 token 的 sgen 字段，同时追加到 Redis 流
+user_session:events。各 worker 的后台线程先全量读取哈希，再以 XREAD 持续跟随该流，在内存中维护
+{用户ID: 当前代次}。请求携带的 sgen 小于当前代次即说明账号已在别处登录。
+
+正常情况下校验无需访问 Redis；其他设备登录后，旧 token 在本 worker 收到流事件 (通常为毫秒级) 后即被拒绝。
+跟随线程断开或落后超过 SESSION_SYNC_MAX_LAG_SECONDS 时，逐次以 HGET 读取当前代次，保证失效延迟有上界；
+线程重新连接后重新全量读取，不依赖断线期间的流事件。
+
+运行指标：session.local_check / session.remote_check (counter)
+"""
+
+import threading
+import time
+from app.utils import metrics
+
+GENERATION_KEY = "user_session:gen"
+STREAM_KEY = "user_session:events"
+
+READ_BLOCK_MS = 1000
+READ_BATCH = 500
+RECONNECT_SECONDS = 1
+
+# 原子递增代次并追加流事件，保证流中事件与哈希一致
+_NEW_SESSION_LUA = """
+local gen = redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], '*', 'user_id', ARGV[1], 'gen', gen)
+return gen
+"""
+
+_script = None
+_generations = {}  # 用户ID -> 当前代次
+_synced_at = 0.0  # 最近一次成功读取流的时间 (monotonic)，0 表示未同步
+_lock = threading.Lock()
+_reader = None
+
+
+def new_session(user_id):
+    """
+    登录时调用：递增用户会话代次并广播，此前签发的 token 随之失效。
+
+    Returns:
+        int | None: 新的会话代次；Redis 不可用时返回 None (不做单设备限制)
+    """
+    global _script
+    from flask import current_app
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return None
+    if _script is None:
+        _script = redis_client.register_script(_NEW_SESSION_LUA)
+    generation = int(
+        _script(
+            keys=[GENERATION_KEY, STREAM_KEY],
+            args=[user_id, current_app.config.get("SESSION_STREAM_MAXLEN", 100000)],
+        )
+    )
+    _apply(user_id, generation)
+    return generation
+
+
+def _apply(user_id, generation):
+    with _lock:
+        if generation > _generations.get(user_id, 0):
+            _generations[user_id] = generation
+
+
+def current_generation(user_id, max_lag):
+    """
+    获取用户当前会话代次。
+
+    Args:
+        user_id (int): 用户ID
+        max_lag (float): 本地副本允许的最大同步延迟 (秒)，超出时从 Redis 读取
+
+    Returns:
+        int: 当前代次 (从未以代次方式登录时为 0)
+    """
+    from app.extensions import redis_client
+
+    with _lock:
+        fresh = _synced_at and time.monotonic() - _synced_at <= max_lag
+        generation = _generations.get(user_id, 0)
+    if fresh:
+        metrics.incr("session.local_check")
+        return generation
+
+    metrics.incr("session.remote_check")
+    return int(redis_client.hget(GENERATION_KEY, user_id) or 0)
+
+
+def is_current(user_id, sgen, max_lag):
+    """token 携带的会话代次是否仍为最新 (不小于当前代次)"""
+    return int(sgen) >= current_generation(user_id, max_lag)
+
+
+def _bootstrap(redis_client):
+    """全量读取代次哈希，返回读取前的流末尾位置 (之后的事件由 XREAD 补齐)"""
+    global _generations
+    tail = redis_client.xrevrange(STREAM_KEY, count=1)
+    last_id = tail[0][0] if tail else "0-0"
+    generations = {int(k): int(v) for k, v in redis_client.hgetall(GENERATION_KEY).items()}
+    with _lock:
+        _generations = generations
+    return last_id
+
+
+def _follow():
+    global _synced_at
+    from app.extensions import redis_client
+
+    last_id = None
+    while True:
+        try:
+            if last_id is None:
+                last_id = _bootstrap(redis_client)
+                with _lock:
+                    _synced_at = time.monotonic()
+
+            response = redis_client.xread({STREAM_KEY: last_id}, count=READ_BATCH, block=READ_BLOCK_MS)
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    _apply(int(fields["user_id"]), int(fields["gen"]))
+                    last_id = entry_id
+            with _lock:
+                _synced_at = time.monotonic()
+        except Exception:
+            with _lock:
+                _synced_at = 0.0
+            last_id = None
+            time.sleep(RECONNECT_SECONDS)
+
+
+def start_reader():
+    """启动本进程的会话事件跟随线程 (重复调用无副作用)"""
+    global _reader
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return
+    with _lock:
+        if _reader is None:
+            _reader = threading.Thread(target=_follow, name="session-registry", daemon=True)
+            _reader.start()
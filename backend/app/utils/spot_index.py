@@ -0,0 +1,376 @@
+"""
+车位状态索引模块。
+
+每个区域在 Redis 中维护一份紧凑的车位状态索引，供 get_spots 直接读取：
+    parking:spot_index:{zone_id}:layout  车位布局 JSON [[spot_id, spot_no], ...]，下标即偏移量
+    parking:spot_index:{zone_id}:state   位图，每个偏移量 2 bit (0-空闲, 1-占用, 2-维修, 3-已预约)
+    parking:spot_index:{zone_id}:plates  哈希，偏移量 -> 占用/预约车牌
+    parking:spot_version:{zone_id}       区域版本号，每次状态写入单调递增，用于防止重建覆盖并发写入及增量同步
+    parking:spot_changes:{zone_id}       有界变更日志 (有序集合，score 为版本号)
+    parking:spot_changes_floor:{zone_id} 变更日志可覆盖的最小起始版本，更早的版本只能全量同步
+"""
+
+import json
+from app.extensions import db
+from app.utils import cache_utils, metrics
+
+INDEX_TTL_SECONDS = 600
+CHANGE_LOG_LIMIT = 500
+
+# 递增版本并写入变更日志；索引存在时原地更新，缺失时由下一次读取从数据库重建
+_WRITE_LUA = """
+local version = redis.call('INCR', KEYS[4])
+redis.call('ZADD', KEYS[5], version, version .. '|' .. ARGV[4])
+local size = redis.call('ZCARD', KEYS[5])
+local limit = tonumber(ARGV[5])
+if size > limit then
+    redis.call('ZREMRANGEBYRANK', KEYS[5], 0, size - limit - 1)
+    local oldest = redis.call('ZRANGE', KEYS[5], 0, 0, 'WITHSCORES')
+    redis.call('SET', KEYS[6], tonumber(oldest[2]) - 1)
+end
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('BITFIELD', KEYS[1], 'SET', 'u2', '#' .. ARGV[1], ARGV[2])
+    if ARGV[3] == '' then
+        redis.call('HDEL', KEYS[2], ARGV[1])
+    else
+        redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+    end
+end
+return version
+"""
+
+# 未知变更：递增版本、丢弃索引，并清空变更日志 (该版本之前的客户端必须全量同步)
+_INVALIDATE_LUA = """
+local version = redis.call('INCR', KEYS[4])
+redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[5])
+redis.call('SET', KEYS[6], version)
+return version
+"""
+
+# 仅当重建期间没有发生状态写入(序号未变)时才落盘
+_REBUILD_LUA = """
+local current = redis.call('GET', KEYS[4]) or '0'
+if current ~= ARGV[1] then
+    return 0
+end
+local ttl = tonumber(ARGV[2])
+redis.call('SET', KEYS[1], ARGV[3], 'EX', ttl)
+redis.call('SET', KEYS[3], ARGV[4], 'EX', ttl)
+redis.call('DEL', KEYS[2])
+if #ARGV > 4 then
+    redis.call('HSET', KEYS[2], unpack(ARGV, 5))
+end
+redis.call('EXPIRE', KEYS[2], ttl)
+return 1
+"""
+
+_scripts = {}
+# 车位布局为静态数据，进程内缓存 zone_id -> (layout, {spot_id: offset})
+_layouts = {}
+
+
+def _keys(zone_id):
+    prefix = f"parking:spot_index:{zone_id}"
+    return (
+        f"{prefix}:state",
+        f"{prefix}:plates",
+        f"{prefix}:layout",
+        version_key(zone_id),
+    )
+
+
+def _log_keys(zone_id):
+    return (f"parking:spot_changes:{zone_id}", f"parking:spot_changes_floor:{zone_id}")
+
+
+def version_key(zone_id):
+    return f"parking:spot_version:{zone_id}"
+
+
+def _get_script(client, name, source):
+    if name not in _scripts:
+        _scripts[name] = client.register_script(source)
+    return _scripts[name]
+
+
+def _remember_layout(zone_id, layout):
+    offsets = {spot_id: offset for offset, (spot_id, _) in enumerate(layout)}
+    _layouts[zone_id] = (layout, offsets)
+    return _layouts[zone_id]
+
+
+def _get_layout(client, zone_id):
+    """读取车位布局：进程内缓存 -> Redis -> 数据库"""
+    if zone_id in _layouts:
+        return _layouts[zone_id]
+    raw = client.get(_keys(zone_id)[2])
+    if raw:
+        return _remember_layout(zone_id, json.loads(raw))
+
+    from app.models.parking import ParkingSpot
+
+    rows = (
+        db.session.query(ParkingSpot.spot_id, ParkingSpot.spot_no)
+        .filter_by(zone_id=zone_id)
+        .order_by(ParkingSpot.spot_id)
+        .all()
+    )
+    return _remember_layout(zone_id, [[spot_id, spot_no] for spot_id, spot_no in rows])
+
+
+def encode_states(states):
+    """将状态列表编码为 2 bit/车位 的位图 (与 Redis BITFIELD u2 的高位在前布局一致)"""
+    bitmap = bytearray((len(states) + 3) // 4)
+    for offset, state in enumerate(states):
+        bitmap[offset >> 2] |= (state & 3) << (6 - 2 * (offset & 3))
+    return bytes(bitmap)
+
+
+def decode_states(bitmap, count):
+    """从位图解码前 count 个车位状态，超出位图长度的部分视为空闲"""
+    states = []
+    size = len(bitmap)
+    for offset in range(count):
+        index = offset >> 2
+        if index >= size:
+            states.append(0)
+        else:
+            states.append((bitmap[index] >> (6 - 2 * (offset & 3))) & 3)
+    return states
+
+
+def _load_from_db(zone_id):
+    """从数据库读取区域车位，返回 (layout, states, plates)"""
+    from app.models.parking import ParkingSpot
+    from app.models.order import ParkingOrder
+
+    spots = (
+        ParkingSpot.query.filter_by(zone_id=zone_id)
+        .order_by(ParkingSpot.spot_id)
+        .all()
+    )
+    spot_ids = [s.spot_id for s in spots]
+    reserved_spot_map = {}
+    if spot_ids:
+        reserved_orders = (
+            db.session.query(ParkingOrder.spot_id, ParkingOrder.plate_number)
+            .filter(ParkingOrder.spot_id.in_(spot_ids), ParkingOrder.status == 0)
+            .all()
+        )
+        reserved_spot_map = dict(reserved_orders)
+
+    layout, states, plates = [], [], {}
+    for offset, spot in enumerate(spots):
+        layout.append([spot.spot_id, spot.spot_no])
+        if spot.status == 0 and spot.spot_id in reserved_spot_map:
+            states.append(3)
+            plates[offset] = reserved_spot_map[spot.spot_id]
+        else:
+            states.append(spot.status)
+            if spot.current_plate:
+                plates[offset] = spot.current_plate
+    return layout, states, plates
+
+
+def rebuild(zone_id):
+    """
+    从数据库重建区域索引并返回 (车位列表, 版本号)。
+
+    若重建期间该区域发生了状态写入，则放弃落盘 (数据仍返回给调用方)，由下次读取重新构建。
+    """
+    from app.extensions import redis_bytes_client
+
+    version = None
+    if redis_bytes_client:
+        try:
+            version = redis_bytes_client.get(version_key(zone_id)) or b"0"
+        except:
+            version = None
+
+    layout, states, plates = _load_from_db(zone_id)
+    _remember_layout(zone_id, layout)
+
+    if version is not None:
+        try:
+            args = [version, INDEX_TTL_SECONDS, encode_states(states), json.dumps(layout)]
+            for offset, plate in plates.items():
+                args.extend([offset, plate])
+            script = _get_script(redis_bytes_client, "rebuild", _REBUILD_LUA)
+            script(keys=list(_keys(zone_id)), args=args)
+        except:
+            pass
+
+    return _to_spot_dicts(zone_id, layout, states, plates), int(version or 0)
+
+
+def _to_spot_dicts(zone_id, layout, states, plates):
+    return [
+        {
+            "spot_id": spot_id,
+            "spot_no": spot_no,
+            "zone_id": zone_id,
+            "status": states[offset],
+            "current_plate": plates.get(offset),
+        }
+        for offset, (spot_id, spot_no) in enumerate(layout)
+    ]
+
+
+def _read_index(zone_id):
+    """从 Redis 读取区域索引，缺失时返回 None"""
+    from app.extensions import redis_bytes_client
+
+    state_key, plates_key, layout_key, v_key = _keys(zone_id)
+    try:
+        pipe = redis_bytes_client.pipeline(transaction=True)
+        pipe.get(state_key)
+        pipe.hgetall(plates_key)
+        pipe.get(layout_key)
+        pipe.get(v_key)
+        bitmap, raw_plates, raw_layout, version = pipe.execute()
+    except:
+        return None
+
+    if bitmap is None or raw_layout is None:
+        return None
+
+    if zone_id in _layouts:
+        layout = _layouts[zone_id][0]
+    else:
+        layout = _remember_layout(zone_id, json.loads(raw_layout))[0]
+    states = decode_states(bitmap, len(layout))
+    plates = {int(k): v.decode() for k, v in raw_plates.items()}
+    return _to_spot_dicts(zone_id, layout, states, plates), int(version or 0)
+
+
+def read(zone_id):
+    """
+    读取区域车位列表及其版本号，单次 MULTI 往返保证两者一致；
+    索引缺失时单飞回源数据库重建，并发读取方等待重建结果。
+
+    Returns:
+        tuple: (车位字典列表, 版本号)
+    """
+    from app.extensions import redis_bytes_client
+
+    if not redis_bytes_client:
+        layout, states, plates = _load_from_db(zone_id)
+        return _to_spot_dicts(zone_id, layout, states, plates), 0
+
+    result = _read_index(zone_id)
+    if result is not None:
+        metrics.incr("cache.spots.hit")
+        return result
+
+    return cache_utils.single_flight(
+        "spots",
+        f"lock:spot_index:{zone_id}",
+        fill=lambda: rebuild(zone_id),
+        retry=lambda: _read_index(zone_id),
+    )
+
+
+def current_version(zone_id):
+    """读取区域当前版本号，Redis 不可用时返回 None"""
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return None
+    try:
+        return int(redis_client.get(version_key(zone_id)) or 0)
+    except:
+        return None
+
+
+def changes_since(zone_id, since):
+    """
+    读取版本 since 之后的车位变更。
+
+    Returns:
+        tuple: (当前版本号, 按版本排序的变更列表)；since 早于变更日志覆盖范围时变更列表为 None，调用方需全量同步
+    """
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return 0, None
+    log_key, floor_key = _log_keys(zone_id)
+    try:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.get(version_key(zone_id))
+        pipe.get(floor_key)
+        pipe.zrangebyscore(log_key, f"({int(since)}", "+inf")
+        version, floor, entries = pipe.execute()
+    except:
+        return 0, None
+
+    version = int(version or 0)
+    if since > version or since < int(floor or 0):
+        return version, None
+
+    changes = []
+    for entry in entries:
+        entry_version, payload = entry.split("|", 1)
+        change = json.loads(payload)
+        change["version"] = int(entry_version)
+        changes.append(change)
+    return version, changes
+
+
+def write(zone_id, spot_id, state, plate=None):
+    """
+    记录单个车位的状态迁移：原子递增区域版本、追加变更日志并更新位图与车牌。
+
+    Returns:
+        int | None: 本次变更的版本号，Redis 不可用时为 None
+    """
+    from app.extensions import redis_bytes_client
+
+    if not redis_bytes_client:
+        return None
+    try:
+        offset = _get_layout(redis_bytes_client, zone_id)[1].get(spot_id)
+        if offset is None:
+            # 布局中不存在该车位 (新增车位)，使索引失效，等待下一次读取重建
+            return invalidate(zone_id)
+        payload = json.dumps(
+            {"spot_id": spot_id, "status": state, "current_plate": plate},
+            ensure_ascii=False,
+        )
+        script = _get_script(redis_bytes_client, "write", _WRITE_LUA)
+        return int(
+            script(
+                keys=list(_keys(zone_id)) + list(_log_keys(zone_id)),
+                args=[offset, state, plate or "", payload, CHANGE_LOG_LIMIT],
+            )
+        )
+    except:
+        return None
+
+
+def invalidate(zone_id=None):
+    """
+    使区域索引失效 (zone_id 为空时清理全部区域)，并截断变更日志。
+
+    Returns:
+        int | None: 单个区域失效后的版本号
+    """
+    from app.extensions import redis_bytes_client
+
+    if zone_id is None:
+        _layouts.clear()
+    else:
+        _layouts.pop(zone_id, None)
+    if not redis_bytes_client:
+        return None
+    try:
+        if zone_id is None:
+            keys = redis_bytes_client.keys("parking:spot_index:*")
+            if keys:
+                redis_bytes_client.delete(*keys)
+            return None
+        script = _get_script(redis_bytes_client, "invalidate", _INVALIDATE_LUA)
+        return int(
+            script(keys=list(_keys(zone_id)) + list(_log_keys(zone_id)))
+        )
+    except:
+        return None
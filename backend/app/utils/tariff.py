@@ -0,0 +1,150 @@
+"""
+分时/阶梯计费方案模块。
+
+区域的计费方案 (parking_zone.tariff，JSON) 格式：
+    {
+        "bands": [{"start": 7, "end": 22, "rate": 8.0}],   本地时间 [start, end) 小时段的每小时费率，end 小于 start 表示跨零点；
+                                                            未覆盖的小时按区域 fee_rate 计费
+        "escalation": [1, 1, 1.5, 2],                        每个计费日内第 k 个计费小时的费率倍数，超出部分沿用最后一项
+        "daily_cap": 60.0                                    每 24 小时计费上限 (可选)
+    }
+
+计费小时从入场时刻起每满 (或不足) 60 分钟为一个，其费率取该小时开始时所在的本地小时段。由于各计费日的计费小时
+都从入场时刻的同一本地小时开始，方案可预先编译为 24×25 的累计费用表 table[入场小时][计费小时数]，
+任意停车时长的费用为: 完整计费日数 × table[h][24] + table[h][剩余小时数]，计算量与停车时长无关。
+"""
+
+from decimal import Decimal, InvalidOperation
+from datetime import timedelta
+
+HOURS_PER_DAY = 24
+
+
+def normalize(tariff):
+    """
+    校验并规范化计费方案。
+
+    Args:
+        tariff (dict | None): 计费方案，None 或空对象表示平价计费
+
+    Returns:
+        dict | None: 规范化后的计费方案
+
+    Raises:
+        ValueError: 方案格式不合法
+    """
+    if not tariff:
+        return None
+    if not isinstance(tariff, dict):
+        raise ValueError("计费方案应为对象")
+
+    def amount(value, name):
+        try:
+            result = Decimal(str(value))
+        except (InvalidOperation, ValueError):
+            raise ValueError(f"{name} 不是有效的数值")
+        if not result.is_finite() or result < 0:
+            raise ValueError(f"{name} 不能为负数")
+        return float(result)
+
+    bands = []
+    for band in tariff.get("bands") or []:
+        try:
+            start, end = int(band["start"]), int(band["end"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("时段应包含整数 start / end")
+        if not (0 <= start < HOURS_PER_DAY and 0 <= end <= HOURS_PER_DAY) or start == end:
+            raise ValueError(f"时段不合法: {start}-{end}")
+        bands.append({"start": start, "end": end, "rate": amount(band.get("rate"), "时段费率")})
+
+    escalation = [amount(v, "阶梯倍数") for v in (tariff.get("escalation") or [])][:HOURS_PER_DAY]
+    daily_cap = tariff.get("daily_cap")
+    return {
+        "bands": bands,
+        "escalation": escalation,
+        "daily_cap": amount(daily_cap, "每日封顶") if daily_cap is not None else None,
+    }
+
+
+class CompiledTariff:
+    """已编译的计费方案：累计费用表 (未计折扣与倍率)"""
+
+    __slots__ = ("table", "utc_offset_hours", "scale", "_scaled")
+
+    def __init__(self, table, utc_offset_hours=0):
+        self.table = table
+        self.utc_offset_hours = utc_offset_hours
+        self.scale = max(max(0, -d.as_tuple().exponent) for row in table for d in row)
+        self._scaled = {}
+
+    def local_hour(self, in_time):
+        """入场时刻 (UTC) 所在的本地小时"""
+        return (in_time + timedelta(hours=self.utc_offset_hours)).hour
+
+    def base_fee(self, start_hour, hours):
+        """
+        查表计算基础费用。
+
+        Args:
+            start_hour (int): 入场本地小时
+            hours (int): 计费小时数
+
+        Returns:
+            Decimal
+        """
+        row = self.table[start_hour]
+        days, remainder = divmod(hours, HOURS_PER_DAY)
+        return days * row[HOURS_PER_DAY] + row[remainder]
+
+    def scaled_table(self, scale, dtype):
+        """
+        放大为整数的累计费用表 (NumPy 数组，按放大倍数缓存)，供批量计费查表。
+
+        Args:
+            scale (int): 小数位数，不小于 self.scale
+            dtype: numpy.int64 或 object (溢出保护)
+        """
+        import numpy
+
+        key = (scale, dtype)
+        if key not in self._scaled:
+            self._scaled[key] = numpy.array(
+                [[int(d.scaleb(scale)) for d in row] for row in self.table], dtype=dtype
+            )
+        return self._scaled[key]
+
+
+def compile_tariff(tariff, default_rate, utc_offset_hours=0):
+    """
+    将计费方案编译为累计费用表。
+
+    Args:
+        tariff (dict): 计费方案 (见模块说明)
+        default_rate: 未被时段覆盖的小时的费率 (区域 fee_rate)
+        utc_offset_hours (int): 本地时间与 UTC 的时差
+
+    Returns:
+        CompiledTariff
+    """
+    tariff = normalize(tariff) or {"bands": [], "escalation": [], "daily_cap": None}
+
+    hourly = [Decimal(str(default_rate))] * HOURS_PER_DAY
+    for band in tariff["bands"]:
+        rate = Decimal(str(band["rate"]))
+        length = (band["end"] - band["start"]) % HOURS_PER_DAY or HOURS_PER_DAY
+        for k in range(length):
+            hourly[(band["start"] + k) % HOURS_PER_DAY] = rate
+
+    escalation = [Decimal(str(v)) for v in tariff["escalation"]] or [Decimal("1")]
+    escalation += [escalation[-1]] * (HOURS_PER_DAY - len(escalation))
+    cap = Decimal(str(tariff["daily_cap"])) if tariff["daily_cap"] is not None else None
+
+    table = []
+    for start_hour in range(HOURS_PER_DAY):
+        total = Decimal("0")
+        row = [total]
+        for k in range(HOURS_PER_DAY):
+            total += hourly[(start_hour + k) % HOURS_PER_DAY] * escalation[k]
+            row.append(min(total, cap) if cap is not None else total)
+        table.append(row)
+    return CompiledTariff(table, utc_offset_hours)
@@ -0,0 +1,284 @@
+"""
+按学校名册批量开通账号模块。
+
+开学时大批师生逐个调用注册接口，每次注册都需查询名册、计算一次密码哈希并单独提交。批量开通由管理员发起，
+对指定的学号/工号列表 (或 school_members 全部名册) 按 user_no 分批处理：
+    1. 批量查询名册 (不在名册中的记为 not_found) 与 sys_user (已有账号记为 skipped，不计算哈希)
+    2. 以进程池并行计算本批新账号的初始密码哈希
+    3. 以多行 INSERT IGNORE 写入本批账号并提交一次，并发注册已写入的账号同样计为 skipped
+
+重复执行同一批次不会重复创建账号。初始密码由管理员指定 (学号/工号公开可查，不作为密码)，开通的账号标记
+must_reset_password，首次登录时须修改密码。哈希算法默认与 PASSWORD_HASH_METHOD 一致；PROVISION_HASH_METHOD
+可指定较低强度的算法以缩短开通时间，首次登录修改密码时按当前配置重新计算。
+
+任务进度保存在 Redis 哈希 user_provision:<job_id> (保留 PROGRESS_TTL 秒)，Redis 不可用时保存在本进程内。
+同一时刻只运行一个开通任务。
+
+运行指标：
+    provision.created / skipped / not_found / failed (counter)
+    provision.chunk / provision.hash (timing)
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from app.extensions import db
+from app.utils import metrics
+
+PROGRESS_KEY = "user_provision:{}"
+LOCK_KEY = "user_provision:running"
+PROGRESS_TTL = 86400
+LOCK_TTL = 600  # 每批处理后续期；进程异常退出时锁在该时间后自动释放
+
+_jobs = {}  # Redis 不可用时的任务进度
+_local_lock = threading.Lock()
+
+
+class ProvisionBusyError(Exception):
+    """已有开通任务正在运行"""
+
+    def __init__(self, job_id):
+        super().__init__("已有批量开通任务正在运行")
+        self.job_id = job_id
+
+
+def _redis():
+    from app.extensions import redis_client
+
+    return redis_client
+
+
+def acquire(job_id=None):
+    """
+    占用任务锁。
+
+    Returns:
+        str: 新任务ID
+
+    Raises:
+        ProvisionBusyError: 已有任务正在运行
+    """
+    job_id = job_id or uuid.uuid4().hex
+    redis_client = _redis()
+    if redis_client:
+        try:
+            if not redis_client.set(LOCK_KEY, job_id, nx=True, ex=LOCK_TTL):
+                raise ProvisionBusyError(redis_client.get(LOCK_KEY))
+            _save(job_id, {"status": "pending", "created_at": datetime.utcnow().isoformat()})
+            return job_id
+        except ProvisionBusyError:
+            raise
+        except:
+            pass
+    with _local_lock:
+        for other_id, job in _jobs.items():
+            if job.get("status") in ("pending", "running"):
+                raise ProvisionBusyError(other_id)
+        _jobs[job_id] = {"status": "pending", "created_at": datetime.utcnow().isoformat()}
+    return job_id
+
+
+def _release(job_id):
+    redis_client = _redis()
+    if redis_client:
+        try:
+            if redis_client.get(LOCK_KEY) == job_id:
+                redis_client.delete(LOCK_KEY)
+        except:
+            pass
+
+
+def _save(job_id, fields):
+    with _local_lock:
+        _jobs.setdefault(job_id, {}).update(fields)
+    redis_client = _redis()
+    if redis_client:
+        try:
+            key = PROGRESS_KEY.format(job_id)
+            pipe = redis_client.pipeline()
+            pipe.hset(key, mapping={k: "" if v is None else v for k, v in fields.items()})
+            pipe.expire(key, PROGRESS_TTL)
+            if fields.get("status") == "running":
+                pipe.expire(LOCK_KEY, LOCK_TTL)
+            pipe.execute()
+        except:
+            pass
+
+
+_INT_FIELDS = ("total", "processed", "created", "skipped", "not_found", "failed")
+
+
+def get_progress(job_id):
+    """
+    读取任务进度。
+
+    Returns:
+        dict | None: status / total / processed / created / skipped / not_found / failed 等字段，任务不存在时返回 None
+    """
+    progress = None
+    redis_client = _redis()
+    if redis_client:
+        try:
+            progress = redis_client.hgetall(PROGRESS_KEY.format(job_id)) or None
+        except:
+            pass
+    if progress is None:
+        with _local_lock:
+            progress = dict(_jobs[job_id]) if job_id in _jobs else None
+    if progress is None:
+        return None
+    for field in _INT_FIELDS:
+        if field in progress:
+            progress[field] = int(progress[field] or 0)
+    progress["job_id"] = job_id
+    return progress
+
+
+def _roster_chunks(user_nos, chunk_size):
+    """按 user_no 顺序分批产出 (本批请求的学号/工号列表, 名册记录列表)"""
+    from app.models.school import SchoolMember
+
+    if user_nos is not None:
+        for i in range(0, len(user_nos), chunk_size):
+            keys = user_nos[i:i + chunk_size]
+            yield keys, SchoolMember.query.filter(SchoolMember.user_no.in_(keys)).all()
+        return
+
+    last_user_no = ""
+    while True:
+        members = (
+            SchoolMember.query.filter(SchoolMember.user_no > last_user_no)
+            .order_by(SchoolMember.user_no)
+            .limit(chunk_size)
+            .all()
+        )
+        if not members:
+            return
+        last_user_no = members[-1].user_no
+        yield [m.user_no for m in members], members
+        if len(members) < chunk_size:
+            return
+
+
+def _insert_users(rows):
+    """多行写入，跳过 user_no 已存在的行；返回实际写入行数"""
+    from app.models.user import SysUser
+
+    stmt = insert(SysUser.__table__).prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite")
+    result = db.session.execute(stmt, rows)
+    db.session.commit()
+    return result.rowcount
+
+
+def run(job_id, user_nos=None, initial_password=None, chunk_size=1000, processes=None, method=None):
+    """
+    执行开通任务 (需在应用上下文中调用，调用前须以 acquire 占用任务锁)。
+
+    Args:
+        job_id (str): acquire 返回的任务ID
+        user_nos (list[str], optional): 待开通的学号/工号，为 None 时开通全部名册
+        initial_password (str): 统一初始密码 (必填)，账号首次登录时须修改
+        chunk_size (int): 每批处理的账号数
+        processes (int, optional): 计算哈希的进程数，缺省为 CPU 核数
+        method (str, optional): 哈希算法，缺省为 PASSWORD_HASH_METHOD
+
+    Returns:
+        dict: 最终进度
+    """
+    from app.models.school import SchoolMember
+    from app.models.user import SysUser
+    from app.utils import password_hasher
+
+    method = method or password_hasher.configured_method()
+    processes = processes or os.cpu_count() or 1
+    stats = {"processed": 0, "created": 0, "skipped": 0, "not_found": 0, "failed": 0}
+    job_start = time.perf_counter()
+    try:
+        if not initial_password:
+            raise ValueError("未指定初始密码")
+        if user_nos is not None:
+            user_nos = sorted(set(user_nos))
+            total = len(user_nos)
+        else:
+            total = SchoolMember.query.count()
+        _save(job_id, {"status": "running", "total": total, "started_at": datetime.utcnow().isoformat(), **stats})
+
+        pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            for keys, members in _roster_chunks(user_nos, chunk_size):
+                chunk_start = time.perf_counter()
+                existing = {
+                    user_no
+                    for (user_no,) in db.session.query(SysUser.user_no).filter(SysUser.user_no.in_(keys))
+                }
+                new_members = [m for m in members if m.user_no not in existing]
+                skipped = len(members) - len(new_members)
+                not_found = len(keys) - len(members)
+
+                hash_start = time.perf_counter()
+                hashes = list(pool.map(
+                    generate_password_hash, repeat(initial_password, len(new_members)), repeat(method),
+                    chunksize=max(1, len(new_members) // (processes * 4)),
+                ))
+                metrics.observe("provision.hash", time.perf_counter() - hash_start)
+
+                now = datetime.utcnow()
+                rows = [
+                    {
+                        "user_no": m.user_no,
+                        "username": m.real_name,
+                        "password": password_hash,
+                        "role": m.member_type,
+                        "balance": 0,
+                        "credit_score": 100,
+                        "is_active": True,
+                        "must_reset_password": True,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for m, password_hash in zip(new_members, hashes)
+                ]
+                created = 0
+                if rows:
+                    try:
+                        created = _insert_users(rows)
+                    except Exception:
+                        db.session.rollback()
+                        stats["failed"] += len(rows)
+                        metrics.incr("provision.failed", len(rows))
+                        rows = []
+                # 释放本批已加载的对象，内存占用与名册规模无关
+                db.session.expunge_all()
+
+                stats["processed"] += len(keys)
+                stats["created"] += created
+                skipped += len(rows) - created
+                stats["skipped"] += skipped
+                stats["not_found"] += not_found
+                metrics.incr("provision.created", created)
+                metrics.incr("provision.skipped", skipped)
+                metrics.incr("provision.not_found", not_found)
+                metrics.observe("provision.chunk", time.perf_counter() - chunk_start)
+                _save(job_id, {"status": "running", **stats})
+        finally:
+            pool.shutdown()
+
+        _save(job_id, {
+            "status": "finished",
+            "finished_at": datetime.utcnow().isoformat(),
+            "elapsed_seconds": round(time.perf_counter() - job_start, 1),
+            **stats,
+        })
+    except Exception as e:
+        db.session.rollback()
+        _save(job_id, {"status": "failed", "error": str(e), "finished_at": datetime.utcnow().isoformat(), **stats})
+    finally:
+        _release(job_id)
+    return get_progress(job_id)
@@ -0,0 +1,198 @@
+"""
+区域车位计数器模块。
+
+在 Redis 哈希 parking:zone_stats:{zone_id} 中为每个区域维护 total/free/reserved/occupied/maintenance
+五项计数，由车位与订单状态变更路径增量更新，并由定时任务按数据库全量校准。
+"""
+
+from sqlalchemy import func
+from app.extensions import db
+from app.utils import cache_utils, metrics
+
+# 车位对外展示状态 -> 计数字段 (0-空闲, 1-占用, 2-维修, 3-已预约)
+STATE_FIELDS = {0: "free", 1: "occupied", 2: "maintenance", 3: "reserved"}
+COUNTER_FIELDS = ("total", "free", "reserved", "occupied", "maintenance")
+
+# 仅当计数器已存在时才做增量，避免在缺失的 key 上生成残缺计数
+_TRANSITION_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HINCRBY', KEYS[1], ARGV[1], -1)
+    redis.call('HINCRBY', KEYS[1], ARGV[2], 1)
+    return 1
+end
+return 0
+"""
+_transition_script = None
+
+
+def _key(zone_id):
+    return f"parking:zone_stats:{zone_id}"
+
+
+def _get_transition_script(redis_client):
+    global _transition_script
+    if _transition_script is None:
+        _transition_script = redis_client.register_script(_TRANSITION_LUA)
+    return _transition_script
+
+
+def empty_counters():
+    """返回全零计数"""
+    return {field: 0 for field in COUNTER_FIELDS}
+
+
+def load_from_db(zone_ids=None):
+    """
+    以两条分组聚合查询从数据库统计各区域车位计数。
+
+    Args:
+        zone_ids (list, optional): 仅统计指定区域，None 表示全部区域
+
+    Returns:
+        dict: {zone_id: {total, free, reserved, occupied, maintenance}}
+    """
+    from app.models.parking import ParkingZone, ParkingSpot
+    from app.models.order import ParkingOrder
+
+    if zone_ids is None:
+        zone_ids = [zid for (zid,) in db.session.query(ParkingZone.zone_id).all()]
+    stats = {zid: empty_counters() for zid in zone_ids}
+    if not zone_ids:
+        return stats
+
+    status_rows = (
+        db.session.query(ParkingSpot.zone_id, ParkingSpot.status, func.count())
+        .filter(ParkingSpot.zone_id.in_(zone_ids))
+        .group_by(ParkingSpot.zone_id, ParkingSpot.status)
+        .all()
+    )
+    for zone_id, status, count in status_rows:
+        stats[zone_id]["total"] += count
+        field = STATE_FIELDS.get(status)
+        if field:
+            stats[zone_id][field] += count
+
+    # 空闲但存在 status=0 预约订单的车位视为"已预约"
+    reserved_rows = (
+        db.session.query(
+            ParkingSpot.zone_id, func.count(func.distinct(ParkingSpot.spot_id))
+        )
+        .join(ParkingOrder, ParkingOrder.spot_id == ParkingSpot.spot_id)
+        .filter(
+            ParkingSpot.zone_id.in_(zone_ids),
+            ParkingSpot.status == 0,
+            ParkingOrder.status == 0,
+        )
+        .group_by(ParkingSpot.zone_id)
+        .all()
+    )
+    for zone_id, count in reserved_rows:
+        stats[zone_id]["reserved"] = count
+        stats[zone_id]["free"] -= count
+
+    return stats
+
+
+def reconcile(zone_ids=None):
+    """
+    按数据库实际状态重建 Redis 计数器 (定时校准及缓存缺失时调用)。
+
+    Returns:
+        dict: 重建后的计数
+    """
+    from app.extensions import redis_client
+
+    stats = load_from_db(zone_ids)
+    if redis_client:
+        try:
+            pipe = redis_client.pipeline(transaction=True)
+            for zone_id, counters in stats.items():
+                pipe.delete(_key(zone_id))
+                pipe.hset(_key(zone_id), mapping=counters)
+            pipe.execute()
+        except:
+            pass
+    return stats
+
+
+def apply_transition(zone_id, prev_status, status):
+    """
+    原子地将一个车位从 prev_status 计数迁移到 status 计数。
+
+    计数器不存在时不做任何写入，由下一次读取或定时校准从数据库重建。
+    """
+    from app.extensions import redis_client
+
+    prev_field = STATE_FIELDS.get(prev_status)
+    field = STATE_FIELDS.get(status)
+    if not redis_client or not prev_field or not field or prev_field == field:
+        return
+    try:
+        script = _get_transition_script(redis_client)
+        script(keys=[_key(zone_id)], args=[prev_field, field])
+    except:
+        pass
+
+
+def _read_counters(redis_client, zone_ids):
+    """单次 pipeline 读取计数，返回 (已命中计数, 缺失的区域列表)"""
+    stats = {}
+    missing = []
+    pipe = redis_client.pipeline(transaction=False)
+    for zone_id in zone_ids:
+        pipe.hgetall(_key(zone_id))
+    for zone_id, raw in zip(zone_ids, pipe.execute()):
+        if raw:
+            stats[zone_id] = {f: int(raw.get(f, 0)) for f in COUNTER_FIELDS}
+        else:
+            missing.append(zone_id)
+    return stats, missing
+
+
+def get_counters(zone_ids):
+    """
+    读取多个区域的计数，单次 pipeline 往返；缺失的区域单飞回源数据库重建。
+
+    Returns:
+        dict: {zone_id: {total, free, reserved, occupied, maintenance}}
+    """
+    from app.extensions import redis_client
+
+    if not redis_client:
+        return load_from_db(zone_ids)
+
+    try:
+        stats, missing = _read_counters(redis_client, zone_ids)
+    except:
+        return load_from_db(zone_ids)
+
+    if missing:
+        def retry():
+            try:
+                found, still_missing = _read_counters(redis_client, missing)
+            except:
+                return None
+            return None if still_missing else found
+
+        stats.update(
+            cache_utils.single_flight(
+                "zone_stats", "lock:zone_stats", fill=lambda: reconcile(missing), retry=retry
+            )
+        )
+    else:
+        metrics.incr("cache.zone_stats.hit")
+    return stats
+
+
+def apply_to(zone_dict, counters):
+    """将计数写入区域字典的统计字段"""
+    zone_dict.update(
+        {
+            "total_spots": counters["total"],
+            "available_spots": counters["free"],
+            "reserved_spots": counters["reserved"],
+            "occupied_spots": counters["occupied"],
+            "maintenance_spots": counters["maintenance"],
+        }
+    )
+    return zone_dict
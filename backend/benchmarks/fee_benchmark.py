@@ -0,0 +1,137 @@
+"""
+批量计费一致性与性能测试。
+
+随机生成订单 (含免费时长边界、整小时边界、缺失时间、多位小数的费率/折扣/倍率，约半数订单使用随机的
+分时/阶梯计费方案)，逐项比对
+calculate_parking_fees_bulk / calculate_parking_fees_elapsed 与标量 compute_fee 的结果，并统计两者耗时。不依赖数据库与 Redis。
+固定种子的一致性回归测试见 tests/test_fee_calculator.py (随 pytest 运行)，本脚本用于大规模随机比对与性能统计。
+
+用法 (在 backend 目录下)：
+    python -m benchmarks.fee_benchmark --orders 200000 --rounds 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.fee_calculator import (
+    compute_fee,
+    calculate_parking_fees_bulk,
+    calculate_parking_fees_elapsed,
+)
+from app.utils.tariff import compile_tariff
+
+RATES = ["0", "1", "2.5", "3.00", "4.75", "12.34", "0.01", "999.99"]
+DISCOUNTS = ["1.0", "0.9", "0.8", "0.85", "0.333", "1"]
+MULTIPLIERS = ["1.0", "1.5", "0.7", "1.25", "2", "0.123"]
+FREE_MINUTES = [0, 15, 30, 60]
+
+
+def random_tariff(rng):
+    """随机分时/阶梯计费方案"""
+    bands = []
+    for _ in range(rng.randrange(4)):
+        start = rng.randrange(24)
+        end = rng.choice([e for e in range(1, 25) if e != start])
+        bands.append({"start": start, "end": end, "rate": float(rng.choice(RATES))})
+    return {
+        "bands": bands,
+        "escalation": [rng.choice([0.5, 1, 1.25, 2]) for _ in range(rng.randrange(6))],
+        "daily_cap": rng.choice([None, 20, 45.5, 300]),
+    }
+
+
+def random_orders(rng, count):
+    """生成随机订单：(入场, 出场, 费率, 免费分钟, 角色)"""
+    base = datetime(2025, 1, 1)
+    orders = []
+    for _ in range(count):
+        in_time = base + timedelta(seconds=rng.randrange(365 * 86400), microseconds=rng.randrange(10 ** 6))
+        kind = rng.random()
+        if kind < 0.05:
+            out_time = None
+        elif kind < 0.25:
+            # 贴近免费时长与整小时的边界
+            minutes = rng.choice(FREE_MINUTES + [60, 120, 180]) + rng.choice([-1, 0, 1]) * rng.random() / 1000
+            out_time = in_time + timedelta(minutes=minutes)
+        else:
+            out_time = in_time + timedelta(seconds=rng.randrange(-600, 3 * 86400), microseconds=rng.randrange(10 ** 6))
+        orders.append((in_time, out_time, Decimal(rng.choice(RATES)), rng.choice(FREE_MINUTES), rng.randrange(3)))
+    return orders
+
+
+def check_round(rng, count):
+    """单轮随机比对，返回 (不一致列表, 标量耗时, 批量耗时, 按时长批量耗时)"""
+    orders = random_orders(rng, count)
+    multiplier = Decimal(rng.choice(MULTIPLIERS))
+    discounts = {role: Decimal(rng.choice(DISCOUNTS)) for role in range(3)}
+    compiled = [compile_tariff(random_tariff(rng), rng.choice(RATES), 8) for _ in range(3)]
+    tariffs = [rng.choice(compiled) if rng.random() < 0.5 else None for _ in range(count)]
+
+    start = time.perf_counter()
+    expected = [
+        compute_fee(i, o, r, f, discounts[role], multiplier, tariff=t)
+        for (i, o, r, f, role), t in zip(orders, tariffs)
+    ]
+    scalar_seconds = time.perf_counter() - start
+
+    in_times, out_times, rates, free, roles = zip(*orders)
+    start = time.perf_counter()
+    cents = calculate_parking_fees_bulk(
+        in_times, out_times, rates, free, roles, {}, multiplier=multiplier, discounts=discounts, tariffs=tariffs
+    )
+    bulk_seconds = time.perf_counter() - start
+
+    # 与数据库 TIMESTAMPDIFF(MICROSECOND, ...) 取得的时长等价的入参
+    valid = [i is not None and o is not None for i, o in zip(in_times, out_times)]
+    elapsed = [(o - i) // timedelta(microseconds=1) if v else 0 for i, o, v in zip(in_times, out_times, valid)]
+    in_hours = [i.hour for i in in_times]
+    start = time.perf_counter()
+    elapsed_cents = calculate_parking_fees_elapsed(
+        elapsed, valid, rates, free, roles, {}, multiplier=multiplier, discounts=discounts,
+        tariffs=tariffs, in_hours=in_hours,
+    )
+    elapsed_seconds = time.perf_counter() - start
+
+    mismatches = [
+        (orders[k], expected[k], int(cents[k]), int(elapsed_cents[k]))
+        for k in range(count)
+        if not int(expected[k] * 100) == int(cents[k]) == int(elapsed_cents[k])
+    ]
+    return mismatches, scalar_seconds, bulk_seconds, elapsed_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量计费一致性与性能测试")
+    parser.add_argument("--orders", type=int, default=100000, help="每轮订单数")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    total_scalar = total_bulk = total_elapsed = 0.0
+    for round_no in range(args.rounds):
+        mismatches, scalar_seconds, bulk_seconds, elapsed_seconds = check_round(rng, args.orders)
+        total_scalar += scalar_seconds
+        total_bulk += bulk_seconds
+        total_elapsed += elapsed_seconds
+        if mismatches:
+            print(f"seed={seed} round={round_no}: {len(mismatches)} 项不一致，例如 {mismatches[0]}")
+            sys.exit(1)
+
+    orders = args.orders * args.rounds
+    print(f"seed={seed} 共 {orders} 项全部一致")
+    print(f"标量: {total_scalar:.3f}s ({orders / total_scalar:,.0f} 单/秒)")
+    print(f"批量 (datetime): {total_bulk:.3f}s ({orders / total_bulk:,.0f} 单/秒)")
+    print(f"批量 (微秒时长): {total_elapsed:.3f}s ({orders / total_elapsed:,.0f} 单/秒)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+登录洪峰下的密码哈希基准测试。
+
+同时发起 N 次登录的密码校验，并以固定间隔执行一个轻量的 "API 请求" 作为探针，分别统计：
+    login_p50/p95/p99/max   单次登录的密码校验耗时 (含排队)
+    probe_p50/p99/max       探针请求相对预定时刻的延迟，反映洪峰期间其他接口受到的影响
+    rejected                因排队超出上限被拒绝 (线上返回 503) 的登录数
+
+两种模式：
+    inline    在请求中直接计算哈希 (改造前的做法)
+    offload   通过 app.utils.password_hasher 在原生线程中计算
+
+默认与线上一致使用 eventlet (monkey patch 后以协程运行)；未安装 eventlet 或指定 --threads 时改用原生线程，
+并以一把全局锁模拟单个事件循环 (请求处理与探针都需持有该锁，inline 模式计算哈希时同样持有)。不依赖数据库与 Redis。
+
+用法 (在 backend 目录下)：
+    python -m benchmarks.login_burst_benchmark --logins 500
+    python -m benchmarks.login_burst_benchmark --logins 500 --mode offload --workers 8 --method pbkdf2:sha256:600000
+"""
+
+import sys
+
+USE_EVENTLET = "--threads" not in sys.argv
+if USE_EVENTLET:
+    try:
+        import eventlet
+
+        eventlet.monkey_patch()
+    except ImportError:
+        USE_EVENTLET = False
+
+import argparse
+import contextlib
+import json
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import check_password_hash, generate_password_hash
+from app.utils import password_hasher
+
+PASSWORD = "semester-start-123"
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return round(sorted_values[index] * 1000, 2)
+
+
+def run_burst(mode, logins, stored_hash, probe_interval):
+    """
+    执行一轮登录洪峰。
+
+    Returns:
+        dict: 本轮统计结果
+    """
+    # eventlet 下由事件循环本身保证同一时刻只有一个协程运行；原生线程下以锁模拟
+    loop = contextlib.nullcontext() if USE_EVENTLET else threading.Lock()
+    login_latencies = []
+    probe_latencies = []
+    rejected = []
+    done = threading.Event()
+
+    def login():
+        start = time.perf_counter()
+        try:
+            if mode == "inline":
+                with loop:
+                    ok = check_password_hash(stored_hash, PASSWORD)
+            else:
+                ok = password_hasher.verify_password(stored_hash, PASSWORD)
+            assert ok
+            login_latencies.append(time.perf_counter() - start)
+        except password_hasher.PasswordHashBusyError:
+            rejected.append(1)
+
+    def probe():
+        payload = {"success": True, "data": [{"spot_id": i, "status": i % 3} for i in range(50)]}
+        scheduled = time.perf_counter()
+        while not done.is_set():
+            scheduled += probe_interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with loop:
+                json.dumps(payload)
+            probe_latencies.append(time.perf_counter() - scheduled)
+
+    probe_thread = threading.Thread(target=probe)
+    probe_thread.start()
+    time.sleep(probe_interval * 10)  # 先采集若干空闲时的探针样本
+
+    wall_start = time.perf_counter()
+    threads = [threading.Thread(target=login) for _ in range(logins)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall_seconds = time.perf_counter() - wall_start
+    done.set()
+    probe_thread.join()
+
+    login_latencies.sort()
+    probe_latencies.sort()
+    return {
+        "mode": mode,
+        "logins": logins,
+        "rejected": len(rejected),
+        "wall_seconds": round(wall_seconds, 2),
+        "login_p50_ms": percentile(login_latencies, 0.50),
+        "login_p95_ms": percentile(login_latencies, 0.95),
+        "login_p99_ms": percentile(login_latencies, 0.99),
+        "login_max_ms": percentile(login_latencies, 1.0),
+        "probe_p50_ms": percentile(probe_latencies, 0.50),
+        "probe_p99_ms": percentile(probe_latencies, 0.99),
+        "probe_max_ms": percentile(probe_latencies, 1.0),
+    }
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="登录洪峰下的密码哈希基准测试")
+    parser.add_argument("--logins", type=int, default=500, help="同时发起的登录数")
+    parser.add_argument("--mode", choices=["inline", "offload", "both"], default="both")
+    parser.add_argument("--method", default=Config.PASSWORD_HASH_METHOD, help="密码哈希算法及强度")
+    parser.add_argument("--workers", type=int, default=Config.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=None,
+                        help="排队上限，缺省时等于 --logins (全部受理)；线上配置为 PASSWORD_HASH_QUEUE_SIZE")
+    parser.add_argument("--probe-interval-ms", type=float, default=10)
+    parser.add_argument("--threads", action="store_true", help="不使用 eventlet，改用原生线程")
+    args = parser.parse_args()
+
+    password_hasher.configure(args.workers, args.queue_size or args.logins)
+    stored_hash = generate_password_hash(PASSWORD, args.method)
+    modes = ["inline", "offload"] if args.mode == "both" else [args.mode]
+
+    report = {
+        "runtime": "eventlet" if USE_EVENTLET else "threads",
+        "method": args.method,
+        "workers": args.workers,
+        "cpu_count": os.cpu_count(),
+        "results": [run_burst(mode, args.logins, stored_hash, args.probe_interval_ms / 1000) for mode in modes],
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
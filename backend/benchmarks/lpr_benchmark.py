@@ -0,0 +1,273 @@
+"""
+车牌识别准确率与延迟基准测试。
+
+将本地已标注的车牌图片目录依次送入各识别后端与预处理设置的组合，输出 JSON 格式的结果：
+    exact_match   车牌完全一致的比例
+    cer           字符错误率 (编辑距离之和 / 标注字符总数)
+    p50/p95/p99   单张识别耗时 (毫秒，含解码、缩小解码失败后的原图重试)
+    throughput    每秒识别张数 (墙钟) 及每 CPU 秒识别张数 (per_core)
+    peak_rss_mb   识别进程的峰值常驻内存
+
+图片标注取自目录下的 labels.csv (文件名,车牌)；没有 labels.csv 时取文件名中第一个 "_" 之前的部分，
+如 京A12345_02.jpg。每个组合在独立的子进程中运行，峰值内存互不影响。
+
+用法 (在 backend 目录下)：
+    python -m benchmarks.lpr_benchmark --images /data/plates --backends hyperlpr,onnx --max-sides 0,1280
+    python -m benchmarks.lpr_benchmark --images /data/plates --baseline benchmarks/lpr_baseline.json
+    python -m benchmarks.lpr_benchmark --images /data/plates --write-baseline benchmarks/lpr_baseline.json
+
+指定 --baseline 时，与基线相比准确率下降或 p95 延迟上升超出容差即以退出码 1 结束；基线缺少对应组合、
+基线指标为 null (尚未实测) 或本次组合运行失败时同样以退出码 1 结束，不会静默通过。
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+BASELINE_METRICS = ("exact_match", "cer", "p95_ms")  # --baseline 比较的指标
+
+
+def load_dataset(image_dir):
+    """
+    读取标注图片列表。
+
+    Returns:
+        list: [(图片路径, 车牌), ...]
+    """
+    labels_path = os.path.join(image_dir, "labels.csv")
+    if os.path.isfile(labels_path):
+        with open(labels_path, encoding="utf-8") as f:
+            return [
+                (os.path.join(image_dir, row[0]), row[1].strip())
+                for row in csv.reader(f)
+                if len(row) >= 2 and not row[0].startswith("#")
+            ]
+    return [
+        (os.path.join(image_dir, name), os.path.splitext(name)[0].split("_")[0])
+        for name in sorted(os.listdir(image_dir))
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+
+def edit_distance(a, b):
+    """Levenshtein 编辑距离"""
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return round(peak / 1024 / 1024 if platform.system() == "Darwin" else peak / 1024, 1)
+
+
+def _run_setting(backend, max_side, dataset, options, result_queue):
+    """子进程内：加载后端并按线上同样的预处理流程识别全部图片"""
+    from app.services.lpr_engine import build_recognizer
+    from app.utils import image_preprocess
+
+    load_start = time.perf_counter()
+    recognizer = build_recognizer(backend, options)
+    load_seconds = time.perf_counter() - load_start
+
+    latencies = []
+    exact = 0
+    char_errors = 0
+    char_total = 0
+    retries = 0
+    failures = []
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    for path, label in dataset:
+        with open(path, "rb") as f:
+            data = f.read()
+        start = time.perf_counter()
+        reduce = image_preprocess.reduction_for(data, max_side)
+        img = image_preprocess.decode(data, reduce)
+        candidates = recognizer(img) if img is not None else []
+        if not candidates and reduce > 1:
+            retries += 1
+            img = image_preprocess.decode(data, 1)
+            candidates = recognizer(img) if img is not None else []
+        latencies.append(time.perf_counter() - start)
+
+        predicted = max(candidates, key=lambda c: c[1])[0] if candidates else ""
+        if predicted == label:
+            exact += 1
+        else:
+            failures.append({"image": os.path.basename(path), "label": label, "predicted": predicted})
+        char_errors += edit_distance(predicted, label)
+        char_total += len(label)
+
+    wall_seconds = time.perf_counter() - wall_start
+    cpu_seconds = time.process_time() - cpu_start
+    latencies.sort()
+    count = len(dataset)
+    result_queue.put(
+        {
+            "backend": backend,
+            "max_side": max_side,
+            "images": count,
+            "exact_match": round(exact / count, 4) if count else None,
+            "cer": round(char_errors / char_total, 4) if char_total else None,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+            "throughput": round(count / wall_seconds, 2) if wall_seconds else None,
+            "throughput_per_core": round(count / cpu_seconds, 2) if cpu_seconds else None,
+            "full_resolution_retries": retries,
+            "model_load_ms": round(load_seconds * 1000, 1),
+            "peak_rss_mb": _peak_rss_mb(),
+            "failures": failures[:20],
+        }
+    )
+
+
+def run_benchmark(dataset, backends, max_sides, options):
+    """逐个组合在独立子进程中运行，返回结果列表"""
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for backend in backends:
+        for max_side in max_sides:
+            result_queue = context.Queue()
+            process = context.Process(
+                target=_run_setting, args=(backend, max_side, dataset, options, result_queue)
+            )
+            process.start()
+            result = None
+            while result is None:
+                try:
+                    result = result_queue.get(timeout=1)
+                except queue.Empty:
+                    if not process.is_alive():
+                        break
+            process.join()
+            results.append(
+                result or {"backend": backend, "max_side": max_side, "error": f"exit code {process.exitcode}"}
+            )
+    return results
+
+
+def compare_with_baseline(results, baseline, accuracy_tolerance, latency_tolerance):
+    """
+    与基线比较，返回回归描述列表。
+
+    准确率允许下降 accuracy_tolerance (绝对值)，p95 延迟允许上升 latency_tolerance (比例)。
+    基线中没有对应组合、指标为 null 或本次运行失败均计为回归。
+    """
+    expected = {(r["backend"], r["max_side"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        label = f"{result.get('backend')}@{result.get('max_side')}"
+        base = expected.get((result.get("backend"), result.get("max_side")))
+        if not base:
+            regressions.append(f"{label}: 基线中没有该组合")
+            continue
+        if "error" in result:
+            regressions.append(f"{label}: 运行失败 {result['error']}")
+            continue
+        missing = [k for k in BASELINE_METRICS if base.get(k) is None or result.get(k) is None]
+        if missing:
+            regressions.append(f"{label}: 基线或本次结果缺少指标 {', '.join(missing)}，请先以 --write-baseline 实测生成基线")
+            continue
+        if result["exact_match"] < base["exact_match"] - accuracy_tolerance:
+            regressions.append(f"{label}: exact_match {result['exact_match']} < {base['exact_match']}")
+        if result["cer"] > base["cer"] + accuracy_tolerance:
+            regressions.append(f"{label}: cer {result['cer']} > {base['cer']}")
+        if result["p95_ms"] > base["p95_ms"] * (1 + latency_tolerance):
+            regressions.append(f"{label}: p95_ms {result['p95_ms']} > {base['p95_ms']}")
+    return regressions
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="车牌识别准确率与延迟基准测试")
+    parser.add_argument("--images", required=True, help="已标注车牌图片目录")
+    parser.add_argument("--backends", default=Config.LPR_BACKEND, help="逗号分隔的识别后端 hyperlpr,yolo,onnx")
+    parser.add_argument("--max-sides", default=f"0,{Config.LPR_DECODE_MAX_SIDE}",
+                        help="逗号分隔的 LPR_DECODE_MAX_SIDE 取值，0 表示原图解码")
+    parser.add_argument("--onnx-quantize", choices=["config", "true", "false"], default="config")
+    parser.add_argument("--output", help="结果输出文件，缺省时输出到标准输出")
+    parser.add_argument("--baseline", help="与基线文件比较，出现回归时退出码为 1")
+    parser.add_argument("--write-baseline", help="将本次结果写为基线文件")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.01)
+    parser.add_argument("--latency-tolerance", type=float, default=0.20)
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.images)
+    if not dataset:
+        parser.error(f"目录中没有标注图片: {args.images}")
+
+    options = {
+        "yolo_weights": Config.LPR_YOLO_WEIGHTS,
+        "onnx_recognizer": Config.LPR_ONNX_RECOGNIZER,
+        "onnx_detector": Config.LPR_ONNX_DETECTOR or None,
+        "onnx_quantize": Config.LPR_ONNX_QUANTIZE if args.onnx_quantize == "config" else args.onnx_quantize == "true",
+        "onnx_threads": Config.LPR_ONNX_THREADS,
+        "onnx_charset": Config.LPR_ONNX_CHARSET or None,
+    }
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    max_sides = [int(v) for v in args.max_sides.split(",") if v.strip()]
+
+    report = {
+        "dataset": os.path.abspath(args.images),
+        "images": len(dataset),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "onnx_threads": options["onnx_threads"],
+        "results": run_benchmark(dataset, backends, max_sides, options),
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.write_baseline:
+        baseline = dict(report, results=[
+            {k: v for k, v in r.items() if k != "failures"} for r in report["results"]
+        ])
+        with open(args.write_baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(
+            report["results"], baseline, args.accuracy_tolerance, args.latency_tolerance
+        )
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,25 @@ from app.models.car import Car
 from app.models.parking import ParkingZone, ParkingSpot
 from app.models.order import ParkingOrder
 from app.utils.auth_utils import hash_password
+from sqlalchemy import inspect, text
+
+# 已有数据库升级时补充的列: (表名, 列名, 列定义)；create_all 只创建缺失的表，不会修改已有表
+ADDED_COLUMNS = [
+    ('parking_zone', 'tariff', "JSON NULL COMMENT '分时/阶梯计费方案，为空时按 fee_rate 平价计费'"),
+    ('sys_user', 'must_reset_password', "TINYINT(1) NOT NULL DEFAULT 0 COMMENT '首次登录须修改密码'"),
+]
+
+def ensure_columns():
+    """为已有表补充新增的列"""
+    inspector = inspect(db.engine)
+    for table, column, definition in ADDED_COLUMNS:
+        if not inspector.has_table(table):
+            continue
+        if column in {c['name'] for c in inspector.get_columns(table)}:
+            continue
+        print(f'Adding column {table}.{column}...')
+        with db.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {definition}'))
 
 def init_database():
     """初始化数据库"""
@@ -16,6 +35,7 @@ def init_database():
         # 创建所有表
         print('Creating database tables...')
         db.create_all()
+        ensure_columns()
         
         # 检查是否已有数据
         if SysUser.query.first():
@@ -2,6 +2,7 @@ import os
 from app import create_app
 from app.extensions import socketio
 from app.tasks.timeout_checker import start_scheduler
+from app.tasks.gate_stream import start_gate_streams, start_lpr_warmup
 
 # Create app instance
 app = create_app(os.getenv('FLASK_ENV', 'development'))
@@ -9,6 +10,13 @@ app = create_app(os.getenv('FLASK_ENV', 'development'))
 # Start background scheduler
 start_scheduler(app)
 
+# Warm up plate recognition in the background (see /api/parking/lpr/status)
+if app.config.get('LPR_WARMUP', True):
+    start_lpr_warmup(app)
+
+# Start gate camera streams (GATE_CAMERAS)
+start_gate_streams(app)
+
 if __name__ == '__main__':
     # Run with SocketIO
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
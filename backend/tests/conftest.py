@@ -0,0 +1,35 @@
+"""
+测试公共夹具：基于 SQLite 内存库构建最小应用 (不连接 MySQL / Redis，不启动后台线程)。
+"""
+
+import os
+import sys
+
+import pytest
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from config import config
+from app.extensions import db, socketio
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.from_object(config['default'])
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI='sqlite://',
+        SQLALCHEMY_BINDS={'school_db': 'sqlite://'},
+        SQLALCHEMY_ENGINE_OPTIONS={'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}},
+    )
+    db.init_app(app)
+    socketio.init_app(app)
+    with app.app_context():
+        from app.models import user, parking, order, car, config as sys_config, school  # noqa: F401
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,54 @@
+"""
+批量开通账号首次登录须修改密码的测试。
+"""
+
+from app.extensions import db
+from app.models.user import SysUser
+from app.services.auth_service import AuthService
+from app.services.user_service import UserService
+from app.utils.auth_utils import hash_password, verify_password
+
+
+def _provisioned_user():
+    user = SysUser(
+        user_no="2021001", username="李同学", password=hash_password("init-pass"), role=1,
+        balance=0, credit_score=100, must_reset_password=True,
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_login_requires_new_password_when_reset_is_pending(app):
+    _provisioned_user()
+
+    result, status = AuthService.login("2021001", "init-pass")
+
+    assert status == 403
+    assert result["data"] == {"must_reset_password": True}
+    assert "token" not in result["data"]
+
+
+def test_login_with_new_password_clears_reset_flag(app):
+    user = _provisioned_user()
+
+    result, status = AuthService.login("2021001", "init-pass", new_password="init-pass")
+    assert status == 400
+
+    result, status = AuthService.login("2021001", "init-pass", new_password="my-own-pass")
+    assert status == 200
+    assert result["data"]["token"]
+    assert result["data"]["user"]["must_reset_password"] is False
+
+    db.session.refresh(user)
+    assert verify_password(user.password, "my-own-pass")
+    assert AuthService.login("2021001", "init-pass")[1] == 401
+    assert AuthService.login("2021001", "my-own-pass")[1] == 200
+
+
+def test_provision_requires_initial_password(app):
+    with app.test_request_context():
+        result, status = UserService.start_provision({"user_nos": ["2021001"]})
+
+    assert status == 400
+    assert result["message"] == "请指定初始密码"
@@ -0,0 +1,34 @@
+"""
+配置快照角色折扣回退测试。
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from app.extensions import db
+from app.models.config import SysConfig
+from app.utils import config_snapshot
+
+
+@pytest.mark.parametrize("stored", [None, ""])
+def test_missing_or_empty_role_discount_falls_back_to_app_config(app, stored):
+    if stored is not None:
+        db.session.add(SysConfig(config_key="ROLE_DISCOUNT", config_value=stored))
+        db.session.commit()
+
+    snapshot = config_snapshot._load(1, app.config)
+
+    assert snapshot.role_discount is None
+    for role, rate in app.config["ROLE_DISCOUNT"].items():
+        assert snapshot.discount_for(role, app.config["ROLE_DISCOUNT"]) == Decimal(str(rate))
+
+
+def test_stored_role_discount_overrides_app_config(app):
+    db.session.add(SysConfig(config_key="ROLE_DISCOUNT", config_value='{"1": 0.5}'))
+    db.session.commit()
+
+    snapshot = config_snapshot._load(1, app.config)
+
+    assert snapshot.discount_for(1, app.config["ROLE_DISCOUNT"]) == Decimal("0.5")
+    assert snapshot.discount_for(2, app.config["ROLE_DISCOUNT"]) == Decimal("1.0")
@@ -0,0 +1,180 @@
+"""
+批量计费与标量 compute_fee 的一致性测试。
+
+以固定种子随机生成订单：入场时刻贴近计费方案时段边界、停车时长覆盖零/负值、免费时长与整小时边界、跨多日，
+费率、折扣、倍率含多位小数，角色覆盖 ROLE_DISCOUNT 中的全部角色及未配置折扣的角色。
+逐项断言 calculate_parking_fees_bulk / calculate_parking_fees_elapsed 的结果 (分) 与 compute_fee 完全一致。
+"""
+
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy
+import pytest
+
+from config import Config
+from app.utils import config_snapshot
+from app.utils.fee_calculator import (
+    calculate_parking_fee,
+    calculate_parking_fees_bulk,
+    calculate_parking_fees_elapsed,
+    compute_fee,
+)
+from app.utils.tariff import compile_tariff
+
+SEEDS = [0, 1, 7, 42, 2024]
+ORDERS_PER_SEED = 2000
+UTC_OFFSET = 8
+
+RATES = ["0", "1", "2.5", "3.00", "4.75", "12.34", "0.01", "999.99"]
+DISCOUNTS = ["1.0", "0.9", "0.8", "0.85", "0.333", "1"]
+MULTIPLIERS = ["1.0", "1.5", "0.7", "1.25", "2", "0.123"]
+FREE_MINUTES = [0, 15, 30, 60]
+# ROLE_DISCOUNT 中的全部角色，外加一个未配置折扣的角色
+ROLES = sorted(Config.ROLE_DISCOUNT) + [max(Config.ROLE_DISCOUNT) + 1]
+
+
+def _random_tariff(rng):
+    bands = []
+    for _ in range(rng.randrange(1, 4)):
+        start = rng.randrange(24)
+        end = rng.choice([e for e in range(1, 25) if e != start])
+        bands.append({"start": start, "end": end, "rate": float(rng.choice(RATES))})
+    return {
+        "bands": bands,
+        "escalation": [rng.choice([0.5, 1, 1.25, 2]) for _ in range(rng.randrange(6))],
+        "daily_cap": rng.choice([None, 20, 45.5, 300]),
+    }
+
+
+def _boundary_hours(tariff):
+    """计费方案各时段起止边界对应的 UTC 小时"""
+    return sorted({(h - UTC_OFFSET) % 24 for band in tariff["bands"] for h in (band["start"], band["end"] % 24)})
+
+
+def _random_duration(rng, free_minutes):
+    kind = rng.random()
+    if kind < 0.1:
+        return timedelta(0)
+    if kind < 0.2:
+        return -timedelta(seconds=rng.randrange(1, 7200), microseconds=rng.randrange(10 ** 6))
+    if kind < 0.5:
+        # 贴近免费时长与整小时的边界 (相差至多 1 微秒)
+        minutes = rng.choice([free_minutes, 60, 120, 24 * 60, 25 * 60])
+        return timedelta(minutes=minutes, microseconds=rng.choice([-1, 0, 1]))
+    return timedelta(seconds=rng.randrange(3 * 86400), microseconds=rng.randrange(10 ** 6))
+
+
+def _random_orders(rng, count, tariff_specs):
+    """
+    生成随机订单。
+
+    Returns:
+        list: [(入场, 出场, 费率, 免费分钟, 角色, 方案下标或 None), ...]
+    """
+    base = datetime(2025, 1, 1)
+    orders = []
+    for _ in range(count):
+        tariff_index = rng.randrange(len(tariff_specs)) if rng.random() < 0.6 else None
+        day = base + timedelta(days=rng.randrange(365))
+        if tariff_index is not None and rng.random() < 0.5:
+            # 入场时刻落在时段边界前后
+            hour = rng.choice(_boundary_hours(tariff_specs[tariff_index]))
+            in_time = day + timedelta(hours=hour, microseconds=rng.choice([-1, 0, 1]))
+        else:
+            in_time = day + timedelta(seconds=rng.randrange(86400), microseconds=rng.randrange(10 ** 6))
+        free_minutes = rng.choice(FREE_MINUTES)
+        out_time = None if rng.random() < 0.03 else in_time + _random_duration(rng, free_minutes)
+        if rng.random() < 0.02:
+            in_time = None
+        orders.append((in_time, out_time, Decimal(rng.choice(RATES)), free_minutes, rng.choice(ROLES), tariff_index))
+    return orders
+
+
+def _expected_cents(orders, discounts, multiplier, compiled):
+    cents = []
+    for in_time, out_time, rate, free, role, tariff_index in orders:
+        tariff = compiled[tariff_index] if tariff_index is not None else None
+        fee = compute_fee(in_time, out_time, rate, free, discounts.get(role, Decimal("1.0")), multiplier, tariff=tariff)
+        cents.append(fee * 100)
+    return cents
+
+
+def _assert_same_cents(orders, expected, actual):
+    mismatches = [
+        (orders[k], expected[k], int(actual[k]))
+        for k in range(len(orders))
+        if expected[k] != int(actual[k])
+    ]
+    assert not mismatches, f"{len(mismatches)} 项不一致，例如 {mismatches[0]}"
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_bulk_and_elapsed_match_compute_fee(seed):
+    rng = random.Random(seed)
+    multiplier = Decimal(rng.choice(MULTIPLIERS))
+    discounts = {role: Decimal(rng.choice(DISCOUNTS)) for role in Config.ROLE_DISCOUNT}
+    tariff_specs = [_random_tariff(rng) for _ in range(3)]
+    compiled = [compile_tariff(spec, rng.choice(RATES), UTC_OFFSET) for spec in tariff_specs]
+    orders = _random_orders(rng, ORDERS_PER_SEED, tariff_specs)
+    expected = _expected_cents(orders, discounts, multiplier, compiled)
+
+    in_times, out_times, rates, free, roles, tariff_indexes = zip(*orders)
+    tariffs = [compiled[i] if i is not None else None for i in tariff_indexes]
+    kwargs = {"multiplier": multiplier, "discounts": discounts, "tariffs": tariffs}
+
+    bulk = calculate_parking_fees_bulk(in_times, out_times, rates, free, roles, {}, **kwargs)
+    _assert_same_cents(orders, expected, bulk)
+
+    bulk_datetime64 = calculate_parking_fees_bulk(
+        numpy.array(in_times, dtype="datetime64[us]"), numpy.array(out_times, dtype="datetime64[us]"),
+        rates, free, roles, {}, **kwargs,
+    )
+    _assert_same_cents(orders, expected, bulk_datetime64)
+
+    valid = [i is not None and o is not None for i, o in zip(in_times, out_times)]
+    elapsed = [(o - i) // timedelta(microseconds=1) if v else 0 for i, o, v in zip(in_times, out_times, valid)]
+    in_hours = [i.hour if i is not None else 0 for i in in_times]
+    by_elapsed = calculate_parking_fees_elapsed(
+        elapsed, valid, rates, free, roles, {}, in_hours=in_hours, **kwargs
+    )
+    _assert_same_cents(orders, expected, by_elapsed)
+
+
+@pytest.mark.parametrize("role", ROLES)
+def test_zero_and_negative_durations_are_free(role):
+    in_time = datetime(2025, 3, 1, 9, 30)
+    durations = [timedelta(0), -timedelta(microseconds=1), -timedelta(hours=5)]
+    tariff = compile_tariff({"bands": [{"start": 7, "end": 22, "rate": 8.0}]}, 5, UTC_OFFSET)
+    count = len(durations)
+
+    cents = calculate_parking_fees_bulk(
+        [in_time] * count, [in_time + d for d in durations], [Decimal("5")] * count, [0] * count, [role] * count,
+        {}, multiplier=Decimal("1.5"), discounts={role: Decimal("0.9")}, tariffs=[tariff] * count,
+    )
+
+    assert cents.tolist() == [0] * count
+    assert all(
+        compute_fee(in_time, in_time + d, Decimal("5"), 0, Decimal("0.9"), Decimal("1.5"), tariff=tariff) == 0
+        for d in durations
+    )
+
+
+def test_role_discount_from_config_matches_scalar(app):
+    """未传入 discounts 时按配置快照 (数据库未配置折扣则为 ROLE_DISCOUNT) 逐角色取折扣"""
+    config_snapshot.bump()
+    rng = random.Random(3)
+    role_discount = app.config["ROLE_DISCOUNT"]
+    in_time = datetime(2025, 5, 1, 8)
+    out_times = [in_time + timedelta(minutes=rng.randrange(16, 600)) for _ in ROLES]
+
+    cents = calculate_parking_fees_bulk(
+        [in_time] * len(ROLES), out_times, [Decimal("4.75")] * len(ROLES), [15] * len(ROLES), ROLES, role_discount,
+    )
+
+    expected = [
+        calculate_parking_fee(in_time, out_time, Decimal("4.75"), 15, role, role_discount) * 100
+        for role, out_time in zip(ROLES, out_times)
+    ]
+    assert cents.tolist() == expected
@@ -0,0 +1,37 @@
+"""
+上传图片读取的大小上限测试。
+"""
+
+import io
+
+import pytest
+
+from app.utils.image_preprocess import READ_CHUNK_SIZE, ImageTooLargeError, read_upload
+
+
+class _Upload:
+    """模拟 werkzeug FileStorage：只提供 stream 与 content_length"""
+
+    def __init__(self, data, content_length=None, chunk=None):
+        self.stream = io.BufferedReader(io.BytesIO(data), buffer_size=chunk or READ_CHUNK_SIZE)
+        self.content_length = content_length
+
+
+@pytest.mark.parametrize("max_bytes", [1000, READ_CHUNK_SIZE, 3 * READ_CHUNK_SIZE + 7])
+@pytest.mark.parametrize("with_length", [False, True])
+def test_rejects_one_byte_over_limit(max_bytes, with_length):
+    data = b"x" * (max_bytes + 1)
+    upload = _Upload(data, content_length=max_bytes if with_length else None)
+    with pytest.raises(ImageTooLargeError):
+        read_upload(upload, max_bytes)
+
+
+@pytest.mark.parametrize("size", [0, 1, 999, 1000])
+def test_accepts_up_to_limit(size):
+    data = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    assert read_upload(_Upload(data), 1000) == data
+
+
+def test_accepts_large_upload_without_content_length():
+    data = b"y" * (5 * READ_CHUNK_SIZE + 3)
+    assert read_upload(_Upload(data), 10 * READ_CHUNK_SIZE) == data
@@ -0,0 +1,73 @@
+"""
+OrderService 预约流程的数据库语句数回归测试。
+"""
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models.car import Car
+from app.models.order import ParkingOrder
+from app.models.parking import ParkingSpot, ParkingZone
+from app.models.user import SysUser
+from app.services.order_service import OrderService
+from app.utils import config_snapshot
+
+# 预约校验 (单条语句读取全部校验数据并锁定车位) + 插入订单 + 提交后刷新订单
+CREATE_ORDER_STATEMENT_BUDGET = 3
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _seed():
+    zone = ParkingZone(zone_name="A区", fee_rate=5, free_time=15)
+    db.session.add(zone)
+    db.session.flush()
+    spots = [ParkingSpot(spot_no=f"A-00{i}", zone_id=zone.zone_id, status=0) for i in (1, 2)]
+    user = SysUser(user_no="2021001", username="李同学", password="x", role=1, balance=100, credit_score=100)
+    db.session.add_all(spots + [user])
+    db.session.flush()
+    db.session.add(Car(user_id=user.user_id, plate_number="京A12345"))
+    db.session.commit()
+    return user, spots
+
+
+def test_create_order_statement_budget(app):
+    user, spots = _seed()
+    user_id, spot_id = user.user_id, spots[0].spot_id
+    config_snapshot.get()  # 配置快照为进程级缓存，预先加载
+
+    with count_statements() as statements:
+        result, status = OrderService.create_order(user, spot_id, "京A12345")
+
+    assert status == 201, result
+    assert len(statements) <= CREATE_ORDER_STATEMENT_BUDGET, statements
+    assert ParkingOrder.query.filter_by(user_id=user_id, spot_id=spot_id, status=0).count() == 1
+
+
+def test_rejected_reservation_statement_budget(app):
+    user, spots = _seed()
+    config_snapshot.get()
+    first_spot_id, second_spot_id = spots[0].spot_id, spots[1].spot_id
+    assert OrderService.create_order(user, first_spot_id, "京A12345")[1] == 201
+    db.session.refresh(user)  # 提交后已过期，重新加载后再计数
+
+    # 同一车辆再次预约：校验失败，只执行校验语句
+    with count_statements() as statements:
+        result, status = OrderService.create_order(user, second_spot_id, "京A12345")
+
+    assert status == 403, result
+    assert len(statements) <= 1, statements
@@ -12,6 +12,14 @@ export const getUsers = (page, perPage) => {
     return request.get('/admin/users', { params: { page, per_page: perPage } })
 }
 
+export const provisionUsers = (data) => {
+    return request.post('/admin/users/provision', data)
+}
+
+export const getProvisionProgress = (jobId) => {
+    return request.get(`/admin/users/provision/${jobId}`)
+}
+
 export const updateUser = (data) => {
     return request.post('/admin/user/update', data)
 }
@@ -40,3 +48,7 @@ export const forceExitOrder = (plate_number) => {
 export const updateAdminConfig = (data) => {
     return request.post('/admin/config/update', data)
 }
+
+export const simulateTariff = (data) => {
+    return request.post('/admin/tariff/simulate', data)
+}
@@ -4,8 +4,10 @@ export const getZones = () => {
     return request.get('/parking/zones')
 }
 
-export const getSpots = (zoneId) => {
-    return request.get('/parking/spots', { params: { zone_id: zoneId } })
+export const getSpots = (zoneId, since = null) => {
+    const params = { zone_id: zoneId }
+    if (since !== null) params.since = since
+    return request.get('/parking/spots', { params })
 }
 
 export const vehicleEnter = (data) => {
@@ -23,3 +25,11 @@ export const recognizePlate = (imageFile) => {
         headers: { 'Content-Type': 'multipart/form-data' }
     })
 }
+
+export const recognizePlateBatch = (imageFiles) => {
+    const formData = new FormData()
+    imageFiles.forEach(file => formData.append('images', file))
+    return request.post('/parking/recognize-plate/batch', formData, {
+        headers: { 'Content-Type': 'multipart/form-data' }
+    })
+}
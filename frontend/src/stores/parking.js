@@ -1,11 +1,13 @@
 import { defineStore } from 'pinia'
 import { getZones, getSpots } from '@/api/parking'
+import { subscribeZone } from '@/utils/websocket'
 
 export const useParkingStore = defineStore('parking', {
     state: () => ({
         zones: [],
         spots: [],
         currentZoneId: null,
+        spotsVersion: null,
         loading: false
     }),
 
@@ -51,9 +53,17 @@ export const useParkingStore = defineStore('parking', {
             console.log(`parkingStore: Fetching spots for zone ${zoneId}...`);
             this.loading = true
             try {
-                const res = await getSpots(zoneId)
-                this.spots = res.data
-                this.currentZoneId = zoneId
+                // 同一区域且已持有版本号时只拉取增量
+                const since = zoneId === this.currentZoneId ? this.spotsVersion : null
+                const res = await getSpots(zoneId, since)
+                if (res.changes) {
+                    this.applySpotSync({ zone_id: zoneId, version: res.version, changes: res.changes })
+                } else {
+                    this.spots = res.data
+                    this.spotsVersion = res.version ?? null
+                    this.currentZoneId = zoneId
+                    subscribeZone(zoneId, this.spotsVersion)
+                }
                 console.log(`parkingStore: Loaded ${this.spots.length} spots`);
             } catch (err) {
                 console.error('parkingStore: fetchSpots error', err);
@@ -62,12 +72,30 @@ export const useParkingStore = defineStore('parking', {
             }
         },
 
-        updateSpotStatus(spotId, status, currentPlate = null) {
+        updateSpotStatus(spotId, status, currentPlate = null, version = null) {
+            // 忽略版本号不新于本地的重复/过期变更
+            if (version !== null && this.spotsVersion !== null && version <= this.spotsVersion) return
             const spot = this.spots.find(s => s.spot_id === spotId)
             if (spot) {
                 spot.status = status
                 spot.current_plate = currentPlate
             }
+            if (version !== null) this.spotsVersion = version
+        },
+
+        applySpotSync(data) {
+            if (data.zone_id !== this.currentZoneId) return
+            if (data.spots) {
+                this.spots = data.spots
+                this.spotsVersion = data.version
+                return
+            }
+            for (const change of data.changes || []) {
+                this.updateSpotStatus(change.spot_id, change.status, change.current_plate, change.version)
+            }
+            if (this.spotsVersion === null || data.version > this.spotsVersion) {
+                this.spotsVersion = data.version
+            }
         }
     }
 })
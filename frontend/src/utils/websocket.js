@@ -5,6 +5,8 @@ import { ElMessageBox, ElMessage } from 'element-plus'
 import router from '@/router'
 
 let socket = null
+// 当前订阅的区域，断线重连后携带已持有的版本号重新订阅以补齐错过的变更
+let subscribedZoneId = null
 
 export const initWebSocket = () => {
     if (socket) return socket
@@ -21,6 +23,13 @@ export const initWebSocket = () => {
 
     socket.on('connect', () => {
         console.log('WebSocket connected')
+        if (subscribedZoneId) {
+            const parkingStore = useParkingStore()
+            socket.emit('subscribe_zone', {
+                zone_id: subscribedZoneId,
+                version: parkingStore.spotsVersion
+            })
+        }
     })
 
     socket.on('disconnect', () => {
@@ -30,7 +39,13 @@ export const initWebSocket = () => {
     socket.on('spot_status_update', (data) => {
         console.log('Spot status update:', data)
         const parkingStore = useParkingStore()
-        parkingStore.updateSpotStatus(data.spot_id, data.status, data.current_plate)
+        parkingStore.updateSpotStatus(data.spot_id, data.status, data.current_plate, data.version)
+    })
+
+    // 订阅握手结果：增量变更或全量车位列表
+    socket.on('spot_sync', (data) => {
+        const parkingStore = useParkingStore()
+        parkingStore.applySpotSync(data)
     })
 
     // 监听实时踢出事件
@@ -60,11 +75,21 @@ export const initWebSocket = () => {
     return socket
 }
 
+export const subscribeZone = (zoneId, version = null) => {
+    if (!socket) return
+    if (subscribedZoneId && subscribedZoneId !== zoneId) {
+        socket.emit('unsubscribe_zone', { zone_id: subscribedZoneId })
+    }
+    subscribedZoneId = zoneId
+    socket.emit('subscribe_zone', { zone_id: zoneId, version })
+}
+
 export const closeWebSocket = () => {
     if (socket) {
         socket.close()
         socket = null
     }
+    subscribedZoneId = null
 }
 
 export const getSocket = () => socket